@@ -8,16 +8,36 @@ import json
 import os
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, redirect, render_template, request, send_file, url_for
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
 from werkzeug.utils import secure_filename
 
+from src.agents.clients import llm_clients
+from src.agents.encoding import summary_encoder
+from src.agents.policy import call_policies
+from src.agents.scheduler import llm_scheduler
+from src.agents.stats import prompt_stats
 from src.cache.manager import CacheManager
+from src.cache.warmup import CacheWarmer
 from src.conversation.manager import ConversationManager
 from src.data.loader import FinancialDataLoader
 from src.dataset.manager import DatasetManager
+from src.maintenance.scheduler import MaintenanceScheduler, iter_remove_old_files
 from src.orchestration.controller import FinancialInsightController
+from src.orchestration.routing import question_router
+from src.orchestration.speculation import SpeculativeExecutor
 from src.visualisations.visualisation import VisualisationGenerator
 
 # Load environment variables
@@ -33,18 +53,174 @@ app.config["ALLOWED_EXTENSIONS"] = {"xlsx", "xls", "csv"}
 # Ensure upload directory exists
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+# Directory for files generated by the export endpoints
+EXPORT_DIR = os.environ.get(
+    "EXPORT_DIR", os.path.join(tempfile.gettempdir(), "financial-exports")
+)
+os.makedirs(EXPORT_DIR, exist_ok=True)
+
+# Maintenance intervals and retention limits
+EXPORT_MAX_AGE_SECONDS = int(os.environ.get("EXPORT_MAX_AGE_SECONDS", 24 * 60 * 60))
+INTERACTION_LOG_MAX_BYTES = int(
+    os.environ.get("INTERACTION_LOG_MAX_BYTES", 5 * 1024 * 1024)
+)
+INTERACTION_LOG_BACKUPS = int(os.environ.get("INTERACTION_LOG_BACKUPS", 3))
+
+# Single background thread for cache sweeps, log rotation and file cleanup
+maintenance_scheduler = MaintenanceScheduler()
+
 # Initialise managers
 dataset_manager = DatasetManager(os.environ.get("DATA_DIR", "data"))
 conversation_manager = ConversationManager(
     os.environ.get("CONVERSATIONS_DIR", "conversations")
 )
-cache_manager = CacheManager(os.environ.get("CACHE_DIR", "cache"))
+
+# Stale-while-revalidate TTLs (soft, hard) in seconds per cache namespace
+CACHE_NAMESPACE_TTLS = {
+    "stats": (60 * 60, 7 * 24 * 60 * 60),
+    "qa": (24 * 60 * 60, 7 * 24 * 60 * 60),
+}
+
+# Codecs for persistent cache entries; answers and charts embed PNG images
+CACHE_NAMESPACE_CODECS = {
+    "qa": "pickle+zlib",
+    "loader": "pickle+zlib",
+    "viz": "pickle+zlib",
+    "llm": "pickle+zlib",
+}
+# Token budget for the data summary embedded in each prompt ("none" for no limit)
+PROMPT_SUMMARY_TOKEN_BUDGET = os.environ.get("PROMPT_SUMMARY_TOKEN_BUDGET", "1000")
+summary_encoder.token_budget = (
+    None
+    if PROMPT_SUMMARY_TOKEN_BUDGET.lower() == "none"
+    else int(PROMPT_SUMMARY_TOKEN_BUDGET)
+)
+
+# Test several hypotheses per LLM call, sharing one copy of the data summary
+HYPOTHESIS_BATCHING = os.environ.get("HYPOTHESIS_BATCHING", "true").lower() == "true"
+
+# Test each hypothesis during discovery as soon as it has been generated
+HYPOTHESIS_PIPELINING = (
+    os.environ.get("HYPOTHESIS_PIPELINING", "true").lower() == "true"
+)
+
+# Agents only cache LLM responses at or below this temperature ("none" caches all)
+LLM_CACHE_MAX_TEMPERATURE = (
+    None
+    if os.environ.get("LLM_CACHE_MAX_TEMPERATURE", "0.2").lower() == "none"
+    else float(os.environ.get("LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+)
+
+# Connection pool shared by all LLM clients, kept across dataset changes
+llm_clients.configure(
+    max_connections=int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", 20)),
+    max_keepalive_connections=int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", 10)),
+    keepalive_expiry=float(os.environ.get("LLM_KEEPALIVE_EXPIRY", 30)),
+    timeout=float(os.environ.get("LLM_TIMEOUT", 120)),
+    connect_timeout=float(os.environ.get("LLM_CONNECT_TIMEOUT", 10)),
+)
+
+
+def optional_float(name, default):
+    """Read a float environment variable, where "none" means no value."""
+    value = os.environ.get(name, default)
+    return None if value.lower() == "none" else float(value)
+
+
+# Timeouts, retries, hedging and circuit breaker for every agent LLM call
+call_policies.configure(
+    timeout=optional_float("LLM_CALL_TIMEOUT", "60"),
+    deadline=optional_float("LLM_CALL_DEADLINE", "180"),
+    max_retries=int(os.environ.get("LLM_MAX_RETRIES", 2)),
+    backoff_base=float(os.environ.get("LLM_BACKOFF_BASE", 0.5)),
+    backoff_max=float(os.environ.get("LLM_BACKOFF_MAX", 8)),
+    hedge_percentile=optional_float("LLM_HEDGE_PERCENTILE", "none"),
+    hedge_min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20)),
+    failure_threshold=int(os.environ.get("LLM_BREAKER_THRESHOLD", 5)),
+    reset_timeout=float(os.environ.get("LLM_BREAKER_RESET", 30)),
+)
+
+# Requests- and tokens-per-minute budgets for LLM calls ("none" for no limit),
+# with per-deployment overrides as JSON, e.g.
+# {"gpt-4o": {"requests_per_minute": 60, "tokens_per_minute": 80000}}
+llm_scheduler.configure(
+    requests_per_minute=optional_float("LLM_REQUESTS_PER_MINUTE", "none"),
+    tokens_per_minute=optional_float("LLM_TOKENS_PER_MINUTE", "none"),
+    deployment_limits=json.loads(os.environ.get("LLM_DEPLOYMENT_LIMITS", "{}")),
+    burst_seconds=float(os.environ.get("LLM_BURST_SECONDS", 10)),
+)
+
+# Q&A questions scoring at most ROUTER_FAST_THRESHOLD go to FAST_DEPLOYMENT
+question_router.configure(
+    fast_threshold=float(os.environ.get("ROUTER_FAST_THRESHOLD", 1.5)),
+    words_per_point=float(os.environ.get("ROUTER_WORDS_PER_POINT", 12)),
+)
+
+cache_manager = CacheManager(
+    os.environ.get("CACHE_DIR", "cache"),
+    namespace_ttls=CACHE_NAMESPACE_TTLS,
+    namespace_codecs=CACHE_NAMESPACE_CODECS,
+    # Persisting in the background can lose the latest entries on a crash
+    write_behind=os.environ.get("CACHE_WRITE_BEHIND", "false").lower() == "true",
+    # Share entries across worker processes (run `python -m src.cache.shared`)
+    shared_address=os.environ.get("CACHE_SHARED_ADDRESS"),
+    # Signs shared entries; required for TCP addresses
+    shared_secret=os.environ.get("CACHE_SHARED_SECRET"),
+    scheduler=maintenance_scheduler,
+)
+
+# Background cache warm-up after dataset activation
+cache_warmer = CacheWarmer()
+
+# Charts for streamed answers render while the answer is being generated
+chart_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chart")
+
+# Suggested follow-up questions are answered in the background (opt-in)
+speculation = SpeculativeExecutor(
+    cache_manager,
+    enabled=os.environ.get("SPECULATIVE_FOLLOW_UPS", "false").lower() == "true",
+    max_questions=int(os.environ.get("SPECULATIVE_MAX_QUESTIONS", 3)),
+)
 
 # Initialise controller with default settings
 controller = None
 visualisation_generator = None
 
 
+def rotate_interaction_log():
+    """Save the active controller's interaction log and rotate it if too large."""
+    active_controller = controller
+    if active_controller is None:
+        return
+
+    active_controller.save_interaction_log()
+    active_controller.rotate_interaction_log(
+        INTERACTION_LOG_MAX_BYTES, INTERACTION_LOG_BACKUPS
+    )
+
+
+def cleanup_exports():
+    """Remove exported files older than EXPORT_MAX_AGE_SECONDS, one per step."""
+    yield from iter_remove_old_files(EXPORT_DIR, EXPORT_MAX_AGE_SECONDS)
+    yield from iter_remove_old_files(
+        os.path.join(conversation_manager.conversations_dir, "exports"),
+        EXPORT_MAX_AGE_SECONDS,
+    )
+
+
+maintenance_scheduler.add_job(
+    "interaction-log-rotation", rotate_interaction_log, 10 * 60, priority=30
+)
+maintenance_scheduler.add_job("export-cleanup", cleanup_exports, 60 * 60, priority=50)
+maintenance_scheduler.add_job(
+    "conversation-index-compaction",
+    conversation_manager.compact_index,
+    24 * 60 * 60,
+    priority=90,
+    initial_delay=60,
+)
+
+
 def initialise_controller():
     """Initialise the Financial Insight Controller with the dataset."""
     global controller, visualisation_generator
@@ -58,6 +234,9 @@ def initialise_controller():
             f"Missing required environment variables: {', '.join(missing_vars)}"
         )
 
+    # Speculative answers belong to the previous controller
+    speculation.cancel_all()
+
     # Get deployment names (use defaults if not specified)
     analyst_deployment = os.environ.get("ANALYST_DEPLOYMENT", "gpt-4")
     insight_deployment = os.environ.get("INSIGHT_DEPLOYMENT", "gpt-4")
@@ -80,6 +259,15 @@ def initialise_controller():
         insight_deployment=insight_deployment,
         streaming=False,  # Disable streaming for API use
         log_interactions=True,
+        cache_manager=cache_manager,
+        hypothesis_concurrency=int(os.environ.get("HYPOTHESIS_CONCURRENCY", 4)),
+        hypothesis_batching=HYPOTHESIS_BATCHING,
+        hypothesis_pipelining=HYPOTHESIS_PIPELINING,
+        analyst_tools=os.environ.get("ANALYST_TOOLS", "false").lower() == "true",
+        max_tool_rounds=int(os.environ.get("MAX_TOOL_ROUNDS", 4)),
+        fast_deployment=os.environ.get("FAST_DEPLOYMENT"),
+        cache_llm_responses=os.environ.get("LLM_CACHE", "true").lower() == "true",
+        llm_cache_max_temperature=LLM_CACHE_MAX_TEMPERATURE,
     )
 
     # Run initial analysis to prepare the system
@@ -92,6 +280,10 @@ def initialise_controller():
 
     print("Initialisation complete!")
 
+    # Precompute stats, charts and (optionally) sample answers in the background
+    if os.environ.get("CACHE_WARMUP", "true").lower() == "true":
+        start_cache_warmup()
+
     return "Controller initialised successfully"
 
 
@@ -128,6 +320,207 @@ def settings_page():
     return render_template("settings.html")
 
 
+def start_cache_warmup():
+    """
+    Start warming the cache for the active dataset in the background.
+
+    Any warm-up still running for a previously active dataset is cancelled.
+    """
+    current_dataset = dataset_manager.get_current_dataset()
+    dataset_id = current_dataset["id"] if current_dataset else "default"
+    dataset_name = current_dataset["name"] if current_dataset else "financial"
+
+    # Capture the current instances so a later re-initialisation cannot mix datasets
+    active_controller = controller
+    active_generator = visualisation_generator
+
+    tasks = [
+        (
+            "stats",
+            lambda: cache_manager.get_or_refresh(
+                f"stats_{dataset_id}",
+                lambda: compute_stats(active_controller, current_dataset),
+            ),
+        )
+    ]
+
+    for chart_type in active_generator.get_chart_types():
+        tasks.append(
+            (
+                f"chart:{chart_type}",
+                lambda chart_type=chart_type: active_generator.generate_chart_data(
+                    chart_type
+                ),
+            )
+        )
+
+    # Pre-answering sample questions calls the LLM, so it is opt-in
+    if os.environ.get("CACHE_WARMUP_QUESTIONS", "false").lower() == "true":
+        for question in build_sample_questions(dataset_name):
+            tasks.append(
+                (
+                    f"question:{question}",
+                    lambda question=question: cache_manager.get_or_refresh(
+                        qa_cache_key(dataset_id, question),
+                        lambda: answer_question(
+                            question, active_controller, active_generator
+                        ),
+                    ),
+                )
+            )
+
+    cache_warmer.start(dataset_id, tasks)
+
+
+def qa_cache_key(dataset_id, question):
+    """
+    Build the answer cache key for a question.
+
+    Args:
+        dataset_id: ID of the dataset the question is about
+        question: User's question
+
+    Returns:
+        Cache key for the answer
+    """
+    # hash() is salted per process, so it cannot be used for keys shared by workers
+    return cache_manager.make_key(f"qa_{dataset_id}", question)
+
+
+def answer_question(question, active_controller, active_generator):
+    """
+    Answer a question and render a chart for it if appropriate.
+
+    Args:
+        question: User's question about the financial data
+        active_controller: Controller to answer the question with
+        active_generator: VisualisationGenerator for the chart, or None
+
+    Returns:
+        Dictionary with the answer, processing time and chart data
+    """
+    # Record start time
+    start_time = time.time()
+
+    # Process the question
+    answer = active_controller.run_q_and_a(question)
+
+    # Calculate processing time
+    processing_time = time.time() - start_time
+
+    # Generate visualisation if appropriate
+    chart_data = None
+    if active_generator:
+        chart_data = active_generator.generate_chart_for_question(question)
+
+    return {
+        "answer": answer,
+        "processing_time": processing_time,
+        "chart_data": chart_data,
+    }
+
+
+def speculative_answer(question, cancel_event, active_controller, active_generator):
+    """
+    Answer a suggested follow-up question in the background.
+
+    Args:
+        question: Suggested follow-up question
+        cancel_event: Set when the answer is no longer wanted
+        active_controller: Controller to answer the question with
+        active_generator: VisualisationGenerator for the chart, or None
+
+    Returns:
+        Dictionary with the answer, processing time and chart data, or None
+        if cancelled
+    """
+    start_time = time.time()
+
+    # Streamed so that generation stops soon after a cancellation
+    chunks = []
+    stream = active_controller.stream_q_and_a(question)
+    try:
+        for chunk in stream:
+            if cancel_event.is_set():
+                return None
+            chunks.append(chunk)
+    finally:
+        stream.close()
+
+    chart_data = None
+    if active_generator:
+        chart_data = active_generator.generate_chart_for_question(question)
+
+    return {
+        "answer": "".join(chunks),
+        "processing_time": time.time() - start_time,
+        "chart_data": chart_data,
+    }
+
+
+def speculate_follow_ups(
+    conversation_id, dataset_id, questions, active_controller, active_generator
+):
+    """
+    Start answering the follow-up questions suggested in a conversation.
+
+    Args:
+        conversation_id: ID of the conversation
+        dataset_id: ID of the dataset the questions are about
+        questions: Suggested follow-up questions
+        active_controller: Controller to answer the questions with
+        active_generator: VisualisationGenerator for the charts, or None
+    """
+    speculation.speculate(
+        conversation_id,
+        [(qa_cache_key(dataset_id, question), question) for question in questions],
+        lambda question, cancel_event: speculative_answer(
+            question, cancel_event, active_controller, active_generator
+        ),
+    )
+
+
+def compute_stats(active_controller, current_dataset):
+    """
+    Compute basic statistics about the active dataset.
+
+    Args:
+        active_controller: Controller holding the loaded dataset
+        current_dataset: Current dataset information or None
+
+    Returns:
+        Dictionary with dataset statistics
+    """
+    data_summary = active_controller.data_summary
+
+    # Get basic stats
+    stats = {
+        "total_rows": len(active_controller.data),
+        "total_sales": float(data_summary.get("total_sales", 0)),
+        "total_profit": float(data_summary.get("total_profit", 0)),
+        "segments": [
+            seg["Segment"] for seg in data_summary.get("segment_analysis", [])
+        ],
+        "countries": [
+            country["Country"] for country in data_summary.get("country_analysis", [])
+        ],
+        "products": [
+            product["Product"] for product in data_summary.get("product_analysis", [])
+        ],
+    }
+
+    # Add current dataset info
+    if current_dataset:
+        stats["current_dataset"] = {
+            "id": current_dataset["id"],
+            "name": current_dataset["name"],
+            "description": current_dataset.get("description", ""),
+            "date_added": current_dataset.get("date_added", ""),
+        }
+
+    return stats
+
+
 # API Routes for Q&A
 @app.route("/api/ask", methods=["POST"])
 def ask_question():
@@ -158,28 +551,18 @@ def ask_question():
         return jsonify({"status": "error", "message": "No question provided"}), 400
 
     # Create or set conversation
-    if not conversation_id:
-        conversation_id = conversation_manager.create_conversation(
-            title="New Conversation",
-            dataset_id=(
-                dataset_manager.get_current_dataset()["id"]
-                if dataset_manager.get_current_dataset()
-                else None
+    requested_conversation_id = conversation_id
+    conversation_id = prepare_conversation(conversation_id)
+    if conversation_id is None:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Conversation with ID {requested_conversation_id} not found",
+                }
             ),
+            404,
         )
-    else:
-        # Ensure the conversation exists
-        if conversation_manager.get_conversation(conversation_id) is None:
-            return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": f"Conversation with ID {conversation_id} not found",
-                    }
-                ),
-                404,
-            )
-        conversation_manager.set_current_conversation(conversation_id)
 
     # Add question to conversation
     conversation_manager.add_message(conversation_id, "user", question)
@@ -188,42 +571,24 @@ def ask_question():
         # Generate cache key based on question and current dataset
         current_dataset = dataset_manager.get_current_dataset()
         dataset_id = current_dataset["id"] if current_dataset else "default"
-        cache_key = f"qa_{dataset_id}_{hash(question)}"
-
-        # Check cache for existing answer
-        cached_result = cache_manager.get(cache_key)
-
-        if cached_result:
-            answer = cached_result["answer"]
-            processing_time = cached_result["processing_time"]
-            chart_data = cached_result.get("chart_data")
-        else:
-            # Record start time
-            start_time = time.time()
+        cache_key = qa_cache_key(dataset_id, question)
 
-            # Process the question
-            answer = controller.run_q_and_a(question)
+        # Use or cancel the answers speculated after the previous response
+        speculation.claim(conversation_id, cache_key)
 
-            # Calculate processing time
-            processing_time = time.time() - start_time
-
-            # Generate visualisation if appropriate
-            chart_data = None
-            if visualisation_generator:
-                chart_data = visualisation_generator.generate_chart_for_question(
-                    question
-                )
-
-            # Cache the result
-            cache_manager.set(
+        # Serve cached answers (stale ones are refreshed in the background)
+        active_controller = controller
+        active_generator = visualisation_generator
+        with speculation.foreground():
+            cached_result = cache_manager.get_or_refresh(
                 cache_key,
-                {
-                    "answer": answer,
-                    "processing_time": processing_time,
-                    "chart_data": chart_data,
-                },
+                lambda: answer_question(question, active_controller, active_generator),
             )
 
+        answer = cached_result["answer"]
+        processing_time = cached_result["processing_time"]
+        chart_data = cached_result.get("chart_data")
+
         # Add answer to conversation
         conversation_manager.add_message(
             conversation_id,
@@ -237,6 +602,13 @@ def ask_question():
         follow_up_suggestions = conversation_manager.generate_follow_up_questions(
             conversation_id
         )
+        speculate_follow_ups(
+            conversation_id,
+            dataset_id,
+            follow_up_suggestions,
+            active_controller,
+            active_generator,
+        )
 
         return jsonify(
             {
@@ -259,6 +631,227 @@ def ask_question():
         return jsonify({"status": "error", "message": error_message}), 500
 
 
+@app.route("/api/ask/stream", methods=["POST"])
+def ask_question_stream():
+    """
+    API endpoint for asking questions with the answer streamed as server-sent
+    events.
+
+    Events are sent in this order: "conversation" with the conversation ID,
+    "token" for each chunk of the answer, "chart" once the chart is rendered,
+    and "done" with the processing time and follow-up suggestions after the
+    answer has been saved. Failures end the stream with an "error" event.
+    """
+    global controller, visualisation_generator
+
+    # Initialise controller if not already done
+    if controller is None:
+        try:
+            initialise_controller()
+        except Exception as e:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Failed to initialise system: {str(e)}",
+                    }
+                ),
+                500,
+            )
+
+    # Get question from request
+    data = request.json
+    question = data.get("question")
+    requested_conversation_id = data.get("conversation_id")
+
+    if not question:
+        return jsonify({"status": "error", "message": "No question provided"}), 400
+
+    # Create or set conversation
+    conversation_id = prepare_conversation(requested_conversation_id)
+    if conversation_id is None:
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Conversation with ID {requested_conversation_id} not found",
+                }
+            ),
+            404,
+        )
+
+    # Add question to conversation
+    conversation_manager.add_message(conversation_id, "user", question)
+
+    current_dataset = dataset_manager.get_current_dataset()
+    dataset_id = current_dataset["id"] if current_dataset else "default"
+    cache_key = qa_cache_key(dataset_id, question)
+    active_controller = controller
+    active_generator = visualisation_generator
+
+    def generate():
+        yield sse_event("conversation", {"conversation_id": conversation_id})
+
+        try:
+            # Use or cancel the answers speculated after the previous response
+            speculation.claim(conversation_id, cache_key)
+
+            # Stale answers are streamed and refreshed in the background
+            cached_result = cache_manager.get(
+                cache_key,
+                lambda: answer_question(question, active_controller, active_generator),
+            )
+
+            if cached_result is not None:
+                answer = cached_result["answer"]
+                processing_time = cached_result["processing_time"]
+                chart_data = cached_result.get("chart_data")
+
+                yield sse_event("token", {"text": answer})
+                if chart_data:
+                    yield sse_event("chart", {"chart_data": chart_data})
+            else:
+                start_time = time.time()
+
+                # Render the chart alongside the answer
+                chart_future = None
+                if active_generator:
+                    chart_future = chart_executor.submit(
+                        active_generator.generate_chart_for_question, question
+                    )
+
+                chunks = []
+                chart_data = None
+                with speculation.foreground():
+                    for chunk in active_controller.stream_q_and_a(question):
+                        chunks.append(chunk)
+                        yield sse_event("token", {"text": chunk})
+
+                        if chart_future is not None and chart_future.done():
+                            chart_data = chart_result(chart_future)
+                            chart_future = None
+                            if chart_data:
+                                yield sse_event("chart", {"chart_data": chart_data})
+
+                answer = "".join(chunks)
+                processing_time = time.time() - start_time
+
+                if chart_future is not None:
+                    chart_data = chart_result(chart_future)
+                    if chart_data:
+                        yield sse_event("chart", {"chart_data": chart_data})
+
+                cache_manager.set(
+                    cache_key,
+                    {
+                        "answer": answer,
+                        "processing_time": processing_time,
+                        "chart_data": chart_data,
+                    },
+                )
+
+            # Add answer to conversation
+            conversation_manager.add_message(
+                conversation_id,
+                "assistant",
+                answer,
+                processing_time=processing_time,
+                chart_data=chart_data,
+            )
+
+            # Generate follow-up suggestions
+            follow_up_suggestions = conversation_manager.generate_follow_up_questions(
+                conversation_id
+            )
+            speculate_follow_ups(
+                conversation_id,
+                dataset_id,
+                follow_up_suggestions,
+                active_controller,
+                active_generator,
+            )
+
+            yield sse_event(
+                "done",
+                {
+                    "conversation_id": conversation_id,
+                    "processing_time": round(processing_time, 2),
+                    "follow_up_suggestions": follow_up_suggestions,
+                },
+            )
+
+        except Exception as e:
+            # Log the error and add system message to conversation
+            error_message = f"Error processing question: {str(e)}"
+            print(error_message)
+            conversation_manager.add_message(conversation_id, "system", error_message)
+
+            yield sse_event("error", {"message": error_message})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def prepare_conversation(conversation_id):
+    """
+    Create a conversation, or make an existing one current.
+
+    Args:
+        conversation_id: ID of an existing conversation, or None to create one
+
+    Returns:
+        ID of the conversation, or None if the requested conversation does not
+        exist
+    """
+    if not conversation_id:
+        current_dataset = dataset_manager.get_current_dataset()
+        return conversation_manager.create_conversation(
+            title="New Conversation",
+            dataset_id=current_dataset["id"] if current_dataset else None,
+        )
+
+    # Ensure the conversation exists
+    if conversation_manager.get_conversation(conversation_id) is None:
+        return None
+
+    conversation_manager.set_current_conversation(conversation_id)
+    return conversation_id
+
+
+def sse_event(event, data):
+    """
+    Format a server-sent event.
+
+    Args:
+        event: Event name
+        data: JSON-serialisable event payload
+
+    Returns:
+        Event in text/event-stream format
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def chart_result(chart_future):
+    """
+    Get the chart rendered for a streamed answer.
+
+    Args:
+        chart_future: Future for the chart rendering
+
+    Returns:
+        Dictionary with chart data, or None if no chart could be rendered
+    """
+    try:
+        return chart_future.result()
+    except Exception as e:
+        print(f"Error generating chart: {str(e)}")
+        return None
+
+
 # API Routes for Stats and Sample Questions
 @app.route("/api/stats")
 def get_stats():
@@ -286,41 +879,10 @@ def get_stats():
         dataset_id = current_dataset["id"] if current_dataset else "default"
         cache_key = f"stats_{dataset_id}"
 
-        cached_stats = cache_manager.get(cache_key)
-
-        if cached_stats:
-            return jsonify({"status": "success", "stats": cached_stats})
-
-        # Get basic stats
-        stats = {
-            "total_rows": len(controller.data),
-            "total_sales": float(controller.data_summary.get("total_sales", 0)),
-            "total_profit": float(controller.data_summary.get("total_profit", 0)),
-            "segments": [
-                seg["Segment"]
-                for seg in controller.data_summary.get("segment_analysis", [])
-            ],
-            "countries": [
-                country["Country"]
-                for country in controller.data_summary.get("country_analysis", [])
-            ],
-            "products": [
-                product["Product"]
-                for product in controller.data_summary.get("product_analysis", [])
-            ],
-        }
-
-        # Add current dataset info
-        if current_dataset:
-            stats["current_dataset"] = {
-                "id": current_dataset["id"],
-                "name": current_dataset["name"],
-                "description": current_dataset.get("description", ""),
-                "date_added": current_dataset.get("date_added", ""),
-            }
-
-        # Cache the stats
-        cache_manager.set(cache_key, stats)
+        active_controller = controller
+        stats = cache_manager.get_or_refresh(
+            cache_key, lambda: compute_stats(active_controller, current_dataset)
+        )
 
         return jsonify({"status": "success", "stats": stats})
 
@@ -340,7 +902,22 @@ def get_sample_questions():
     current_dataset = dataset_manager.get_current_dataset()
     dataset_name = current_dataset["name"] if current_dataset else "financial"
 
-    questions = [
+    questions = build_sample_questions(dataset_name)
+
+    return jsonify({"status": "success", "questions": questions})
+
+
+def build_sample_questions(dataset_name):
+    """
+    Build the sample questions shown in the UI.
+
+    Args:
+        dataset_name: Name of the current dataset
+
+    Returns:
+        List of sample questions
+    """
+    return [
         f"Which segment has the highest profit margin in the {dataset_name} dataset?",
         "What is the relationship between discounts and profit margins?",
         "Which country generates the most revenue?",
@@ -353,8 +930,6 @@ def get_sample_questions():
         "What are the top 3 insights about this financial dataset?",
     ]
 
-    return jsonify({"status": "success", "questions": questions})
-
 
 # API Routes for System Initialisation and Management
 @app.route("/api/initialise", methods=["POST"])
@@ -375,6 +950,144 @@ def init_api():
         )
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Get cache hit ratios, latency histograms and sizes per namespace."""
+    return jsonify({"status": "success", "stats": cache_manager.get_stats()})
+
+
+@app.route("/api/cache/stats", methods=["DELETE"])
+def reset_cache_stats():
+    """Reset the cache counters and latency histograms."""
+    cache_manager.metrics.reset()
+    return jsonify({"status": "success"})
+
+
+@app.route("/api/cache/warmup", methods=["GET"])
+def get_cache_warmup():
+    """Get the progress of the background cache warm-up."""
+    return jsonify({"status": "success", "warmup": cache_warmer.get_progress()})
+
+
+@app.route("/api/cache/warmup", methods=["POST"])
+def start_cache_warmup_api():
+    """Start a cache warm-up for the active dataset."""
+    try:
+        if controller is None:
+            initialise_controller()
+        else:
+            start_cache_warmup()
+
+        return jsonify({"status": "success", "warmup": cache_warmer.get_progress()})
+    except Exception as e:
+        return (
+            jsonify(
+                {"status": "error", "message": f"Error starting warm-up: {str(e)}"}
+            ),
+            500,
+        )
+
+
+@app.route("/api/cache/warmup", methods=["DELETE"])
+def cancel_cache_warmup():
+    """Cancel the running cache warm-up."""
+    cancelled = cache_warmer.cancel()
+
+    return jsonify(
+        {
+            "status": "success",
+            "cancelled": cancelled,
+            "warmup": cache_warmer.get_progress(),
+        }
+    )
+
+
+@app.route("/api/maintenance", methods=["GET"])
+def get_maintenance_stats():
+    """Get run statistics for the background maintenance jobs."""
+    return jsonify({"status": "success", "jobs": maintenance_scheduler.get_stats()})
+
+
+@app.route("/api/prompts/stats", methods=["GET"])
+def get_prompt_stats():
+    """
+    Get prompt statistics: token counts of the data summaries embedded in
+    prompts, and per-agent prompt sizes and prefix cache hit rates.
+    """
+    return jsonify(
+        {
+            "status": "success",
+            "summary": summary_encoder.get_stats(),
+            "agents": prompt_stats.get_stats(),
+        }
+    )
+
+
+@app.route("/api/prompts/stats", methods=["DELETE"])
+def reset_prompt_stats():
+    """Reset the per-agent prompt statistics."""
+    prompt_stats.reset()
+    return jsonify({"status": "success", "message": "Prompt statistics reset"})
+
+
+@app.route("/api/llm/clients", methods=["GET"])
+def get_llm_client_stats():
+    """Get statistics for the shared LLM clients and their connection pools."""
+    return jsonify({"status": "success", "clients": llm_clients.get_stats()})
+
+
+@app.route("/api/llm/calls", methods=["GET"])
+def get_llm_call_stats():
+    """
+    Get per-deployment LLM call statistics: retries, timeouts, hedged requests,
+    circuit breaker state and latency percentiles.
+    """
+    return jsonify({"status": "success", "deployments": call_policies.get_stats()})
+
+
+@app.route("/api/llm/scheduler", methods=["GET"])
+def get_llm_scheduler_stats():
+    """
+    Get per-deployment rate limit statistics: budgets, queue depth, wait times
+    and estimated versus actual token usage.
+    """
+    return jsonify({"status": "success", "deployments": llm_scheduler.get_stats()})
+
+
+@app.route("/api/llm/routing", methods=["GET"])
+def get_llm_routing_stats():
+    """
+    Get Q&A routing statistics: the router thresholds, per-tier question
+    counts and latency percentiles, and recent routing decisions.
+    """
+    return jsonify({"status": "success", "routing": question_router.get_stats()})
+
+
+@app.route("/api/llm/routing", methods=["POST"])
+def configure_llm_routing():
+    """Tune the Q&A router thresholds (fast_threshold, words_per_point)."""
+    data = request.json or {}
+
+    try:
+        question_router.configure(
+            fast_threshold=data.get("fast_threshold"),
+            words_per_point=data.get("words_per_point"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    return jsonify({"status": "success", "routing": question_router.get_stats()})
+
+
+@app.route("/api/llm/speculation", methods=["GET"])
+def get_llm_speculation_stats():
+    """
+    Get statistics for speculatively answered follow-up questions: answers
+    scheduled, completed, cancelled and used, hit rate and wasted tokens.
+    """
+    return jsonify({"status": "success", "speculation": speculation.get_stats()})
+
+
 @app.route("/api/clear_cache", methods=["POST"])
 def clear_cache():
     """Clear the cache."""
@@ -508,12 +1221,12 @@ def activate_dataset(dataset_id):
         if not success:
             return jsonify({"status": "error", "message": message}), 404
 
+        # Clear the cache for the new dataset (before warm-up repopulates it)
+        cache_manager.clear_all()
+
         # Re-initialise the controller with the new dataset
         initialise_controller()
 
-        # Clear the cache for the new dataset
-        cache_manager.clear_all()
-
         return jsonify({"status": "success", "message": message})
 
     except Exception as e:
@@ -691,7 +1404,9 @@ def export_conversation(conversation_id):
             )
 
         # Create a temporary file for the export
-        with tempfile.NamedTemporaryFile(suffix=f".{format}", delete=False) as temp:
+        with tempfile.NamedTemporaryFile(
+            suffix=f".{format}", dir=EXPORT_DIR, delete=False
+        ) as temp:
             temp_path = temp.name
 
         # Export the conversation
@@ -746,7 +1461,7 @@ def get_visualisation(chart_type):
         # Get parameters
         params = request.args.to_dict()
 
-        # Generate the chart
+        # Generate the chart (renders are memoized by dataset content)
         chart_data = visualisation_generator.generate_chart_data(chart_type, **params)
 
         return jsonify({"status": "success", "chart_data": chart_data})
@@ -987,7 +1702,7 @@ def export_insights_api():
     try:
         # Create a temporary file for the export
         with tempfile.NamedTemporaryFile(
-            suffix=f".{format_type}", delete=False
+            suffix=f".{format_type}", dir=EXPORT_DIR, delete=False
         ) as temp:
             temp_path = temp.name
 
@@ -1060,6 +1775,20 @@ def export_insights_api():
         )
 
 
+def create_app():
+    """
+    Start the background maintenance jobs and return the Flask app.
+
+    Importing this module starts no threads, so WSGI servers should load the
+    app through this factory, e.g. `gunicorn "app:create_app()"`.
+
+    Returns:
+        The Flask application
+    """
+    maintenance_scheduler.start()
+    return app
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_DEBUG", "False").lower() == "true"
@@ -1073,4 +1802,4 @@ if __name__ == "__main__":
             "The system will attempt to initialise when the first request is received."
         )
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
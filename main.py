@@ -3,6 +3,7 @@ Main script for running the Multi-Agent Financial Analysis System.
 """
 
 import argparse
+import asyncio
 import os
 
 from dotenv import load_dotenv
@@ -64,10 +65,48 @@ def main():
         help="Azure OpenAI deployment name for the Insight Generator Agent",
     )
 
+    parser.add_argument(
+        "--fast-deployment",
+        type=str,
+        help="Azure OpenAI deployment name for simple questions (for qa mode)",
+    )
+
     parser.add_argument(
         "--no-streaming", action="store_true", help="Disable streaming of agent outputs"
     )
 
+    parser.add_argument(
+        "--hypothesis-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of hypotheses tested in parallel",
+    )
+
+    parser.add_argument(
+        "--no-hypothesis-batching",
+        action="store_true",
+        help="Test each hypothesis in its own LLM call instead of in batches",
+    )
+
+    parser.add_argument(
+        "--no-hypothesis-pipelining",
+        action="store_true",
+        help="Wait for all hypotheses to be generated before testing them",
+    )
+
+    parser.add_argument(
+        "--analyst-tools",
+        action="store_true",
+        help="Answer analysis questions with the tool-calling analyst",
+    )
+
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run discovery on an asyncio event loop, testing hypotheses concurrently",
+    )
+
     args = parser.parse_args()
 
     # Load environment variables from .env file
@@ -91,12 +130,20 @@ def main():
         analyst_deployment=args.analyst_deployment,
         insight_deployment=args.insight_deployment,
         streaming=not args.no_streaming,
+        hypothesis_concurrency=args.hypothesis_concurrency,
+        hypothesis_batching=not args.no_hypothesis_batching,
+        hypothesis_pipelining=not args.no_hypothesis_pipelining,
+        analyst_tools=args.analyst_tools,
+        fast_deployment=args.fast_deployment,
     )
 
     # Run the requested mode
     if args.mode == "discovery":
         print("Running full insight discovery process...")
-        insights = controller.run_full_insight_discovery()
+        if args.use_async:
+            insights = asyncio.run(controller.arun_full_insight_discovery())
+        else:
+            insights = controller.run_full_insight_discovery()
         print("\n=== FINAL INSIGHTS ===")
         print(insights)
 
@@ -4,47 +4,124 @@ Agent Implementations for Financial Analysis System
 This module defines the Data Analyst and Insight Generator agents using LangChain with Azure OpenAI.
 """
 
+import contextvars
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from langchain.agents import AgentExecutor, Tool, create_react_agent
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import ToolMessage
 from langchain_openai import AzureChatOpenAI
 
+from src.agents.clients import llm_clients
+from src.agents.encoding import count_tokens
+from src.agents.policy import CallPolicy, call_policies
 from src.agents.prompts import (
     DATA_ANALYST_SYSTEM_PROMPT,
+    HYPOTHESIS_GENERATOR_SYSTEM_PROMPT,
     INSIGHT_GENERATOR_SYSTEM_PROMPT,
+    TOOL_ANALYST_SYSTEM_PROMPT,
+    TOOL_LIMIT_MESSAGE,
+    format_data_summary,
     get_analyst_prompt_with_task,
+    get_hypothesis_batch_testing_prompt,
     get_hypothesis_generation_prompt,
+    get_hypothesis_prompt,
     get_hypothesis_testing_prompt,
     get_insight_prompt_with_task,
+    get_insight_question_prompt,
     get_insight_synthesis_prompt,
+    get_tool_analyst_prompt,
+    shared_prefix,
 )
+from src.agents.scheduler import llm_scheduler
+from src.agents.stats import prompt_stats
+from src.agents.tools import AnalystToolkit
+from src.cache.manager import CacheManager
 from src.data.loader import FinancialDataLoader
 
+# Calls at or below this temperature are cached by default
+DEFAULT_CACHE_MAX_TEMPERATURE = 0.2
+
+# Completion tokens reserved for a call when the client sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+# Prompt plus expected output tokens allowed for one batch of hypothesis tests
+DEFAULT_BATCH_TOKEN_BUDGET = 8000
+
+# Output tokens expected per hypothesis in a batch
+BATCH_TOKENS_PER_RESULT = 500
+
+# Tool round-trips allowed per question for the tool-calling analyst
+DEFAULT_MAX_TOOL_ROUNDS = 4
+
+# Sections of a batch hypothesis test result, in display order
+BATCH_RESULT_SECTIONS = ("components", "analysis", "evidence", "limitations")
 
-class DataAnalystAgent:
+# Fields of a generated hypothesis, as written by the model
+HYPOTHESIS_FIELDS = ("hypothesis", "rationale", "test_approach", "business_impact")
+
+# Token usage of the LLM calls made in the current context, if tracked
+_usage_tracker = contextvars.ContextVar("usage_tracker", default=None)
+
+
+@contextmanager
+def track_token_usage() -> Iterator[Dict[str, int]]:
     """
-    Agent responsible for analyzing financial data and identifying patterns.
+    Track the tokens used by the LLM calls made in the current context.
+
+    Tokens are counted as reported by the provider, or from the prompt and the
+    output when the provider reports none (e.g. for streamed responses).
+    Streams closed early count the output generated until then.
+
+    Yields:
+        Dictionary with the number of "calls" and "tokens" so far
+    """
+    usage = {"calls": 0, "tokens": 0}
+    token = _usage_tracker.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_tracker.reset(token)
+
+
+class BaseAgent:
+    """
+    Base class for LLM-backed agents.
+
+    Owns the Azure OpenAI client and the synchronous and asynchronous paths
+    every LLM call goes through. Calls wait for the deployment's rate limits
+    in the scheduler, then run under its call policy (timeouts, retries,
+    hedging and circuit breaker). With a cache manager, responses are cached
+    in the "llm" namespace, keyed on the deployment, temperature and messages.
     """
 
     def __init__(
         self,
-        deployment_name: str = "gpt-4o",
-        temperature: float = 0.0,
-        streaming: bool = True,
-        data_loader: Optional[FinancialDataLoader] = None,
+        deployment_name: str,
+        temperature: float,
+        streaming: bool,
+        cache_manager: Optional[CacheManager] = None,
+        cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
     ):
         """
-        Initialise the Data Analyst Agent.
+        Initialise the agent's LLM client.
 
         Args:
             deployment_name: Name of the Azure OpenAI deployment
             temperature: Temperature parameter for the LLM
             streaming: Whether to stream output
-            data_loader: Optional FinancialDataLoader instance
+            cache_manager: Optional CacheManager for LLM responses
+            cache_max_temperature: Only cache responses when the temperature is
+                at most this value, or None to cache regardless of temperature
         """
+        self.deployment_name = deployment_name
+        self.temperature = temperature
+        self.cache_manager = cache_manager
+        self.cache_max_temperature = cache_max_temperature
 
         # Get Azure OpenAI configuration from environment variables
         azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
@@ -56,16 +133,431 @@ class DataAnalystAgent:
                 "Azure OpenAI credentials not found in environment variables"
             )
 
-        self.llm = AzureChatOpenAI(
-            azure_deployment=deployment_name,
-            openai_api_version=api_version,
-            azure_endpoint=azure_endpoint,
+        # Agents with the same settings share a client and its connection pool
+        self.llm = llm_clients.get_chat_model(
+            AzureChatOpenAI,
+            endpoint=azure_endpoint,
             api_key=azure_api_key,
+            api_version=api_version,
+            deployment_name=deployment_name,
             temperature=temperature,
             streaming=streaming,
+            # Retries are left to the call policy
+            max_retries=0,
+        )
+
+    def _messages(self, system_prompt: str, prompt: str) -> List[BaseMessage]:
+        """
+        Build the messages for an LLM call.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Returns:
+            List of messages
+        """
+        return [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+
+    def _invoke(self, system_prompt: str, prompt: str) -> str:
+        """
+        Call the LLM and wait for the response.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Returns:
+            Response content
+        """
+        cache_key = self._response_cache_key(system_prompt, prompt)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        response = self._call_model(self._messages(system_prompt, prompt))
+        usage = _token_usage(response)
+        self._record_prompt(system_prompt, prompt, usage)
+        self._cache_response(cache_key, response.content, usage)
+        return response.content
+
+    async def _ainvoke(self, system_prompt: str, prompt: str) -> str:
+        """
+        Call the LLM without blocking the event loop.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Returns:
+            Response content
+        """
+        cache_key = self._response_cache_key(system_prompt, prompt)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await self._acall_model(self._messages(system_prompt, prompt))
+        usage = _token_usage(response)
+        self._record_prompt(system_prompt, prompt, usage)
+        self._cache_response(cache_key, response.content, usage)
+        return response.content
+
+    def _stream(self, system_prompt: str, prompt: str) -> Iterator[str]:
+        """
+        Call the LLM and yield the response as it is generated.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Yields:
+            Chunks of response content
+        """
+        cache_key = self._response_cache_key(system_prompt, prompt)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        usage = None
+        messages = self._messages(system_prompt, prompt)
+        tokens = self._estimate_tokens(messages)
+        try:
+            for chunk in self._call_policy().stream(
+                lambda: self.llm.stream(messages),
+                admit=lambda: llm_scheduler.acquire(self.deployment_name, tokens),
+            ):
+                usage = _token_usage(chunk) or usage
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        finally:
+            # Also runs when the consumer closes the stream early
+            output = "".join(chunks)
+            self._track_usage(messages, output, usage)
+            self._settle_tokens(tokens, usage, messages, output)
+            if chunks or usage:
+                self._record_prompt(system_prompt, prompt, usage)
+
+        # Only complete responses are cached
+        self._cache_response(cache_key, "".join(chunks), usage)
+
+    async def _astream(self, system_prompt: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Call the LLM without blocking the event loop and yield the response as
+        it is generated.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Yields:
+            Chunks of response content
+        """
+        cache_key = self._response_cache_key(system_prompt, prompt)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        usage = None
+        messages = self._messages(system_prompt, prompt)
+        tokens = self._estimate_tokens(messages)
+        try:
+            async for chunk in self._call_policy().astream(
+                lambda: self.llm.astream(messages),
+                admit=lambda: llm_scheduler.aacquire(self.deployment_name, tokens),
+            ):
+                usage = _token_usage(chunk) or usage
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        finally:
+            # Also runs when the consumer closes the stream early
+            output = "".join(chunks)
+            self._track_usage(messages, output, usage)
+            self._settle_tokens(tokens, usage, messages, output)
+            if chunks or usage:
+                self._record_prompt(system_prompt, prompt, usage)
+
+        # Only complete responses are cached
+        self._cache_response(cache_key, "".join(chunks), usage)
+
+    def _call_model(self, messages: List[BaseMessage], llm: Any = None) -> Any:
+        """
+        Send messages to the model under its call policy. Every request sent,
+        including retries and hedged duplicates, first waits for the
+        deployment's rate limits and settles its own token reservation.
+
+        Args:
+            messages: Messages to send
+            llm: Model to call (e.g. with tools bound), or None for the agent's
+                client
+
+        Returns:
+            Response message
+        """
+        if llm is None:
+            llm = self.llm
+        tokens = self._estimate_tokens(messages)
+
+        def attempt():
+            response = llm.invoke(messages)
+            self._settle_tokens(tokens, _token_usage(response))
+            return response
+
+        response = self._call_policy().call(
+            attempt, admit=lambda: llm_scheduler.acquire(self.deployment_name, tokens)
+        )
+        self._track_usage(messages, str(response.content), _token_usage(response))
+        return response
+
+    async def _acall_model(self, messages: List[BaseMessage], llm: Any = None) -> Any:
+        """
+        Send messages to the model without blocking the event loop, under its
+        call policy, charging every request sent to the deployment's rate
+        limits as `_call_model` does.
+
+        Args:
+            messages: Messages to send
+            llm: Model to call (e.g. with tools bound), or None for the agent's
+                client
+
+        Returns:
+            Response message
+        """
+        if llm is None:
+            llm = self.llm
+        tokens = self._estimate_tokens(messages)
+
+        async def attempt():
+            response = await llm.ainvoke(messages)
+            self._settle_tokens(tokens, _token_usage(response))
+            return response
+
+        response = await self._call_policy().acall(
+            attempt, admit=lambda: llm_scheduler.aacquire(self.deployment_name, tokens)
+        )
+        self._track_usage(messages, str(response.content), _token_usage(response))
+        return response
+
+    def _call_policy(self) -> CallPolicy:
+        """
+        Get the timeout, retry and circuit breaker policy for LLM calls.
+
+        Returns:
+            CallPolicy shared by all agents using this agent's deployment
+        """
+        return call_policies.get(self.deployment_name)
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        """
+        Estimate the tokens an LLM call counts against the deployment's
+        tokens-per-minute budget: the prompt plus the maximum completion.
+
+        Args:
+            messages: Messages to send
+
+        Returns:
+            Estimated tokens, or 0 if the deployment has no budgets
+        """
+        if not llm_scheduler.is_limited(self.deployment_name):
+            return 0
+
+        max_tokens = getattr(self.llm, "max_tokens", None)
+        if not isinstance(max_tokens, int):
+            max_tokens = DEFAULT_COMPLETION_TOKENS
+
+        return (
+            sum(count_tokens(str(message.content)) for message in messages) + max_tokens
+        )
+
+    def _settle_tokens(
+        self,
+        estimated_tokens: int,
+        usage: Optional[Dict[str, int]],
+        messages: Optional[List[BaseMessage]] = None,
+        output: str = "",
+    ) -> None:
+        """
+        Correct the scheduler's reservation with the reported token usage.
+
+        Without reported usage (e.g. for streams), the tokens of the messages
+        and the output received are counted instead when messages are given,
+        so streams closed early return the unused part of their reservation.
+
+        Args:
+            estimated_tokens: Tokens reserved for the call
+            usage: Token usage reported for the call, if any
+            messages: Messages sent, for counting tokens without usage
+            output: Response content received, for counting tokens without usage
+        """
+        actual_tokens = usage["total_tokens"] if usage else None
+        if actual_tokens is None and estimated_tokens and messages is not None:
+            actual_tokens = _count_tokens(messages, output)
+
+        llm_scheduler.settle(self.deployment_name, estimated_tokens, actual_tokens)
+
+    def _track_usage(
+        self, messages: List[BaseMessage], output: str, usage: Optional[Dict[str, int]]
+    ) -> None:
+        """
+        Add an LLM call to the usage tracked in the current context, if any.
+
+        Args:
+            messages: Messages sent
+            output: Response content received
+            usage: Token usage reported for the call, if any
+        """
+        tracker = _usage_tracker.get()
+        if tracker is None:
+            return
+
+        if usage:
+            tokens = usage["total_tokens"]
+        elif output:
+            tokens = _count_tokens(messages, output)
+        else:
+            # Failed before any output; nothing is billed
+            return
+
+        tracker["calls"] += 1
+        tracker["tokens"] += tokens
+
+    def _record_prompt(
+        self, system_prompt: str, prompt: str, usage: Optional[Dict[str, int]]
+    ) -> None:
+        """
+        Record the size and prefix cache usage of an LLM call.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+            usage: Token usage reported for the call, if any
+        """
+        prompt_stats.record(
+            type(self).__name__, system_prompt, shared_prefix(prompt), prompt, usage
+        )
+
+    def _response_cache_key(self, system_prompt: str, prompt: str) -> Optional[str]:
+        """
+        Get the response cache key for an LLM call.
+
+        Args:
+            system_prompt: System prompt for the agent
+            prompt: Task-specific prompt
+
+        Returns:
+            Cache key, or None if the call should not be cached
+        """
+        if self.cache_manager is None:
+            return None
+
+        if (
+            self.cache_max_temperature is not None
+            and self.temperature > self.cache_max_temperature
+        ):
+            return None
+
+        return self.cache_manager.make_key(
+            "llm",
+            {
+                "deployment": self.deployment_name,
+                "temperature": self.temperature,
+                "system_prompt": hashlib.sha256(system_prompt.encode()).hexdigest(),
+                "messages": [
+                    hashlib.sha256(message.content.encode()).hexdigest()
+                    for message in self._messages(system_prompt, prompt)[1:]
+                ],
+            },
+        )
+
+    def _get_cached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """
+        Get a cached LLM response.
+
+        Args:
+            cache_key: Response cache key, or None for uncached calls
+
+        Returns:
+            Cached response content, or None if not cached
+        """
+        if cache_key is None:
+            return None
+
+        cached = self.cache_manager.get(cache_key)
+        return cached["content"] if cached is not None else None
+
+    def _cache_response(
+        self,
+        cache_key: Optional[str],
+        content: str,
+        usage: Optional[Dict[str, int]],
+    ) -> None:
+        """
+        Cache an LLM response with its token usage.
+
+        Args:
+            cache_key: Response cache key, or None for uncached calls
+            content: Response content
+            usage: Token usage reported for the call, if any
+        """
+        if cache_key is None:
+            return
+
+        self.cache_manager.set(
+            cache_key,
+            {
+                "content": content,
+                "usage": usage,
+                "deployment": self.deployment_name,
+                "temperature": self.temperature,
+            },
+        )
+
+
+class DataAnalystAgent(BaseAgent):
+    """
+    Agent responsible for analyzing financial data and identifying patterns.
+    """
+
+    def __init__(
+        self,
+        deployment_name: str = "gpt-4o",
+        temperature: float = 0.0,
+        streaming: bool = True,
+        data_loader: Optional[FinancialDataLoader] = None,
+        cache_manager: Optional[CacheManager] = None,
+        cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
+        batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+    ):
+        """
+        Initialise the Data Analyst Agent.
+
+        Args:
+            deployment_name: Name of the Azure OpenAI deployment
+            temperature: Temperature parameter for the LLM
+            streaming: Whether to stream output
+            data_loader: Optional FinancialDataLoader instance
+            cache_manager: Optional CacheManager for LLM responses
+            cache_max_temperature: Only cache responses when the temperature is
+                at most this value, or None to cache regardless of temperature
+            batch_token_budget: Maximum prompt plus expected output tokens for
+                one batch of hypothesis tests
+        """
+        super().__init__(
+            deployment_name,
+            temperature,
+            streaming,
+            cache_manager=cache_manager,
+            cache_max_temperature=cache_max_temperature,
         )
 
         self.data_loader = data_loader
+        self.batch_token_budget = batch_token_budget
 
     def analyze(self, task: str, data_summary: Dict[str, Any]) -> str:
         """
@@ -82,13 +574,35 @@ class DataAnalystAgent:
         prompt = get_analyst_prompt_with_task(task, data_summary)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=DATA_ANALYST_SYSTEM_PROMPT),
-            HumanMessage(content=prompt),
-        ]
+        return self._invoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
 
-        response = self.llm(messages)
-        return response.content
+    async def aanalyze(self, task: str, data_summary: Dict[str, Any]) -> str:
+        """
+        Perform a specific analysis task asynchronously.
+
+        Args:
+            task: Description of the analysis task
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Analysis results as a string
+        """
+        prompt = get_analyst_prompt_with_task(task, data_summary)
+        return await self._ainvoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+
+    def analyze_stream(self, task: str, data_summary: Dict[str, Any]) -> Iterator[str]:
+        """
+        Perform a specific analysis task, streaming the results.
+
+        Args:
+            task: Description of the analysis task
+            data_summary: Dictionary containing data summary
+
+        Yields:
+            Chunks of the analysis results
+        """
+        prompt = get_analyst_prompt_with_task(task, data_summary)
+        yield from self._stream(DATA_ANALYST_SYSTEM_PROMPT, prompt)
 
     def test_hypothesis(self, hypothesis: str, data_summary: Dict[str, Any]) -> str:
         """
@@ -105,13 +619,150 @@ class DataAnalystAgent:
         prompt = get_hypothesis_testing_prompt(hypothesis, data_summary)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=DATA_ANALYST_SYSTEM_PROMPT),
-            HumanMessage(content=prompt),
-        ]
+        return self._invoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
 
-        response = self.llm(messages)
-        return response.content
+    async def atest_hypothesis(
+        self, hypothesis: str, data_summary: Dict[str, Any]
+    ) -> str:
+        """
+        Test a specific hypothesis against the data asynchronously.
+
+        Args:
+            hypothesis: The hypothesis to test
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Hypothesis testing results as a string
+        """
+        prompt = get_hypothesis_testing_prompt(hypothesis, data_summary)
+        return await self._ainvoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+
+    def test_hypothesis_stream(
+        self, hypothesis: str, data_summary: Dict[str, Any]
+    ) -> Iterator[str]:
+        """
+        Test a specific hypothesis against the data, streaming the results.
+
+        Args:
+            hypothesis: The hypothesis to test
+            data_summary: Dictionary containing data summary
+
+        Yields:
+            Chunks of the hypothesis testing results
+        """
+        prompt = get_hypothesis_testing_prompt(hypothesis, data_summary)
+        yield from self._stream(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+
+    def split_hypothesis_batches(
+        self, hypotheses: List[str], data_summary: Any
+    ) -> List[List[int]]:
+        """
+        Split hypotheses into batches that fit the batch token budget.
+
+        Args:
+            hypotheses: The hypotheses to test
+            data_summary: Dictionary containing data summary, or an already
+                formatted summary
+
+        Returns:
+            List of batches, each a list of positions in `hypotheses`
+        """
+        if isinstance(data_summary, dict):
+            data_summary = format_data_summary(data_summary)
+
+        # The summary and instructions are paid once per batch
+        base_tokens = count_tokens(
+            get_hypothesis_batch_testing_prompt([], data_summary)
+        )
+
+        batches = []
+        batch = []
+        batch_tokens = base_tokens
+        for i, hypothesis in enumerate(hypotheses):
+            tokens = count_tokens(hypothesis) + BATCH_TOKENS_PER_RESULT
+            if batch and batch_tokens + tokens > self.batch_token_budget:
+                batches.append(batch)
+                batch = []
+                batch_tokens = base_tokens
+            batch.append(i)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def test_hypothesis_batch(
+        self, hypotheses: List[str], data_summary: Dict[str, Any]
+    ) -> List[str]:
+        """
+        Test several hypotheses with one structured LLM call per batch.
+
+        The hypotheses are split into batches that fit the batch token budget,
+        so the data summary is sent once per batch rather than once per
+        hypothesis. Hypotheses missing from a batch response are tested
+        individually.
+
+        Args:
+            hypotheses: The hypotheses to test
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Hypothesis testing results as strings, in input order
+        """
+        summary_text = format_data_summary(data_summary)
+        results = [None] * len(hypotheses)
+
+        for batch in self.split_hypothesis_batches(hypotheses, summary_text):
+            batch_hypotheses = [hypotheses[i] for i in batch]
+            prompt = get_hypothesis_batch_testing_prompt(batch_hypotheses, summary_text)
+            parsed = _parse_batch_results(
+                self._invoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+            )
+
+            for number, i in enumerate(batch, 1):
+                if number in parsed:
+                    results[i] = _format_batch_result(parsed[number])
+                else:
+                    print(f"No batch result for hypothesis {i+1}; testing it alone")
+                    results[i] = self.test_hypothesis(hypotheses[i], data_summary)
+
+        return results
+
+    async def atest_hypothesis_batch(
+        self, hypotheses: List[str], data_summary: Dict[str, Any]
+    ) -> List[str]:
+        """
+        Test several hypotheses with one structured LLM call per batch,
+        asynchronously.
+
+        Args:
+            hypotheses: The hypotheses to test
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Hypothesis testing results as strings, in input order
+        """
+        summary_text = format_data_summary(data_summary)
+        results = [None] * len(hypotheses)
+
+        for batch in self.split_hypothesis_batches(hypotheses, summary_text):
+            batch_hypotheses = [hypotheses[i] for i in batch]
+            prompt = get_hypothesis_batch_testing_prompt(batch_hypotheses, summary_text)
+            parsed = _parse_batch_results(
+                await self._ainvoke(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+            )
+
+            for number, i in enumerate(batch, 1):
+                if number in parsed:
+                    results[i] = _format_batch_result(parsed[number])
+                else:
+                    print(f"No batch result for hypothesis {i+1}; testing it alone")
+                    results[i] = await self.atest_hypothesis(
+                        hypotheses[i], data_summary
+                    )
+
+        return results
 
     def analyze_specific_segment(self, segment_name: str) -> Dict[str, Any]:
         """
@@ -156,7 +807,127 @@ class DataAnalystAgent:
         return self.data_loader.analyze_discount_impact()
 
 
-class InsightGeneratorAgent:
+class ToolCallingAnalystAgent(BaseAgent):
+    """
+    Data analyst that answers questions by calling data tools.
+
+    Instead of the whole data summary, the model starts from a short
+    description of the dataset and requests exact figures through native
+    function calls, which run the data loader's (cached) analyses. The number
+    of tool round-trips per question is capped.
+    """
+
+    def __init__(
+        self,
+        data_loader: FinancialDataLoader,
+        deployment_name: str = "gpt-4o",
+        temperature: float = 0.0,
+        streaming: bool = False,
+        cache_manager: Optional[CacheManager] = None,
+        cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
+        max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    ):
+        """
+        Initialise the Tool-Calling Data Analyst Agent.
+
+        Args:
+            data_loader: FinancialDataLoader for the dataset the tools query
+            deployment_name: Name of the Azure OpenAI deployment
+            temperature: Temperature parameter for the LLM
+            streaming: Whether to stream output
+            cache_manager: Optional CacheManager for LLM responses
+            cache_max_temperature: Only cache responses when the temperature is
+                at most this value, or None to cache regardless of temperature
+            max_tool_rounds: Maximum number of tool round-trips per question
+        """
+        super().__init__(
+            deployment_name,
+            temperature,
+            streaming,
+            cache_manager=cache_manager,
+            cache_max_temperature=cache_max_temperature,
+        )
+
+        self.toolkit = AnalystToolkit(data_loader)
+        self.max_tool_rounds = max_tool_rounds
+        self.llm_with_tools = self.llm.bind_tools(self.toolkit.tools)
+
+        # The final round may not call tools, but the tools stay declared for
+        # the tool calls in the conversation
+        self.llm_answer_only = self.llm.bind_tools(
+            self.toolkit.tools, tool_choice="none"
+        )
+
+        self.stats = {"questions": 0, "tool_rounds": 0, "capped": 0}
+
+    def answer(self, question: str) -> str:
+        """
+        Answer a question, fetching figures with tools as needed.
+
+        Args:
+            question: User's question about the financial data
+
+        Returns:
+            Answer to the question
+        """
+        prompt = get_tool_analyst_prompt(question, self.toolkit.context())
+
+        cache_key = self._response_cache_key(TOOL_ANALYST_SYSTEM_PROMPT, prompt)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        messages = self._messages(TOOL_ANALYST_SYSTEM_PROMPT, prompt)
+        usage = None
+        rounds = 0
+
+        while True:
+            capped = rounds >= self.max_tool_rounds
+            if capped:
+                messages.append(HumanMessage(content=TOOL_LIMIT_MESSAGE))
+
+            response = self._call_model(
+                messages, self.llm_answer_only if capped else self.llm_with_tools
+            )
+            usage = _add_usage(usage, _token_usage(response))
+
+            tool_calls = getattr(response, "tool_calls", None)
+            if capped or not tool_calls:
+                break
+
+            # Run every tool call of the round and send the results back
+            rounds += 1
+            messages.append(response)
+            for tool_call in tool_calls:
+                messages.append(
+                    ToolMessage(
+                        content=self.toolkit.run(tool_call["name"], tool_call["args"]),
+                        tool_call_id=tool_call["id"],
+                    )
+                )
+
+        self.stats["questions"] += 1
+        self.stats["tool_rounds"] += rounds
+        self.stats["capped"] += int(capped)
+
+        self._record_prompt(TOOL_ANALYST_SYSTEM_PROMPT, prompt, usage)
+        self._cache_response(cache_key, response.content, usage)
+        return response.content
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get tool usage statistics.
+
+        Returns:
+            Dictionary with the number of questions answered, tool round-trips,
+            answers that hit the round-trip cap, and calls per tool
+        """
+        stats = dict(self.stats)
+        stats["tool_calls"] = self.toolkit.get_stats()
+        return stats
+
+
+class InsightGeneratorAgent(BaseAgent):
     """
     Agent responsible for generating insights from financial analysis.
     """
@@ -166,6 +937,8 @@ class InsightGeneratorAgent:
         deployment_name: str = "gpt-4o",
         temperature: float = 0.2,
         streaming: bool = True,
+        cache_manager: Optional[CacheManager] = None,
+        cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
     ):
         """
         Initialise the Insight Generator Agent.
@@ -174,24 +947,16 @@ class InsightGeneratorAgent:
             deployment_name: Name of the Azure OpenAI deployment
             temperature: Temperature parameter for the LLM
             streaming: Whether to stream output
+            cache_manager: Optional CacheManager for LLM responses
+            cache_max_temperature: Only cache responses when the temperature is
+                at most this value, or None to cache regardless of temperature
         """
-        # Get Azure OpenAI configuration from environment variables
-        azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-        azure_api_key = os.environ.get("AZURE_OPENAI_API_KEY")
-        api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2023-05-15")
-
-        if not azure_endpoint or not azure_api_key:
-            raise ValueError(
-                "Azure OpenAI credentials not found in environment variables"
-            )
-
-        self.llm = AzureChatOpenAI(
-            azure_deployment=deployment_name,
-            openai_api_version=api_version,
-            azure_endpoint=azure_endpoint,
-            api_key=azure_api_key,
-            temperature=temperature,
-            streaming=streaming,
+        super().__init__(
+            deployment_name,
+            temperature,
+            streaming,
+            cache_manager=cache_manager,
+            cache_max_temperature=cache_max_temperature,
         )
 
     def generate_insights(self, task: str, analysis_results: str) -> str:
@@ -209,13 +974,69 @@ class InsightGeneratorAgent:
         prompt = get_insight_prompt_with_task(task, analysis_results)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=INSIGHT_GENERATOR_SYSTEM_PROMPT),
-            HumanMessage(content=prompt),
-        ]
+        return self._invoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
-        response = self.llm(messages)
-        return response.content
+    async def agenerate_insights(self, task: str, analysis_results: str) -> str:
+        """
+        Generate insights based on analysis results asynchronously.
+
+        Args:
+            task: Description of the insight generation task
+            analysis_results: String containing analysis results
+
+        Returns:
+            Generated insights as a string
+        """
+        prompt = get_insight_prompt_with_task(task, analysis_results)
+        return await self._ainvoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
+
+    def generate_insights_stream(
+        self, task: str, analysis_results: str
+    ) -> Iterator[str]:
+        """
+        Generate insights based on analysis results, streaming them.
+
+        Args:
+            task: Description of the insight generation task
+            analysis_results: String containing analysis results
+
+        Yields:
+            Chunks of the generated insights
+        """
+        prompt = get_insight_prompt_with_task(task, analysis_results)
+        yield from self._stream(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
+
+    def answer_question(self, question: str, data_summary: Dict[str, Any]) -> str:
+        """
+        Answer a question about the financial data.
+
+        Args:
+            question: User's question about the financial data
+            data_summary: Dictionary containing the data summary relevant to
+                the question
+
+        Returns:
+            Answer to the question
+        """
+        prompt = get_insight_question_prompt(question, data_summary)
+        return self._invoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
+
+    def answer_question_stream(
+        self, question: str, data_summary: Dict[str, Any]
+    ) -> Iterator[str]:
+        """
+        Answer a question about the financial data, streaming the answer.
+
+        Args:
+            question: User's question about the financial data
+            data_summary: Dictionary containing the data summary relevant to
+                the question
+
+        Yields:
+            Chunks of the answer
+        """
+        prompt = get_insight_question_prompt(question, data_summary)
+        yield from self._stream(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
     def generate_hypotheses(self, data_summary: Dict[str, Any]) -> str:
         """
@@ -231,13 +1052,20 @@ class InsightGeneratorAgent:
         prompt = get_hypothesis_generation_prompt(data_summary)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=INSIGHT_GENERATOR_SYSTEM_PROMPT),
-            HumanMessage(content=prompt),
-        ]
+        return self._invoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
-        response = self.llm(messages)
-        return response.content
+    async def agenerate_hypotheses(self, data_summary: Dict[str, Any]) -> str:
+        """
+        Generate hypotheses based on data summary asynchronously.
+
+        Args:
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Generated hypotheses as a string
+        """
+        prompt = get_hypothesis_generation_prompt(data_summary)
+        return await self._ainvoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
     def synthesize_insights(
         self, hypothesis_results: str, data_summary: Dict[str, Any]
@@ -256,13 +1084,23 @@ class InsightGeneratorAgent:
         prompt = get_insight_synthesis_prompt(hypothesis_results, data_summary)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=INSIGHT_GENERATOR_SYSTEM_PROMPT),
-            HumanMessage(content=prompt),
-        ]
+        return self._invoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
-        response = self.llm(messages)
-        return response.content
+    async def asynthesize_insights(
+        self, hypothesis_results: str, data_summary: Dict[str, Any]
+    ) -> str:
+        """
+        Synthesize insights from hypothesis testing results asynchronously.
+
+        Args:
+            hypothesis_results: String containing hypothesis testing results
+            data_summary: Dictionary containing data summary
+
+        Returns:
+            Synthesized insights as a string
+        """
+        prompt = get_insight_synthesis_prompt(hypothesis_results, data_summary)
+        return await self._ainvoke(INSIGHT_GENERATOR_SYSTEM_PROMPT, prompt)
 
 
 def create_data_analyst_agent_with_tools(
@@ -292,11 +1130,12 @@ def create_data_analyst_agent_with_tools(
         raise ValueError("Azure OpenAI credentials not found in environment variables")
 
     # Setup the LLM
-    llm = AzureChatOpenAI(
-        azure_deployment=deployment_name,
-        openai_api_version=api_version,
-        azure_endpoint=azure_endpoint,
+    llm = llm_clients.get_chat_model(
+        AzureChatOpenAI,
+        endpoint=azure_endpoint,
         api_key=azure_api_key,
+        api_version=api_version,
+        deployment_name=deployment_name,
         temperature=temperature,
         streaming=streaming,
     )
@@ -360,7 +1199,7 @@ from langchain.schema import HumanMessage, SystemMessage
 from langchain_openai import AzureChatOpenAI
 
 
-class HypothesisGeneratorAgent:
+class HypothesisGeneratorAgent(BaseAgent):
     """
     Agent specialised in generating high-quality, testable hypotheses from financial data.
     """
@@ -370,6 +1209,8 @@ class HypothesisGeneratorAgent:
         deployment_name: str = "gpt-4o",
         temperature: float = 0.7,  # Higher temperature for more creative hypotheses
         streaming: bool = True,
+        cache_manager: Optional[CacheManager] = None,
+        cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
     ):
         """
         Initialise the Hypothesis Generator Agent.
@@ -378,53 +1219,20 @@ class HypothesisGeneratorAgent:
             deployment_name: Name of the Azure OpenAI deployment
             temperature: Temperature parameter for the LLM
             streaming: Whether to stream output
+            cache_manager: Optional CacheManager for LLM responses
+            cache_max_temperature: Only cache responses when the temperature is
+                at most this value, or None to cache regardless of temperature
         """
-        # Get Azure OpenAI configuration from environment variables
-        azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-        azure_api_key = os.environ.get("AZURE_OPENAI_API_KEY")
-        api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2023-05-15")
-
-        if not azure_endpoint or not azure_api_key:
-            raise ValueError(
-                "Azure OpenAI credentials not found in environment variables"
-            )
-
-        self.llm = AzureChatOpenAI(
-            azure_deployment=deployment_name,
-            openai_api_version=api_version,
-            azure_endpoint=azure_endpoint,
-            api_key=azure_api_key,
-            temperature=temperature,
-            streaming=streaming,
+        super().__init__(
+            deployment_name,
+            temperature,
+            streaming,
+            cache_manager=cache_manager,
+            cache_max_temperature=cache_max_temperature,
         )
 
-        # Define the system prompt for hypothesis generation
-        self.system_prompt = """You are a Hypothesis Generator specialising in creating well-formed, testable hypotheses about financial data.
-
-YOUR CAPABILITIES:
-1. Formulating specific, testable hypotheses based on financial data patterns
-2. Identifying potential causal relationships within business data
-3. Creating diverse hypotheses that cover multiple aspects of business performance
-4. Prioritizing hypotheses with high potential business value
-5. Structuring hypotheses to be clearly testable with available data
-
-YOUR GUIDELINES:
-1. Generate exactly 3-5 high-quality hypotheses, not more or less
-2. Each hypothesis should be specific, concise, and testable
-3. Hypotheses should cover diverse aspects of the business (don't focus on just one area)
-4. For each hypothesis, provide a clear rationale based on observed data patterns
-5. Explain why confirming or rejecting each hypothesis would be valuable
-6. Consider counter-intuitive or unexpected relationships that might yield novel insights
-7. Avoid hypotheses that are too obvious or would provide little business value
-8. Format hypotheses to be directly testable by an analyst
-
-RESPONSE FORMAT:
-For each hypothesis:
-1. [HYPOTHESIS]: A clear, specific statement that can be tested
-2. [RATIONALE]: Why you've formulated this hypothesis based on the data
-3. [TEST APPROACH]: How this hypothesis could be tested with the available data
-4. [BUSINESS IMPACT]: Why confirming or rejecting this hypothesis would be valuable
-"""
+        # System prompt for hypothesis generation
+        self.system_prompt = HYPOTHESIS_GENERATOR_SYSTEM_PROMPT
 
     def generate_hypotheses(
         self, data_summary: Dict[str, Any], initial_analysis: str
@@ -443,58 +1251,102 @@ For each hypothesis:
         prompt = self._create_hypothesis_prompt(data_summary, initial_analysis)
 
         # Call the LLM
-        messages = [
-            SystemMessage(content=self.system_prompt),
-            HumanMessage(content=prompt),
-        ]
-
-        response = self.llm(messages)
+        response = self._invoke(self.system_prompt, prompt)
 
         # Parse the response into structured hypotheses
-        hypotheses = self._parse_hypotheses(response.content)
+        hypotheses = self._parse_hypotheses(response)
 
         return hypotheses
 
-    def _create_hypothesis_prompt(
+    async def agenerate_hypotheses(
         self, data_summary: Dict[str, Any], initial_analysis: str
-    ) -> str:
+    ) -> List[Dict[str, Any]]:
         """
-        Create a prompt for hypothesis generation.
+        Generate 3-5 hypotheses asynchronously.
 
         Args:
             data_summary: Dictionary containing data summary
-            initial_analysis: String containing initial analysis
+            initial_analysis: String containing initial analysis of the data
 
         Returns:
-            Formatted prompt string
+            List of generated hypotheses with rationales
         """
-        # Convert data summary to JSON string
-        data_summary_str = json.dumps(data_summary, indent=2)
+        prompt = self._create_hypothesis_prompt(data_summary, initial_analysis)
+        response = await self._ainvoke(self.system_prompt, prompt)
+        return self._parse_hypotheses(response)
 
-        prompt = f"""Please generate 3-5 high-quality, testable hypotheses based on the following financial data summary and initial analysis.
+    def generate_hypotheses_stream(
+        self, data_summary: Dict[str, Any], initial_analysis: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate hypotheses, yielding each one as soon as the model has
+        finished writing it.
 
-DATA SUMMARY:
-{data_summary_str}
+        Args:
+            data_summary: Dictionary containing data summary
+            initial_analysis: String containing initial analysis of the data
 
-INITIAL ANALYSIS:
-{initial_analysis}
+        Yields:
+            Generated hypotheses with rationales
+        """
+        prompt = self._create_hypothesis_prompt(data_summary, initial_analysis)
+        parser = HypothesisStreamParser()
+        chunks = []
+        parsed = False
 
-For each hypothesis:
-1. Ensure it is specific and directly testable with the available data
-2. Provide a clear rationale that explains why you believe this hypothesis is worth investigating
-3. Suggest a concrete approach for testing this hypothesis
-4. Explain the potential business impact if the hypothesis is confirmed or rejected
+        for chunk in self._stream(self.system_prompt, prompt):
+            chunks.append(chunk)
+            for hypothesis in parser.feed(chunk):
+                parsed = True
+                yield hypothesis
 
-Focus on creating diverse hypotheses that could lead to actionable business insights. Consider relationships between:
-- Different segments and their profitability
-- Discount strategies and profit margins
-- Regional performance variations
-- Product pricing and sales volume
-- Seasonal patterns and their business implications
+        if not parsed:
+            # The model ignored the JSON Lines format
+            yield from self._parse_hypotheses("".join(chunks))
 
-Generate hypotheses that challenge assumptions and could reveal non-obvious patterns in the data.
-"""
-        return prompt
+    async def agenerate_hypotheses_stream(
+        self, data_summary: Dict[str, Any], initial_analysis: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate hypotheses asynchronously, yielding each one as soon as the
+        model has finished writing it.
+
+        Args:
+            data_summary: Dictionary containing data summary
+            initial_analysis: String containing initial analysis of the data
+
+        Yields:
+            Generated hypotheses with rationales
+        """
+        prompt = self._create_hypothesis_prompt(data_summary, initial_analysis)
+        parser = HypothesisStreamParser()
+        chunks = []
+        parsed = False
+
+        async for chunk in self._astream(self.system_prompt, prompt):
+            chunks.append(chunk)
+            for hypothesis in parser.feed(chunk):
+                parsed = True
+                yield hypothesis
+
+        if not parsed:
+            for hypothesis in self._parse_hypotheses("".join(chunks)):
+                yield hypothesis
+
+    def _create_hypothesis_prompt(
+        self, data_summary: Dict[str, Any], initial_analysis: str
+    ) -> str:
+        """
+        Create a prompt for hypothesis generation.
+
+        Args:
+            data_summary: Dictionary containing data summary
+            initial_analysis: String containing initial analysis
+
+        Returns:
+            Formatted prompt string
+        """
+        return get_hypothesis_prompt(data_summary, initial_analysis)
 
     def _parse_hypotheses(self, response_text: str) -> List[Dict[str, Any]]:
         """
@@ -506,8 +1358,12 @@ Generate hypotheses that challenge assumptions and could reveal non-obvious patt
         Returns:
             List of parsed hypotheses
         """
-        hypotheses = []
+        # Structured output, as the system prompt asks for
+        hypotheses = HypothesisStreamParser().feed(response_text)
+        if hypotheses:
+            return hypotheses
 
+        # Otherwise scrape the free-text format of older prompts
         # Split the text into sections for each hypothesis
         # This uses a simple pattern matching approach that looks for numbered hypotheses
         hypothesis_sections = []
@@ -651,3 +1507,158 @@ Generate hypotheses that challenge assumptions and could reveal non-obvious patt
             )
 
         return hypotheses
+
+
+class HypothesisStreamParser:
+    """
+    Incremental parser for hypotheses written as JSON Lines.
+
+    Text is scanned for complete top-level JSON objects as it arrives, so each
+    hypothesis is returned as soon as its closing brace is seen, even if the
+    model spread it over several lines. Text outside objects (such as code
+    fences) and objects without a hypothesis statement are ignored.
+    """
+
+    def __init__(self):
+        """
+        Initialise the HypothesisStreamParser.
+        """
+        self.current = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """
+        Add streamed text.
+
+        Args:
+            text: Next chunk of the response
+
+        Returns:
+            Hypotheses completed by this chunk, in order
+        """
+        hypotheses = []
+
+        for char in text:
+            if self.depth == 0:
+                if char != "{":
+                    continue
+                self.current = []
+            self.current.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    hypothesis = _structured_hypothesis("".join(self.current))
+                    if hypothesis is not None:
+                        hypotheses.append(hypothesis)
+
+        return hypotheses
+
+
+def _structured_hypothesis(text: str) -> Optional[Dict[str, str]]:
+    """Hypothesis from one JSON object, or None if it is not a hypothesis."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+
+    if not isinstance(value, dict) or not str(value.get("hypothesis") or "").strip():
+        return None
+
+    return {field: str(value.get(field) or "").strip() for field in HYPOTHESIS_FIELDS}
+
+
+def _count_tokens(messages: List[BaseMessage], output: str) -> int:
+    """Tokens of the messages sent and the output received for an LLM call."""
+    return sum(count_tokens(str(message.content)) for message in messages) + (
+        count_tokens(output)
+    )
+
+
+def _token_usage(message: Any) -> Optional[Dict[str, int]]:
+    """Token usage reported on an LLM response or chunk, if any."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+            "cached_tokens": (usage.get("input_token_details") or {}).get(
+                "cache_read", 0
+            ),
+        }
+
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    if usage:
+        return {
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get(
+                "cached_tokens", 0
+            ),
+        }
+
+    return None
+
+
+def _parse_batch_results(response_text: str) -> Dict[int, Dict[str, Any]]:
+    """Per-hypothesis results of a batch test response, keyed by hypothesis number."""
+    start = response_text.find("{")
+    end = response_text.rfind("}")
+    if start < 0 or end < start:
+        print("Batch hypothesis test response contained no JSON")
+        return {}
+
+    try:
+        parsed = json.loads(response_text[start : end + 1])
+    except json.JSONDecodeError as e:
+        print(f"Error parsing batch hypothesis test response: {e}")
+        return {}
+
+    results = {}
+    for entry in parsed.get("results", []) if isinstance(parsed, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            number = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        results[number] = entry
+
+    return results
+
+
+def _format_batch_result(result: Dict[str, Any]) -> str:
+    """Render a structured hypothesis test result as text."""
+    verdict = str(result.get("verdict") or "inconclusive").upper()
+    lines = [f"VERDICT: {verdict}"]
+    for section in BATCH_RESULT_SECTIONS:
+        value = result.get(section)
+        if value:
+            lines.append(f"\n{section.upper()}:\n{str(value).strip()}")
+    return "\n".join(lines)
+
+
+def _add_usage(
+    total: Optional[Dict[str, int]], usage: Optional[Dict[str, int]]
+) -> Optional[Dict[str, int]]:
+    """Sum the token usage of several calls."""
+    if usage is None:
+        return total
+    if total is None:
+        return dict(usage)
+    return {key: total.get(key, 0) + value for key, value in usage.items()}
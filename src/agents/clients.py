@@ -0,0 +1,221 @@
+"""
+LLM Client Registry module for Financial Analysis System.
+
+Shares chat model clients and their keep-alive HTTP connection pools across
+agents, controllers and requests in a process.
+"""
+
+import asyncio
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of chat model clients.
+
+    Clients are keyed by endpoint, credentials, API version, deployment,
+    temperature, streaming mode and retry setting, so agents with the same
+    settings share one client and re-initialised controllers pick up the
+    clients of their predecessors. All clients for an endpoint share one pair
+    of keep-alive HTTP connection pools (sync and async), so warm connections
+    survive dataset changes.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 120.0,
+        connect_timeout: float = 10.0,
+    ):
+        """
+        Initialise the LLMClientRegistry.
+
+        Args:
+            max_connections: Maximum number of connections per endpoint pool
+            max_keepalive_connections: Maximum number of idle connections kept
+                open per endpoint pool
+            keepalive_expiry: Time in seconds an idle connection is kept open
+            timeout: Timeout in seconds for reading a response
+            connect_timeout: Timeout in seconds for establishing a connection
+        """
+        self.lock = threading.Lock()
+        self.http_clients = {}
+        self.models = {}
+        self.stats = {"created": 0, "reused": 0}
+        self.configure(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+        )
+
+    def configure(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Update the connection pool settings. Pools created earlier keep their
+        settings until the registry is closed.
+
+        Args:
+            max_connections: Maximum number of connections per endpoint pool
+            max_keepalive_connections: Maximum number of idle connections kept
+                open per endpoint pool
+            keepalive_expiry: Time in seconds an idle connection is kept open
+            timeout: Timeout in seconds for reading a response
+            connect_timeout: Timeout in seconds for establishing a connection
+        """
+        with self.lock:
+            if max_connections is not None:
+                self.max_connections = max_connections
+            if max_keepalive_connections is not None:
+                self.max_keepalive_connections = max_keepalive_connections
+            if keepalive_expiry is not None:
+                self.keepalive_expiry = keepalive_expiry
+            if timeout is not None:
+                self.timeout = timeout
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+
+    def get_chat_model(
+        self,
+        factory: Callable[..., Any],
+        endpoint: str,
+        api_key: str,
+        api_version: str,
+        deployment_name: str,
+        temperature: float,
+        streaming: bool,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """
+        Get a shared chat model client, creating it if needed.
+
+        Args:
+            factory: Chat model class (e.g. AzureChatOpenAI)
+            endpoint: Azure OpenAI endpoint
+            api_key: Azure OpenAI API key
+            api_version: Azure OpenAI API version
+            deployment_name: Name of the Azure OpenAI deployment
+            temperature: Temperature parameter for the LLM
+            streaming: Whether to stream output
+            max_retries: Number of retries made by the client itself, or None
+                for the client's default
+
+        Returns:
+            Chat model client
+        """
+        key = (
+            factory,
+            endpoint,
+            hashlib.sha256(api_key.encode()).hexdigest(),
+            api_version,
+            deployment_name,
+            temperature,
+            streaming,
+            max_retries,
+        )
+
+        with self.lock:
+            model = self.models.get(key)
+            if model is not None:
+                self.stats["reused"] += 1
+                return model
+
+            http_client, http_async_client = self._http_clients(endpoint)
+            options = {} if max_retries is None else {"max_retries": max_retries}
+            model = factory(
+                azure_deployment=deployment_name,
+                openai_api_version=api_version,
+                azure_endpoint=endpoint,
+                api_key=api_key,
+                temperature=temperature,
+                streaming=streaming,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **options,
+            )
+
+            self.models[key] = model
+            self.stats["created"] += 1
+            return model
+
+    def close(self) -> None:
+        """
+        Close all connection pools and forget all clients.
+        """
+        with self.lock:
+            http_clients = list(self.http_clients.values())
+            self.http_clients = {}
+            self.models = {}
+
+        for http_client, http_async_client in http_clients:
+            http_client.close()
+            try:
+                asyncio.run(http_async_client.aclose())
+            except RuntimeError:
+                # Called from a running event loop; the pool is garbage collected
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get registry statistics.
+
+        Returns:
+            Dictionary with the pool settings, the number of endpoints and
+            clients, and how often clients were created and reused
+        """
+        with self.lock:
+            return {
+                "endpoints": len(self.http_clients),
+                "clients": len(self.models),
+                "created": self.stats["created"],
+                "reused": self.stats["reused"],
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+                "timeout": self.timeout,
+                "connect_timeout": self.connect_timeout,
+            }
+
+    def _http_clients(self, endpoint: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """
+        Get the connection pools for an endpoint. Caller holds the lock.
+
+        Args:
+            endpoint: Azure OpenAI endpoint
+
+        Returns:
+            Tuple of the sync and async HTTP clients
+        """
+        clients = self.http_clients.get(endpoint)
+        if clients is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+            clients = (
+                httpx.Client(limits=limits, timeout=timeout),
+                httpx.AsyncClient(limits=limits, timeout=timeout),
+            )
+            self.http_clients[endpoint] = clients
+
+        return clients
+
+
+# Clients shared by all agents in the process
+llm_clients = LLMClientRegistry()
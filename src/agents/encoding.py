@@ -0,0 +1,301 @@
+"""
+Summary Encoding module for Financial Analysis System.
+
+Encodes data summaries for prompts as compact tables instead of indented JSON,
+and keeps them within a token budget by dropping low-priority sections.
+"""
+
+import json
+import numbers
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Encoding used to count tokens for GPT-4o deployments
+TOKEN_ENCODING = "o200k_base"
+
+# Characters per token assumed when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Summary sections in the order they are dropped to meet a token budget.
+# Sections that are not listed are dropped before all of these, except
+# question-specific drill-downs (see FOCUS_PREFIX), which are dropped last; the
+# overview of scalar values is always kept.
+SECTION_PRIORITY = (
+    "missing_values",
+    "columns",
+    "monthly_analysis",
+    "discount_analysis",
+    "country_analysis",
+    "product_analysis",
+    "segment_analysis",
+)
+
+# Prefix of the drill-down sections built for a specific question
+FOCUS_PREFIX = "focus_"
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Uses tiktoken when it is installed and its encoding can be loaded, and
+    otherwise estimates the count from the length of the text.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Number of tokens
+    """
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                if tiktoken is not None:
+                    try:
+                        _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                    except Exception as e:
+                        # The encoding is downloaded on first use
+                        print(f"Token encoding unavailable, estimating counts: {e}")
+                _encoding_loaded = True
+
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class SummaryEncoder:
+    """
+    Encodes data summaries as compact, token-budgeted text.
+
+    Each list of records (e.g. the segment breakdown) is written once as a
+    header followed by one row per record, numbers are rounded, and scalar
+    values are collected in an overview line. When the result exceeds the
+    token budget, whole sections are dropped in SECTION_PRIORITY order.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        """
+        Initialise the SummaryEncoder.
+
+        Args:
+            token_budget: Maximum number of tokens for an encoded summary, or
+                None for no limit
+        """
+        self.token_budget = token_budget
+        self.lock = threading.Lock()
+        self.stats = {
+            "summaries": 0,
+            "json_tokens": 0,
+            "compact_tokens": 0,
+            "dropped_sections": 0,
+        }
+        self.last_report = None
+
+    def encode(self, data_summary: Dict[str, Any]) -> str:
+        """
+        Encode a data summary for a prompt.
+
+        Args:
+            data_summary: Dictionary containing data summary information
+
+        Returns:
+            Compact text representation of the summary
+        """
+        return self.encode_with_report(data_summary)[0]
+
+    def encode_with_report(
+        self, data_summary: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Encode a data summary and report the token savings.
+
+        Args:
+            data_summary: Dictionary containing data summary information
+
+        Returns:
+            Tuple of the encoded summary and a report with the token counts of
+            the indented JSON and compact encodings and the dropped sections
+        """
+        overview = {}
+        sections = {}
+        for name, value in data_summary.items():
+            if _is_scalar(value):
+                overview[name] = value
+            else:
+                sections[name] = value
+
+        # Lowest priority first
+        drop_order = sorted(sections, key=_section_priority)
+
+        kept = list(sections)
+        dropped = []
+        text = self._render(overview, sections, kept, dropped)
+        tokens = count_tokens(text)
+
+        while (
+            self.token_budget is not None and tokens > self.token_budget and drop_order
+        ):
+            name = drop_order.pop(0)
+            kept.remove(name)
+            dropped.append(name)
+            text = self._render(overview, sections, kept, dropped)
+            tokens = count_tokens(text)
+
+        report = {
+            "json_tokens": count_tokens(
+                json.dumps(data_summary, indent=2, default=str)
+            ),
+            "compact_tokens": tokens,
+            "token_budget": self.token_budget,
+            "dropped_sections": dropped,
+        }
+
+        with self.lock:
+            self.stats["summaries"] += 1
+            self.stats["json_tokens"] += report["json_tokens"]
+            self.stats["compact_tokens"] += tokens
+            self.stats["dropped_sections"] += len(dropped)
+            self.last_report = report
+
+        return text, report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cumulative encoding statistics.
+
+        Returns:
+            Dictionary with the number of summaries encoded, their total token
+            counts as indented JSON and as compact text, the number of sections
+            dropped, and the report for the most recent summary
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats["token_budget"] = self.token_budget
+            stats["tokens_saved"] = stats["json_tokens"] - stats["compact_tokens"]
+            stats["last_report"] = self.last_report
+            return stats
+
+    def _render(
+        self,
+        overview: Dict[str, Any],
+        sections: Dict[str, Any],
+        kept: List[str],
+        dropped: List[str],
+    ) -> str:
+        """
+        Render the overview and the kept sections, in their original order.
+
+        Args:
+            overview: Scalar summary values
+            sections: Non-scalar summary values by name
+            kept: Names of the sections to include
+            dropped: Names of the sections left out
+
+        Returns:
+            Encoded summary
+        """
+        lines = []
+        if overview:
+            lines.append("OVERVIEW")
+            lines.append(
+                " | ".join(
+                    f"{name}: {_format_value(value)}"
+                    for name, value in overview.items()
+                )
+            )
+
+        for name in kept:
+            lines.append("")
+            lines.extend(_render_section(name, sections[name]))
+
+        if dropped:
+            lines.append("")
+            lines.append(f"(omitted to fit the prompt: {', '.join(dropped)})")
+
+        return "\n".join(lines)
+
+
+def _section_priority(name: str) -> int:
+    """Drop priority of a section; lower values are dropped first."""
+    if name.startswith(FOCUS_PREFIX):
+        return len(SECTION_PRIORITY)
+    if name in SECTION_PRIORITY:
+        return SECTION_PRIORITY.index(name)
+    return -1
+
+
+def _render_section(name: str, value: Any) -> List[str]:
+    """Render one summary section as a title followed by compact rows."""
+    title = name.replace("_", " ").upper()
+
+    if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        # Header plus one row per record
+        columns = []
+        for record in value:
+            columns.extend(key for key in record if key not in columns)
+
+        lines = [f"{title} ({' | '.join(columns)})"]
+        for record in value:
+            lines.append(
+                " | ".join(_format_value(record.get(column, "")) for column in columns)
+            )
+        return lines
+
+    if isinstance(value, list):
+        return [title, ", ".join(_format_value(v) for v in value)]
+
+    if isinstance(value, dict) and all(_is_scalar(v) for v in value.values()):
+        if name == "missing_values":
+            # Only columns with gaps are worth the tokens
+            missing = {k: v for k, v in value.items() if v}
+            if not missing:
+                return [title, "none"]
+            return [
+                title,
+                ", ".join(f"{k}: {_format_value(v)}" for k, v in missing.items())
+                + " (all other columns complete)",
+            ]
+
+        return [title, ", ".join(f"{k}: {_format_value(v)}" for k, v in value.items())]
+
+    return [title, json.dumps(value, separators=(",", ":"), default=str)]
+
+
+def _is_scalar(value: Any) -> bool:
+    """Whether a value is written inline rather than as its own section."""
+    return value is None or isinstance(value, (str, numbers.Number))
+
+
+def _format_value(value: Any) -> str:
+    """Format a value with rounding suited to financial figures."""
+    if isinstance(value, bool) or value is None:
+        return str(value)
+
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if value != value:
+            return "NaN"
+        if abs(value) >= 1000 or value.is_integer():
+            return str(int(round(value)))
+        return f"{value:.2f}"
+
+    return str(value)
+
+
+# Encoder used by the prompt templates
+summary_encoder = SummaryEncoder()
@@ -0,0 +1,842 @@
+"""
+Fake LLM Server module for Financial Analysis System.
+
+A local stand-in for Azure OpenAI that speaks the chat completions protocol,
+including streaming, so agents and the Flask app can be load tested without
+using any quota. Latency, generation speed and failures are simulated, and
+responses can be canned or replayed from a saved interaction log.
+
+Both URL layouts are served:
+    POST /openai/deployments/<deployment>/chat/completions   (Azure OpenAI)
+    POST /v1/chat/completions                                (OpenAI)
+    GET  /stats                                              (server statistics)
+
+Run the server with:
+    python -m src.agents.fake_server --address 127.0.0.1:8001
+
+and point the app at it with AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8001 and
+any AZURE_OPENAI_API_KEY.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from src.agents.encoding import count_tokens
+
+# Request path of an Azure OpenAI chat completion
+AZURE_COMPLETIONS_PATH = re.compile(r"/openai/deployments/([^/]+)/chat/completions")
+
+# Request paths of an OpenAI chat completion
+OPENAI_COMPLETIONS_PATHS = ("/v1/chat/completions", "/chat/completions")
+
+# Pieces streamed as one chunk: a word and the whitespace after it
+STREAM_PIECE = re.compile(r"\s*\S+\s*|\s+")
+
+# Settings that can be overridden per deployment
+PROFILE_SETTINGS = ("latency", "tokens_per_second", "error_rate", "stall_rate")
+
+# Text repeated to fill default responses
+FILLER_TEXT = (
+    "This is a simulated response from the local stand-in LLM server. "
+    "Segment, country and product figures are not computed here. "
+)
+
+# Hypotheses returned when a hypothesis generator prompt has no canned response
+DEFAULT_HYPOTHESIS_COUNT = 4
+
+
+class LatencyDistribution:
+    """
+    Distribution of the time to first token, in seconds.
+
+    Written as "kind:params", for example "fixed:0.5", "uniform:0.2,1.5",
+    "normal:0.8,0.2" (mean, standard deviation) or "lognormal:0.8,0.5"
+    (median, sigma). A bare number is a fixed latency.
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, kind: str = "fixed", params: Tuple[float, ...] = (0.0,)):
+        """
+        Initialise the LatencyDistribution.
+
+        Args:
+            kind: "fixed", "uniform", "normal" or "lognormal"
+            params: Parameters of the distribution
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(
+                f"{kind} latency takes {self.KINDS[kind]} parameter(s), got {len(params)}"
+            )
+
+        self.kind = kind
+        self.params = tuple(params)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Parse a latency specification.
+
+        Args:
+            spec: Specification such as "lognormal:0.8,0.5" or "0.2"
+
+        Returns:
+            Latency distribution
+        """
+        kind, _, params = spec.partition(":")
+        if not params:
+            return cls("fixed", (float(kind),))
+        return cls(kind, tuple(float(param) for param in params.split(",")))
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draw a latency.
+
+        Args:
+            rng: Random number generator
+
+        Returns:
+            Latency in seconds, never negative
+        """
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+        return max(0.0, value)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(str(param) for param in self.params)}"
+
+
+class FakeLLMServer:
+    """
+    Chat completions server that simulates an Azure OpenAI deployment.
+
+    Each request waits for a time to first token drawn from the latency
+    distribution, then produces its response at a fixed token rate, streamed
+    word by word when the client asks for a stream. Injected failures are
+    drawn per request: HTTP errors (429 responses carry Retry-After), stalls
+    that outlast client timeouts, and connections dropped mid-response.
+
+    Responses come from rules matched against the prompt, in order; prompts
+    without a matching rule get a default response shaped like the one the
+    requesting agent expects.
+    """
+
+    def __init__(
+        self,
+        address: str = "127.0.0.1:8001",
+        latency: str = "fixed:0.2",
+        tokens_per_second: float = 50.0,
+        error_rate: float = 0.0,
+        error_statuses: Tuple[int, ...] = (429, 500, 503),
+        retry_after: float = 1.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 30.0,
+        disconnect_rate: float = 0.0,
+        responses: Optional[List[Dict[str, Any]]] = None,
+        response_tokens: int = 200,
+        profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialise the FakeLLMServer.
+
+        Args:
+            address: Address to listen on ("host:port"; port 0 picks a free port)
+            latency: Time to first token (see LatencyDistribution)
+            tokens_per_second: Generation speed after the first token, or 0
+                for no delay
+            error_rate: Fraction of requests answered with an HTTP error
+            error_statuses: Status codes injected errors are drawn from
+            retry_after: Retry-After seconds sent with injected 429 responses
+            stall_rate: Fraction of requests that stall before responding
+            stall_seconds: How long stalled requests wait
+            disconnect_rate: Fraction of requests whose connection is dropped
+                halfway through the response
+            responses: Canned response rules, each with a "response" and either
+                a "pattern" (regular expression) or "contains" (text) matched
+                against the prompt; see load_responses
+            response_tokens: Approximate length of default responses, in tokens
+            profiles: Settings for specific deployments, mapping deployment
+                names to any of "latency", "tokens_per_second", "error_rate"
+                and "stall_rate"
+            seed: Seed for the random draws, for reproducible runs
+        """
+        self.address = address
+        self.settings = {
+            "latency": LatencyDistribution.parse(latency),
+            "tokens_per_second": tokens_per_second,
+            "error_rate": error_rate,
+            "stall_rate": stall_rate,
+        }
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.stall_seconds = stall_seconds
+        self.disconnect_rate = disconnect_rate
+        self.responses = [_compile_rule(rule) for rule in responses or []]
+        self.response_tokens = response_tokens
+
+        self.profiles = {}
+        for deployment, profile in (profiles or {}).items():
+            unknown = set(profile) - set(PROFILE_SETTINGS)
+            if unknown:
+                raise ValueError(f"Unknown profile settings: {sorted(unknown)}")
+            profile = dict(profile)
+            if "latency" in profile:
+                profile["latency"] = LatencyDistribution.parse(profile["latency"])
+            self.profiles[deployment] = profile
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.url = None
+        self.deployments = {}
+
+    @staticmethod
+    def load_responses(path: str) -> List[Dict[str, Any]]:
+        """
+        Load canned response rules from a JSON file.
+
+        The file holds either a list of rules or an interaction log saved by
+        the controller (output/interaction_log.json). Each logged interaction
+        becomes a rule that replays its output for prompts containing its
+        input.
+
+        Args:
+            path: Path to the JSON file
+
+        Returns:
+            List of response rules
+        """
+        with open(path) as f:
+            entries = json.load(f)
+
+        rules = []
+        for entry in entries:
+            if "response" in entry:
+                rules.append(entry)
+                continue
+
+            key = _replay_key(entry.get("input"))
+            if key:
+                rules.append(
+                    {
+                        "contains": key,
+                        "response": _replay_text(entry.get("output")),
+                        "replayed": True,
+                    }
+                )
+
+        return rules
+
+    def serve_forever(self) -> None:
+        """
+        Listen for requests until shutdown() is called.
+        """
+        if self.server is None:
+            self._bind()
+
+        print(f"Fake LLM server listening on {self.url}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def start(self) -> str:
+        """
+        Serve requests on a background thread.
+
+        Returns:
+            Base URL of the server, to use as the Azure OpenAI endpoint
+        """
+        self._bind()
+        self.thread = threading.Thread(
+            target=self.serve_forever, name="fake-llm-server", daemon=True
+        )
+        self.thread.start()
+        return self.url
+
+    def shutdown(self) -> None:
+        """
+        Stop serving requests.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get server statistics per deployment.
+
+        Returns:
+            Dictionary mapping deployment names to their request counts,
+            injected failures, replayed responses, token totals and average
+            simulated latency
+        """
+        with self.lock:
+            deployments = {}
+            for deployment, stats in sorted(self.deployments.items()):
+                summary = dict(stats, errors=dict(stats["errors"]))
+                requests = stats["requests"]
+                summary["avg_latency"] = (
+                    stats["total_latency"] / requests if requests else 0.0
+                )
+                deployments[deployment] = summary
+
+            return deployments
+
+    def _bind(self) -> None:
+        """Create the HTTP server and work out its URL."""
+        host, _, port = self.address.rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid fake LLM server address: {self.address}")
+
+        fake = self
+
+        class Handler(_CompletionsHandler):
+            server_fake = fake
+
+        ThreadingHTTPServer.daemon_threads = True
+        ThreadingHTTPServer.allow_reuse_address = True
+        self.server = ThreadingHTTPServer((host, int(port)), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def _handle_completion(
+        self, handler: BaseHTTPRequestHandler, deployment: str, body: Dict[str, Any]
+    ) -> None:
+        """
+        Answer a chat completion request.
+
+        Args:
+            handler: Handler of the HTTP request
+            deployment: Deployment (or model) the request is for
+            body: Decoded request body
+        """
+        messages = body.get("messages") or []
+        prompt = "\n".join(_message_text(message) for message in messages)
+        content, replayed = self._response_for(messages, prompt)
+        streaming = bool(body.get("stream"))
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        usage = _usage(count_tokens(prompt), count_tokens(content))
+
+        settings = dict(self.settings, **self.profiles.get(deployment, {}))
+        with self.lock:
+            latency = settings["latency"].sample(self.rng)
+            error_status = None
+            if self.rng.random() < settings["error_rate"]:
+                error_status = self.rng.choice(self.error_statuses)
+            stall = self.rng.random() < settings["stall_rate"]
+            disconnect = self.rng.random() < self.disconnect_rate
+
+            stats = self._stats(deployment)
+            stats["requests"] += 1
+            stats["streamed"] += int(streaming)
+            stats["replayed"] += int(replayed)
+            stats["total_latency"] += latency
+            if error_status is not None:
+                stats["errors"][str(error_status)] = (
+                    stats["errors"].get(str(error_status), 0) + 1
+                )
+            else:
+                stats["stalled"] += int(stall)
+                stats["disconnected"] += int(disconnect)
+                stats["prompt_tokens"] += usage["prompt_tokens"]
+                stats["completion_tokens"] += usage["completion_tokens"]
+
+        # Throttling and server errors come back without generating anything
+        if error_status is not None:
+            headers = {}
+            if error_status == 429:
+                headers["Retry-After"] = f"{self.retry_after:g}"
+            _send_json(
+                handler,
+                error_status,
+                {
+                    "error": {
+                        "code": str(error_status),
+                        "message": f"Injected error {error_status}",
+                    }
+                },
+                headers,
+            )
+            return
+
+        if stall:
+            time.sleep(self.stall_seconds)
+
+        try:
+            if streaming:
+                self._stream_completion(
+                    handler,
+                    deployment,
+                    content,
+                    usage if include_usage else None,
+                    latency,
+                    settings["tokens_per_second"],
+                    disconnect,
+                )
+            else:
+                time.sleep(
+                    latency
+                    + _generation_time(
+                        usage["completion_tokens"], settings["tokens_per_second"]
+                    )
+                )
+                if disconnect:
+                    handler.close_connection = True
+                    return
+                _send_json(
+                    handler,
+                    200,
+                    _completion(deployment, content, usage),
+                )
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. it timed out during a stall)
+            handler.close_connection = True
+
+    def _stream_completion(
+        self,
+        handler: BaseHTTPRequestHandler,
+        deployment: str,
+        content: str,
+        usage: Optional[Dict[str, Any]],
+        latency: float,
+        tokens_per_second: float,
+        disconnect: bool,
+    ) -> None:
+        """
+        Stream a completion as server-sent events.
+
+        Args:
+            handler: Handler of the HTTP request
+            deployment: Deployment the request is for
+            content: Response text
+            usage: Token usage to send in a final chunk, or None
+            latency: Seconds before the first chunk
+            tokens_per_second: Generation speed
+            disconnect: Whether to drop the connection halfway through
+        """
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def send_chunk(choices, chunk_usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": deployment,
+                "choices": choices,
+            }
+            if chunk_usage is not None:
+                chunk["usage"] = chunk_usage
+            _write_chunked(handler, f"data: {json.dumps(chunk)}\n\n".encode())
+
+        time.sleep(latency)
+        send_chunk(
+            [
+                {
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": ""},
+                    "finish_reason": None,
+                }
+            ]
+        )
+
+        pieces = STREAM_PIECE.findall(content)
+        for position, piece in enumerate(pieces):
+            if disconnect and position >= len(pieces) // 2:
+                # Leave the chunked body unterminated so the client sees a
+                # dropped connection
+                handler.close_connection = True
+                return
+
+            time.sleep(_generation_time(count_tokens(piece), tokens_per_second))
+            send_chunk(
+                [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            )
+
+        send_chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if usage is not None:
+            send_chunk([], usage)
+        _write_chunked(handler, b"data: [DONE]\n\n")
+        _write_chunked(handler, b"")
+
+    def _response_for(
+        self, messages: List[Dict[str, Any]], prompt: str
+    ) -> Tuple[str, bool]:
+        """
+        Pick the response to a prompt.
+
+        Args:
+            messages: Request messages
+            prompt: Text of all messages
+
+        Returns:
+            Tuple of the response text and whether it was replayed from a log
+        """
+        normalised = _normalise(prompt)
+        for rule in self.responses:
+            if rule["regex"] is not None and rule["regex"].search(prompt):
+                return rule["response"], rule["replayed"]
+            if rule["contains"] is not None and rule["contains"] in normalised:
+                return rule["response"], rule["replayed"]
+
+        return self._default_response(messages, prompt), False
+
+    def _default_response(self, messages: List[Dict[str, Any]], prompt: str) -> str:
+        """
+        Build a response shaped like the one the requesting agent expects.
+
+        Args:
+            messages: Request messages
+            prompt: Text of all messages
+
+        Returns:
+            Response text
+        """
+        system = " ".join(
+            _message_text(message)
+            for message in messages
+            if message.get("role") == "system"
+        )
+
+        # Hypothesis generation asks for JSON Lines
+        if '"test_approach"' in system:
+            return "\n".join(
+                json.dumps(
+                    {
+                        "hypothesis": f"Simulated hypothesis {i} about segment profitability",
+                        "rationale": "Simulated rationale",
+                        "test_approach": "Compare profit margins across segments",
+                        "business_impact": "Simulated business impact",
+                    }
+                )
+                for i in range(1, DEFAULT_HYPOTHESIS_COUNT + 1)
+            )
+
+        # Batch hypothesis testing asks for one result per numbered hypothesis
+        if "HYPOTHESES TO TEST:" in prompt:
+            listed = prompt.split("HYPOTHESES TO TEST:", 1)[1].split("\n\n", 1)[0]
+            count = len(re.findall(r"^\d+\. ", listed, re.MULTILINE))
+            return json.dumps(
+                {
+                    "results": [
+                        {
+                            "id": i,
+                            "components": "Simulated components",
+                            "analysis": "Simulated analysis",
+                            "verdict": "inconclusive",
+                            "evidence": "Simulated evidence",
+                            "limitations": "Simulated response",
+                        }
+                        for i in range(1, count + 1)
+                    ]
+                }
+            )
+
+        words = FILLER_TEXT.split()
+        filler_tokens = max(1, count_tokens(FILLER_TEXT))
+        repeats = max(1, self.response_tokens // filler_tokens)
+        return " ".join(words * repeats)
+
+    def _stats(self, deployment: str) -> Dict[str, Any]:
+        """Statistics of a deployment. Caller holds the lock."""
+        stats = self.deployments.get(deployment)
+        if stats is None:
+            stats = {
+                "requests": 0,
+                "streamed": 0,
+                "replayed": 0,
+                "errors": {},
+                "stalled": 0,
+                "disconnected": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_latency": 0.0,
+            }
+            self.deployments[deployment] = stats
+        return stats
+
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    """HTTP request handler routing requests to a FakeLLMServer."""
+
+    # Keep connections alive so pooled clients behave as against Azure
+    protocol_version = "HTTP/1.1"
+
+    server_fake: FakeLLMServer = None
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            _send_json(self, 400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        match = AZURE_COMPLETIONS_PATH.fullmatch(path)
+        if match:
+            deployment = match.group(1)
+        elif path in OPENAI_COMPLETIONS_PATHS:
+            deployment = body.get("model") or "default"
+        else:
+            _send_json(self, 404, {"error": {"message": f"Unknown path: {path}"}})
+            return
+
+        self.server_fake._handle_completion(self, deployment, body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/stats":
+            _send_json(self, 200, self.server_fake.get_stats())
+        else:
+            _send_json(self, 404, {"error": {"message": "Not found"}})
+
+    def log_message(self, format, *args):
+        # Request logging would swamp load tests
+        pass
+
+
+def _compile_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepare a canned response rule for matching."""
+    if "response" not in rule or not ("pattern" in rule or "contains" in rule):
+        raise ValueError(
+            'Response rules need a "response" and a "pattern" or "contains"'
+        )
+
+    return {
+        "regex": re.compile(rule["pattern"]) if "pattern" in rule else None,
+        "contains": _normalise(rule["contains"]) if "contains" in rule else None,
+        "response": rule["response"],
+        "replayed": bool(rule.get("replayed")),
+    }
+
+
+def _replay_key(input_data: Any) -> Optional[str]:
+    """Text identifying the prompt of a logged interaction."""
+    if isinstance(input_data, str):
+        return input_data.strip() or None
+
+    # Structured inputs (e.g. hypothesis generation) embed their longest text
+    if isinstance(input_data, dict):
+        texts = [value for value in input_data.values() if isinstance(value, str)]
+        if texts:
+            return max(texts, key=len).strip() or None
+
+    return None
+
+
+def _replay_text(output: Any) -> str:
+    """Response text of a logged interaction."""
+    if isinstance(output, str):
+        return output
+
+    # Generated hypotheses are logged parsed; replay them as JSON Lines
+    if isinstance(output, list) and all(
+        isinstance(item, dict) and "hypothesis" in item for item in output
+    ):
+        return "\n".join(json.dumps(item) for item in output)
+
+    return json.dumps(output)
+
+
+def _normalise(text: str) -> str:
+    """Collapse whitespace so prompts match logged inputs however indented."""
+    return " ".join(text.split())
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a request message, whose content may be a list of parts."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return str(content)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    """Token usage in the format of the chat completions API."""
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _completion(deployment: str, content: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Non-streamed chat completion response."""
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+    }
+
+
+def _generation_time(tokens: int, tokens_per_second: float) -> float:
+    """Seconds taken to generate a number of tokens."""
+    if tokens_per_second <= 0:
+        return 0.0
+    return tokens / tokens_per_second
+
+
+def _send_json(
+    handler: BaseHTTPRequestHandler,
+    status: int,
+    body: Any,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    """Send a complete JSON response."""
+    data = json.dumps(body).encode()
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(data)))
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+def _write_chunked(handler: BaseHTTPRequestHandler, data: bytes) -> None:
+    """Write one piece of a chunked response body; empty data ends the body."""
+    handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+    handler.wfile.flush()
+
+
+def main():
+    """Run the fake LLM server."""
+    parser = argparse.ArgumentParser(description="Local stand-in LLM server")
+    parser.add_argument(
+        "--address",
+        default=os.environ.get("FAKE_LLM_ADDRESS", "127.0.0.1:8001"),
+        help='Address to listen on ("host:port")',
+    )
+    parser.add_argument(
+        "--latency",
+        default="fixed:0.2",
+        help='Time to first token, e.g. "fixed:0.5", "uniform:0.2,1.5", '
+        '"normal:0.8,0.2" or "lognormal:0.8,0.5"',
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=50.0,
+        help="Generation speed after the first token (0 for instant)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with an HTTP error",
+    )
+    parser.add_argument(
+        "--error-statuses",
+        default="429,500,503",
+        help="Comma-separated status codes for injected errors",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=1.0,
+        help="Retry-After seconds sent with injected 429 responses",
+    )
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests that stall before responding",
+    )
+    parser.add_argument(
+        "--stall-seconds",
+        type=float,
+        default=30.0,
+        help="How long stalled requests wait",
+    )
+    parser.add_argument(
+        "--disconnect-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests dropped halfway through the response",
+    )
+    parser.add_argument(
+        "--responses",
+        help="JSON file of canned response rules, or an interaction log to replay "
+        "(e.g. output/interaction_log.json)",
+    )
+    parser.add_argument(
+        "--response-tokens",
+        type=int,
+        default=200,
+        help="Approximate length of default responses, in tokens",
+    )
+    parser.add_argument(
+        "--profiles",
+        help='Per-deployment settings as JSON, e.g. \'{"gpt-4o-mini": '
+        '{"latency": "fixed:0.1", "tokens_per_second": 150}}\'',
+    )
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        args.address,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(code) for code in args.error_statuses.split(",")),
+        retry_after=args.retry_after,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        disconnect_rate=args.disconnect_rate,
+        responses=(
+            FakeLLMServer.load_responses(args.responses) if args.responses else None
+        ),
+        response_tokens=args.response_tokens,
+        profiles=json.loads(args.profiles) if args.profiles else None,
+        seed=args.seed,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Fake LLM server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,716 @@
+"""
+LLM Call Policy module for Financial Analysis System.
+
+Wraps LLM calls with per-attempt timeouts, an overall deadline, retries with
+jittered exponential backoff, optional hedged requests and a circuit breaker.
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+)
+
+import httpx
+import openai
+
+# HTTP status codes worth retrying: timeouts, conflicts, throttling and server errors
+RETRIABLE_STATUS_CODES = {408, 409, 429}
+
+# Latency samples kept per policy for the hedging percentile
+LATENCY_WINDOW = 200
+
+# Iterator exhausted marker for the first chunk of a stream
+_END = object()
+
+
+class CallTimeoutError(TimeoutError):
+    """Raised when an LLM call attempt or the call as a whole runs out of time."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when calls are refused because the deployment keeps failing."""
+
+
+class CallPolicy:
+    """
+    Timeout, retry, hedging and circuit breaker policy for one deployment.
+
+    Each attempt gets `timeout` seconds and the call as a whole `deadline`
+    seconds. Retriable errors (timeouts, connection errors, 408/409/429 and 5xx
+    responses) are retried up to `max_retries` times after a full-jitter
+    exponential backoff, or after the server's Retry-After delay when it sends
+    one. With `hedge_percentile` set, an attempt still running after that
+    percentile of recent latencies gets a duplicate request and the first
+    response wins. After `failure_threshold` consecutive retriable failures the
+    circuit opens and calls fail fast for `reset_timeout` seconds, after which
+    a single trial call decides whether it closes again.
+
+    Callers can pass an `admit` function, which runs before every attempt and
+    every hedged request, outside the attempt timeout (e.g. to reserve rate
+    limit budget for each request actually sent).
+    """
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        timeout: Optional[float] = 60.0,
+        deadline: Optional[float] = 180.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Initialise the CallPolicy.
+
+        Args:
+            executor: Thread pool that runs synchronous attempts
+            timeout: Seconds allowed per attempt, or None for no limit
+            deadline: Seconds allowed for the call including retries, or None
+                for no limit
+            max_retries: Number of retries after the first attempt
+            backoff_base: Backoff ceiling in seconds before the first retry;
+                doubles with every retry
+            backoff_max: Maximum backoff ceiling in seconds
+            hedge_percentile: Latency percentile (0-100) after which a hedged
+                duplicate request is sent, or None to disable hedging
+            hedge_min_samples: Number of latency samples needed before hedging
+            failure_threshold: Consecutive retriable failures that open the
+                circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be between 0 and 100")
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+
+        self.executor = executor
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+        # Circuit breaker state: "closed", "open" or "half_open"
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+        self.stats = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "attempts": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0,
+            "circuit_opened": 0,
+        }
+
+    def call(
+        self, fn: Callable[[], Any], admit: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Run a synchronous LLM call under the policy.
+
+        Args:
+            fn: Function making one attempt of the call
+            admit: Optional function called before each request is sent
+
+        Returns:
+            Result of the first successful attempt
+        """
+        call_start = self._start_call()
+        attempt = 0
+
+        while True:
+            self._acquire_circuit()
+            try:
+                result = self._attempt(fn, self._attempt_timeout(call_start), admit)
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, call_start)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self._count("succeeded")
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        admit: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Run an asynchronous LLM call under the policy.
+
+        Args:
+            fn: Function returning an awaitable for one attempt of the call
+            admit: Optional function returning an awaitable, awaited before
+                each request is sent
+
+        Returns:
+            Result of the first successful attempt
+        """
+        call_start = self._start_call()
+        attempt = 0
+
+        while True:
+            self._acquire_circuit()
+            try:
+                result = await self._aattempt(
+                    fn, self._attempt_timeout(call_start), admit
+                )
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, call_start)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._count("succeeded")
+            return result
+
+    def stream(
+        self, fn: Callable[[], Iterator[Any]], admit: Optional[Callable[[], Any]] = None
+    ) -> Iterator[Any]:
+        """
+        Run a streaming LLM call under the policy.
+
+        The timeout applies to the first chunk, and the call is only retried
+        until the first chunk has arrived; once output has been yielded it
+        cannot be taken back. Streams are never hedged.
+
+        Args:
+            fn: Function starting one attempt of the stream
+            admit: Optional function called before each attempt is started
+
+        Yields:
+            Chunks of the first stream that produced output
+        """
+        call_start = self._start_call()
+        attempt = 0
+
+        while True:
+            self._acquire_circuit()
+            try:
+                if admit is not None:
+                    admit()
+                timeout = self._attempt_timeout(call_start)
+                attempt_start = time.monotonic()
+                iterator = iter(fn())
+                future = self._submit(next, iterator, _END)
+                done, _ = wait([future], timeout=timeout)
+                if not done:
+                    future.cancel()
+                    raise CallTimeoutError(
+                        f"No response within {timeout:.1f}s (attempt {attempt + 1})"
+                    )
+                first = future.result()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, call_start)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self._record_success(time.monotonic() - attempt_start)
+            break
+
+        try:
+            if first is not _END:
+                yield first
+                yield from iterator
+        except Exception:
+            self._count("failed")
+            raise
+
+        self._count("succeeded")
+
+    async def astream(
+        self,
+        fn: Callable[[], AsyncIterator[Any]],
+        admit: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Run an asynchronous streaming LLM call under the policy, with the same
+        first-chunk timeout and retry rules as `stream`.
+
+        Args:
+            fn: Function starting one attempt of the stream
+            admit: Optional function returning an awaitable, awaited before
+                each attempt is started
+
+        Yields:
+            Chunks of the first stream that produced output
+        """
+        call_start = self._start_call()
+        attempt = 0
+
+        while True:
+            self._acquire_circuit()
+            try:
+                if admit is not None:
+                    await admit()
+                timeout = self._attempt_timeout(call_start)
+                attempt_start = time.monotonic()
+                iterator = fn().__aiter__()
+                try:
+                    first = await asyncio.wait_for(_anext(iterator), timeout)
+                except asyncio.TimeoutError:
+                    raise CallTimeoutError(
+                        f"No response within {timeout:.1f}s (attempt {attempt + 1})"
+                    )
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, call_start)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._record_success(time.monotonic() - attempt_start)
+            break
+
+        try:
+            if first is not _END:
+                yield first
+                async for chunk in iterator:
+                    yield chunk
+        except Exception:
+            self._count("failed")
+            raise
+
+        self._count("succeeded")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get policy statistics.
+
+        Returns:
+            Dictionary with call, retry, timeout, hedging and circuit breaker
+            counters, the circuit state and recent latency percentiles
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats["circuit_state"] = self.state
+            stats["consecutive_failures"] = self.consecutive_failures
+            latencies = sorted(self.latencies)
+
+        stats["latency_samples"] = len(latencies)
+        stats["latency_p50"] = percentile(latencies, 50)
+        stats["latency_p95"] = percentile(latencies, 95)
+        stats["hedge_delay"] = self._hedge_delay()
+        return stats
+
+    def _attempt(
+        self,
+        fn: Callable[[], Any],
+        timeout: Optional[float],
+        admit: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """
+        Make one attempt on the thread pool, hedging it if it runs long.
+
+        Args:
+            fn: Function making one attempt of the call
+            timeout: Seconds allowed for the attempt, or None for no limit
+            admit: Optional function called before each request is sent
+
+        Returns:
+            Result of the first request to succeed
+        """
+        if admit is not None:
+            admit()
+        attempt_start = time.monotonic()
+        futures = [self._submit(fn)]
+
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None and (timeout is None or hedge_delay < timeout):
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                if admit is not None:
+                    admit()
+                futures.append(self._submit(fn))
+                self._count("hedged")
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = _remaining(attempt_start, timeout)
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                # Requests already running finish in the background; their
+                # results are discarded
+                for future in pending:
+                    future.cancel()
+                raise CallTimeoutError(f"No response within {timeout:.1f}s")
+
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    self._record_success(time.monotonic() - attempt_start)
+                    return future.result()
+                error = future.exception()
+
+        raise error
+
+    async def _aattempt(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float],
+        admit: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Make one asynchronous attempt, hedging it if it runs long.
+
+        Args:
+            fn: Function returning an awaitable for one attempt of the call
+            timeout: Seconds allowed for the attempt, or None for no limit
+            admit: Optional function returning an awaitable, awaited before
+                each request is sent
+
+        Returns:
+            Result of the first request to succeed
+        """
+        if admit is not None:
+            await admit()
+        attempt_start = time.monotonic()
+        tasks = [asyncio.ensure_future(fn())]
+
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and (timeout is None or hedge_delay < timeout):
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    if admit is not None:
+                        await admit()
+                    tasks.append(asyncio.ensure_future(fn()))
+                    self._count("hedged")
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                remaining = _remaining(attempt_start, timeout)
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise CallTimeoutError(f"No response within {timeout:.1f}s")
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count("hedge_wins")
+                        self._record_success(time.monotonic() - attempt_start)
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Run a function on the thread pool in the caller's context."""
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _start_call(self) -> float:
+        """Count a new call and return its start time."""
+        self._count("calls")
+        return time.monotonic()
+
+    def _attempt_timeout(self, call_start: float) -> Optional[float]:
+        """Time allowed for the next attempt, within the call deadline."""
+        remaining = _remaining(call_start, self.deadline)
+        if remaining is None:
+            return self.timeout
+        if self.timeout is None:
+            return remaining
+        return min(self.timeout, remaining)
+
+    def _handle_failure(
+        self, error: Exception, attempt: int, call_start: float
+    ) -> float:
+        """
+        Record a failed attempt and decide whether to retry it.
+
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of the failed attempt, starting at 0
+            call_start: Start time of the call
+
+        Returns:
+            Seconds to wait before the next attempt
+
+        Raises:
+            The original exception if the call should not be retried
+        """
+        retriable = is_retriable(error)
+
+        with self.lock:
+            self.stats["attempts"] += 1
+            if isinstance(error, CallTimeoutError):
+                self.stats["timeouts"] += 1
+
+            if retriable:
+                self.consecutive_failures += 1
+                if self.state == "half_open" or (
+                    self.state == "closed"
+                    and self.consecutive_failures >= self.failure_threshold
+                ):
+                    self.state = "open"
+                    self.opened_at = time.monotonic()
+                    self.stats["circuit_opened"] += 1
+            elif self.state == "half_open":
+                # The deployment answered, just not successfully; try again
+                self.state = "closed"
+            self.trial_in_flight = False
+
+        delay = _retry_after(error)
+        if delay is None:
+            ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+            delay = random.uniform(0, ceiling)
+
+        remaining = _remaining(call_start, self.deadline)
+        if (
+            not retriable
+            or attempt >= self.max_retries
+            or (remaining is not None and delay >= remaining)
+        ):
+            self._count("failed")
+            raise error
+
+        print(f"Retrying LLM call in {delay:.2f}s after error: {error}")
+        self._count("retries")
+        return delay
+
+    def _acquire_circuit(self) -> None:
+        """
+        Check that the circuit allows a call, moving it to half-open once the
+        reset timeout has passed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        with self.lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.stats["short_circuited"] += 1
+                    self.stats["failed"] += 1
+                    raise CircuitOpenError(
+                        "LLM calls are temporarily suspended after repeated failures"
+                    )
+                self.state = "half_open"
+
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    self.stats["short_circuited"] += 1
+                    self.stats["failed"] += 1
+                    raise CircuitOpenError(
+                        "LLM calls are suspended until a trial call succeeds"
+                    )
+                self.trial_in_flight = True
+
+    def _record_success(self, latency: float) -> None:
+        """Record a successful attempt and close the circuit."""
+        with self.lock:
+            self.stats["attempts"] += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.state = "closed"
+            self.trial_in_flight = False
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which an attempt is hedged, or None if not hedging."""
+        if self.hedge_percentile is None:
+            return None
+
+        with self.lock:
+            if len(self.latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self.latencies)
+
+        return percentile(latencies, self.hedge_percentile)
+
+    def _count(self, name: str) -> None:
+        """Increment a statistics counter."""
+        with self.lock:
+            self.stats[name] += 1
+
+
+class CallPolicyRegistry:
+    """
+    Process-wide call policies, one per deployment.
+
+    Policies are created on first use with the registry's settings, so that
+    every agent calling a deployment shares its latency history and circuit
+    breaker. Synchronous attempts run on a shared thread pool, which is what
+    allows them to be timed out and hedged.
+    """
+
+    def __init__(self, max_workers: int = 32, **settings: Any):
+        """
+        Initialise the CallPolicyRegistry.
+
+        Args:
+            max_workers: Maximum number of threads running synchronous attempts
+            **settings: CallPolicy settings for new policies
+        """
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm-call"
+        )
+        self.settings = settings
+        self.policies = {}
+
+    def configure(self, **settings: Any) -> None:
+        """
+        Update the policy settings. Existing policies are replaced, so their
+        statistics and circuit state start afresh.
+
+        Args:
+            **settings: CallPolicy settings to change
+        """
+        with self.lock:
+            self.settings = dict(self.settings, **settings)
+            self.policies = {}
+
+    def get(self, deployment_name: str) -> CallPolicy:
+        """
+        Get the call policy for a deployment.
+
+        Args:
+            deployment_name: Name of the Azure OpenAI deployment
+
+        Returns:
+            CallPolicy shared by all calls to the deployment
+        """
+        with self.lock:
+            policy = self.policies.get(deployment_name)
+            if policy is None:
+                policy = CallPolicy(self.executor, **self.settings)
+                self.policies[deployment_name] = policy
+            return policy
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get call policy statistics per deployment.
+
+        Returns:
+            Dictionary mapping deployment names to their policy statistics
+        """
+        with self.lock:
+            policies = dict(self.policies)
+
+        return {name: policy.get_stats() for name, policy in sorted(policies.items())}
+
+
+def is_retriable(error: Exception) -> bool:
+    """
+    Check whether a failed LLM call is worth retrying.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True for timeouts, connection errors, throttling and server errors
+    """
+    if isinstance(
+        error,
+        (
+            CallTimeoutError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            httpx.TimeoutException,
+            httpx.TransportError,
+        ),
+    ):
+        return True
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+
+    if isinstance(status_code, int):
+        return status_code in RETRIABLE_STATUS_CODES or status_code >= 500
+
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Delay in seconds requested by a Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+
+    try:
+        milliseconds = headers.get("retry-after-ms")
+        if milliseconds is not None:
+            return float(milliseconds) / 1000
+        seconds = headers.get("retry-after")
+        if seconds is not None:
+            return float(seconds)
+    except (TypeError, ValueError):
+        # HTTP dates and malformed values fall back to the backoff
+        pass
+
+    return None
+
+
+async def _anext(iterator: AsyncIterator[Any]) -> Any:
+    """Next chunk of an async iterator, or _END once it is exhausted."""
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+def _remaining(start: float, limit: Optional[float]) -> Optional[float]:
+    """Seconds left of a time limit started at `start`, or None for no limit."""
+    if limit is None:
+        return None
+    return max(0.0, limit - (time.monotonic() - start))
+
+
+def percentile(values: list, percent: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values, or None if there are none."""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+# Policies for all agents in the process
+call_policies = CallPolicyRegistry()
@@ -4,10 +4,17 @@ Agent Prompt Templates for Financial Analysis System
 This module defines the prompt templates for the data analyst and insight generator agents.
 """
 
+import json
 from typing import Any, Dict, List
 
 from langchain.prompts import PromptTemplate
 
+from src.agents.encoding import summary_encoder
+
+# Separates the data summary shared by all prompts on a dataset from the
+# task-specific text
+TASK_SEPARATOR = "\n\n=== TASK ===\n\n"
+
 # Data Analyst Agent System Prompt
 DATA_ANALYST_SYSTEM_PROMPT = """You are a Financial Data Analyst Agent specialised in identifying patterns, trends, and insights in financial datasets.
 
@@ -44,10 +51,7 @@ RESPONSE FORMAT:
 DATA_ANALYST_TASK_TEMPLATE = """
 ANALYSIS TASK: {task}
 
-AVAILABLE DATA:
-{data_summary}
-
-Based on this information, perform the requested analysis. 
+Based on the data summary above, perform the requested analysis. 
 Think step-by-step, showing your reasoning process, calculations, and interpretations.
 
 Focus on identifying:
@@ -61,7 +65,33 @@ When complete, present your findings in a structured format with appropriate num
 """
 
 DATA_ANALYST_PROMPT = PromptTemplate(
-    input_variables=["task", "data_summary"], template=DATA_ANALYST_TASK_TEMPLATE
+    input_variables=["task"], template=DATA_ANALYST_TASK_TEMPLATE
+)
+
+# Tool-Calling Data Analyst System Prompt
+TOOL_ANALYST_SYSTEM_PROMPT = DATA_ANALYST_SYSTEM_PROMPT + """
+USING TOOLS:
+- You start with a short description of the dataset, not the figures themselves
+- Call the tools to fetch exactly the figures the question needs; request several independent figures in parallel
+- Never estimate or invent a number you could fetch with a tool
+- Stop calling tools as soon as you have enough evidence, then answer
+"""
+
+# Tool-Calling Data Analyst Task Template
+TOOL_ANALYST_TASK_TEMPLATE = """
+QUESTION: {question}
+
+Answer the question using the dataset described above. Use the tools to fetch the exact figures you need, then present your answer with the supporting numbers.
+"""
+
+TOOL_ANALYST_PROMPT = PromptTemplate(
+    input_variables=["question"], template=TOOL_ANALYST_TASK_TEMPLATE
+)
+
+# Sent when the tool round-trip limit is reached
+TOOL_LIMIT_MESSAGE = (
+    "You have reached the limit of tool calls. Answer the question now with the "
+    "figures you have, noting anything you could not verify."
 )
 
 # Insight Generator Agent System Prompt
@@ -119,12 +149,25 @@ INSIGHT_GENERATOR_PROMPT = PromptTemplate(
     template=INSIGHT_GENERATOR_TASK_TEMPLATE,
 )
 
+# Insight Generator Question Template
+INSIGHT_QUESTION_TEMPLATE = """
+QUESTION: {question}
+
+Based on the data summary above, answer the question about the financial data.
+Think critically about what the relevant patterns and figures mean for the business.
+
+Support the answer with specific figures from the data summary, explain why it
+matters from a business perspective, and note any limitations of the evidence.
+"""
+
+INSIGHT_QUESTION_PROMPT = PromptTemplate(
+    input_variables=["question"],
+    template=INSIGHT_QUESTION_TEMPLATE,
+)
+
 # Hypothesis Generation Template
 HYPOTHESIS_GENERATION_TEMPLATE = """
-Based on the following data summary, generate 3-5 specific hypotheses that could explain interesting patterns or anomalies in the financial data.
-
-DATA SUMMARY:
-{data_summary}
+Based on the data summary above, generate 3-5 specific hypotheses that could explain interesting patterns or anomalies in the financial data.
 
 For each hypothesis:
 1. State the hypothesis clearly
@@ -136,17 +179,14 @@ Focus on generating hypotheses that, if confirmed, would lead to actionable busi
 """
 
 HYPOTHESIS_GENERATION_PROMPT = PromptTemplate(
-    input_variables=["data_summary"], template=HYPOTHESIS_GENERATION_TEMPLATE
+    input_variables=[], template=HYPOTHESIS_GENERATION_TEMPLATE
 )
 
 # Hypothesis Testing Template
 HYPOTHESIS_TESTING_TEMPLATE = """
 HYPOTHESIS TO TEST: {hypothesis}
 
-AVAILABLE DATA SUMMARY:
-{data_summary}
-
-Your task is to thoroughly test this hypothesis using the available data.
+Your task is to thoroughly test this hypothesis using the data summary above.
 
 Please:
 1. Break down the hypothesis into testable components
@@ -160,7 +200,65 @@ Be precise and thorough in your analysis, showing your reasoning process and cal
 """
 
 HYPOTHESIS_TESTING_PROMPT = PromptTemplate(
-    input_variables=["hypothesis", "data_summary"], template=HYPOTHESIS_TESTING_TEMPLATE
+    input_variables=["hypothesis"], template=HYPOTHESIS_TESTING_TEMPLATE
+)
+
+# Output schema for testing several hypotheses in one call
+HYPOTHESIS_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "components": {"type": "string"},
+                    "analysis": {"type": "string"},
+                    "verdict": {
+                        "type": "string",
+                        "enum": ["supported", "refuted", "inconclusive"],
+                    },
+                    "evidence": {"type": "string"},
+                    "limitations": {"type": "string"},
+                },
+                "required": [
+                    "id",
+                    "components",
+                    "analysis",
+                    "verdict",
+                    "evidence",
+                    "limitations",
+                ],
+            },
+        }
+    },
+    "required": ["results"],
+}
+
+# Batch Hypothesis Testing Template
+HYPOTHESIS_BATCH_TESTING_TEMPLATE = """
+HYPOTHESES TO TEST:
+{hypotheses}
+
+Your task is to test each of these hypotheses independently using the data summary above.
+
+For each hypothesis:
+1. Break the hypothesis down into testable components
+2. Perform the necessary calculations and comparisons, showing your reasoning
+3. Determine whether the data supports, refutes, or is inconclusive about the hypothesis
+4. Provide numerical evidence for your conclusion
+5. Note any limitations in your testing approach
+
+Respond with a single JSON object and nothing else, matching this JSON schema:
+{schema}
+
+Include exactly one result per hypothesis, using the hypothesis number as its id.
+"""
+
+HYPOTHESIS_BATCH_TESTING_PROMPT = PromptTemplate(
+    input_variables=["hypotheses", "schema"],
+    template=HYPOTHESIS_BATCH_TESTING_TEMPLATE,
 )
 
 # Final Insight Synthesis Template
@@ -168,9 +266,6 @@ INSIGHT_SYNTHESIS_TEMPLATE = """
 TESTED HYPOTHESES AND RESULTS:
 {hypothesis_results}
 
-DATA SUMMARY:
-{data_summary}
-
 Your task is to synthesize the hypothesis testing results into 2-3 valuable, actionable business insights.
 
 For each insight:
@@ -190,50 +285,69 @@ Present your insights in a clear, structured format that would be valuable for b
 """
 
 INSIGHT_SYNTHESIS_PROMPT = PromptTemplate(
-    input_variables=["hypothesis_results", "data_summary"],
+    input_variables=["hypothesis_results"],
     template=INSIGHT_SYNTHESIS_TEMPLATE,
 )
 
 
 def get_analyst_prompt_with_task(task: str, data_summary: Dict[str, Any]) -> str:
     """
-    Generate a complete prompt for the Data Analyst Agent.
+    Generate the task prompt for the Data Analyst Agent.
 
     Args:
         task: The specific analysis task
         data_summary: Dictionary containing data summary information
 
     Returns:
-        Complete formatted prompt string
+        Formatted task prompt (the system prompt is sent separately)
     """
-    # Convert data summary to a formatted string representation
-    data_summary_str = format_data_summary(data_summary)
+    # Format the task template; the system prompt is sent separately
+    return build_prompt(data_summary, DATA_ANALYST_PROMPT.format(task=task))
 
-    # Format the task template
-    task_prompt = DATA_ANALYST_PROMPT.format(task=task, data_summary=data_summary_str)
 
-    # Combine system prompt and task prompt
-    return f"{DATA_ANALYST_SYSTEM_PROMPT}\n\n{task_prompt}"
+def get_tool_analyst_prompt(question: str, dataset_context: str) -> str:
+    """
+    Generate the task prompt for the tool-calling Data Analyst Agent.
+
+    Args:
+        question: User's question about the financial data
+        dataset_context: Compact description of the dataset
+
+    Returns:
+        Formatted task prompt
+    """
+    return build_prompt(dataset_context, TOOL_ANALYST_PROMPT.format(question=question))
 
 
 def get_insight_prompt_with_task(task: str, analysis_results: str) -> str:
     """
-    Generate a complete prompt for the Insight Generator Agent.
+    Generate the task prompt for the Insight Generator Agent.
 
     Args:
         task: The specific insight generation task
         analysis_results: String containing analysis results
 
     Returns:
-        Complete formatted prompt string
+        Formatted task prompt (the system prompt is sent separately)
     """
-    # Format the task template
-    task_prompt = INSIGHT_GENERATOR_PROMPT.format(
-        task=task, analysis_results=analysis_results
-    )
+    # Format the task template; the system prompt is sent separately
+    return INSIGHT_GENERATOR_PROMPT.format(task=task, analysis_results=analysis_results)
+
 
-    # Combine system prompt and task prompt
-    return f"{INSIGHT_GENERATOR_SYSTEM_PROMPT}\n\n{task_prompt}"
+def get_insight_question_prompt(question: str, data_summary: Any) -> str:
+    """
+    Generate the task prompt for answering a question with the Insight
+    Generator Agent.
+
+    Args:
+        question: User's question about the financial data
+        data_summary: Dictionary containing the data summary relevant to the
+            question, or an already formatted summary
+
+    Returns:
+        Formatted task prompt (the system prompt is sent separately)
+    """
+    return build_prompt(data_summary, INSIGHT_QUESTION_PROMPT.format(question=question))
 
 
 def get_hypothesis_generation_prompt(data_summary: Dict[str, Any]) -> str:
@@ -246,9 +360,7 @@ def get_hypothesis_generation_prompt(data_summary: Dict[str, Any]) -> str:
     Returns:
         Formatted hypothesis generation prompt
     """
-    data_summary_str = format_data_summary(data_summary)
-
-    return f"{INSIGHT_GENERATOR_SYSTEM_PROMPT}\n\n{HYPOTHESIS_GENERATION_PROMPT.format(data_summary=data_summary_str)}"
+    return build_prompt(data_summary, HYPOTHESIS_GENERATION_PROMPT.format())
 
 
 def get_hypothesis_testing_prompt(hypothesis: str, data_summary: Dict[str, Any]) -> str:
@@ -262,9 +374,36 @@ def get_hypothesis_testing_prompt(hypothesis: str, data_summary: Dict[str, Any])
     Returns:
         Formatted hypothesis testing prompt
     """
-    data_summary_str = format_data_summary(data_summary)
+    return build_prompt(
+        data_summary, HYPOTHESIS_TESTING_PROMPT.format(hypothesis=hypothesis)
+    )
 
-    return f"{DATA_ANALYST_SYSTEM_PROMPT}\n\n{HYPOTHESIS_TESTING_PROMPT.format(hypothesis=hypothesis, data_summary=data_summary_str)}"
+
+def get_hypothesis_batch_testing_prompt(
+    hypotheses: List[str], data_summary: Any
+) -> str:
+    """
+    Generate a prompt for testing several hypotheses in one call.
+
+    Args:
+        hypotheses: The hypotheses to test
+        data_summary: Dictionary containing data summary information, or an
+            already formatted summary
+
+    Returns:
+        Formatted batch hypothesis testing prompt
+    """
+    numbered = "\n".join(
+        f"{i}. {hypothesis.strip()}" for i, hypothesis in enumerate(hypotheses, 1)
+    )
+
+    return build_prompt(
+        data_summary,
+        HYPOTHESIS_BATCH_TESTING_PROMPT.format(
+            hypotheses=numbered,
+            schema=json.dumps(HYPOTHESIS_BATCH_SCHEMA, separators=(",", ":")),
+        ),
+    )
 
 
 def get_insight_synthesis_prompt(
@@ -280,14 +419,18 @@ def get_insight_synthesis_prompt(
     Returns:
         Formatted insight synthesis prompt
     """
-    data_summary_str = format_data_summary(data_summary)
-
-    return f"{INSIGHT_GENERATOR_SYSTEM_PROMPT}\n\n{INSIGHT_SYNTHESIS_PROMPT.format(hypothesis_results=hypothesis_results, data_summary=data_summary_str)}"
+    return build_prompt(
+        data_summary,
+        INSIGHT_SYNTHESIS_PROMPT.format(hypothesis_results=hypothesis_results),
+    )
 
 
 def format_data_summary(data_summary: Dict[str, Any]) -> str:
     """
-    Convert a data summary dictionary to a formatted string representation.
+    Convert a data summary dictionary to a compact string representation.
+
+    Breakdowns are written as tables with rounded figures, within the token
+    budget of the shared summary encoder.
 
     Args:
         data_summary: Dictionary containing data summary information
@@ -295,12 +438,46 @@ def format_data_summary(data_summary: Dict[str, Any]) -> str:
     Returns:
         Formatted string representation
     """
-    import json
+    return summary_encoder.encode(data_summary)
+
+
+def build_prompt(data_summary: Any, task_prompt: str) -> str:
+    """
+    Assemble a task prompt behind the shared data summary.
+
+    Every prompt about the same dataset starts with the same summary block, so
+    together with the agent's system prompt it forms a byte-identical prefix
+    that the provider can cache across calls. Only the text after
+    TASK_SEPARATOR varies.
+
+    Args:
+        data_summary: Dictionary containing data summary information, or an
+            already formatted summary
+        task_prompt: Task-specific prompt
+
+    Returns:
+        Complete task prompt
+    """
+    if isinstance(data_summary, dict):
+        data_summary_str = format_data_summary(data_summary)
+    else:
+        data_summary_str = str(data_summary)
+
+    return f"DATA SUMMARY:\n{data_summary_str}{TASK_SEPARATOR}{task_prompt.strip()}\n"
 
-    # Format the data summary as a formatted JSON string
-    formatted_json = json.dumps(data_summary, indent=2)
 
-    return formatted_json
+def shared_prefix(prompt: str) -> str:
+    """
+    Get the part of a prompt that is shared by every call on the same data.
+
+    Args:
+        prompt: Prompt built by build_prompt
+
+    Returns:
+        Text before TASK_SEPARATOR, or an empty string for other prompts
+    """
+    index = prompt.find(TASK_SEPARATOR)
+    return prompt[:index] if index >= 0 else ""
 
 
 # Hypothesis Generator System Prompt
@@ -324,19 +501,17 @@ YOUR GUIDELINES:
 8. Format hypotheses to be directly testable by an analyst
 
 RESPONSE FORMAT:
-For each hypothesis:
-1. [HYPOTHESIS]: A clear, specific statement that can be tested
-2. [RATIONALE]: Why you've formulated this hypothesis based on the data
-3. [TEST APPROACH]: How this hypothesis could be tested with the available data
-4. [BUSINESS IMPACT]: Why confirming or rejecting this hypothesis would be valuable
+Write each hypothesis as a single JSON object on its own line (JSON Lines), with these string fields:
+- "hypothesis": A clear, specific statement that can be tested
+- "rationale": Why you've formulated this hypothesis based on the data
+- "test_approach": How this hypothesis could be tested with the available data
+- "business_impact": Why confirming or rejecting this hypothesis would be valuable
+Write nothing else: no numbering, headings, code fences or text between the lines. Each line is tested as soon as it is complete, so finish one hypothesis before starting the next.
 """
 
 # Standard Hypothesis Generation Template
 STANDARD_HYPOTHESIS_GENERATION_TEMPLATE = """
-Please generate 3-5 high-quality, testable hypotheses based on the following financial data summary and initial analysis.
-
-DATA SUMMARY:
-{data_summary}
+Please generate 3-5 high-quality, testable hypotheses based on the financial data summary above and the following initial analysis.
 
 INITIAL ANALYSIS:
 {initial_analysis}
@@ -358,16 +533,13 @@ Generate hypotheses that challenge assumptions and could reveal non-obvious patt
 """
 
 STANDARD_HYPOTHESIS_PROMPT = PromptTemplate(
-    input_variables=["data_summary", "initial_analysis"],
+    input_variables=["initial_analysis"],
     template=STANDARD_HYPOTHESIS_GENERATION_TEMPLATE,
 )
 
 # Targeted Hypothesis Generation Template (focused on specific areas)
 TARGETED_HYPOTHESIS_GENERATION_TEMPLATE = """
-Please generate 3-5 high-quality, testable hypotheses focused specifically on {focus_area} based on the following financial data.
-
-DATA SUMMARY:
-{data_summary}
+Please generate 3-5 high-quality, testable hypotheses focused specifically on {focus_area} based on the financial data summary above.
 
 INITIAL ANALYSIS:
 {initial_analysis}
@@ -384,16 +556,13 @@ Generate hypotheses that challenge assumptions and could reveal non-obvious patt
 """
 
 TARGETED_HYPOTHESIS_PROMPT = PromptTemplate(
-    input_variables=["focus_area", "data_summary", "initial_analysis"],
+    input_variables=["focus_area", "initial_analysis"],
     template=TARGETED_HYPOTHESIS_GENERATION_TEMPLATE,
 )
 
 # Unexpected Patterns Hypothesis Template (for identifying counter-intuitive patterns)
 UNEXPECTED_HYPOTHESIS_GENERATION_TEMPLATE = """
-Please generate 3-5 high-quality, testable hypotheses that explore unexpected or counter-intuitive patterns in the following financial data.
-
-DATA SUMMARY:
-{data_summary}
+Please generate 3-5 high-quality, testable hypotheses that explore unexpected or counter-intuitive patterns in the financial data summarised above.
 
 INITIAL ANALYSIS:
 {initial_analysis}
@@ -415,7 +584,7 @@ The goal is to find insights that might be missed by traditional analysis but co
 """
 
 UNEXPECTED_HYPOTHESIS_PROMPT = PromptTemplate(
-    input_variables=["data_summary", "initial_analysis"],
+    input_variables=["initial_analysis"],
     template=UNEXPECTED_HYPOTHESIS_GENERATION_TEMPLATE,
 )
 
@@ -438,29 +607,15 @@ def get_hypothesis_prompt(
     Returns:
         Formatted prompt string
     """
-    import json
-
-    # Convert data summary to a formatted string
-    if isinstance(data_summary, dict):
-        data_summary_str = json.dumps(data_summary, indent=2)
-    else:
-        data_summary_str = str(data_summary)
-
     # Select the appropriate prompt template
     if prompt_type == "targeted" and focus_area:
         prompt = TARGETED_HYPOTHESIS_PROMPT.format(
-            focus_area=focus_area,
-            data_summary=data_summary_str,
-            initial_analysis=initial_analysis,
+            focus_area=focus_area, initial_analysis=initial_analysis
         )
     elif prompt_type == "unexpected":
-        prompt = UNEXPECTED_HYPOTHESIS_PROMPT.format(
-            data_summary=data_summary_str, initial_analysis=initial_analysis
-        )
+        prompt = UNEXPECTED_HYPOTHESIS_PROMPT.format(initial_analysis=initial_analysis)
     else:  # Default to standard
-        prompt = STANDARD_HYPOTHESIS_PROMPT.format(
-            data_summary=data_summary_str, initial_analysis=initial_analysis
-        )
+        prompt = STANDARD_HYPOTHESIS_PROMPT.format(initial_analysis=initial_analysis)
 
-    # Combine with system prompt
-    return f"{HYPOTHESIS_GENERATOR_SYSTEM_PROMPT}\n\n{prompt}"
+    # The system prompt is sent separately
+    return build_prompt(data_summary, prompt)
@@ -0,0 +1,368 @@
+"""
+LLM Scheduler module for Financial Analysis System.
+
+Keeps LLM traffic within per-deployment requests-per-minute and
+tokens-per-minute budgets, queueing calls that would exceed them.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Longest a queued call sleeps before checking whether it is at the front
+QUEUE_POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    The bucket holds at most `burst_seconds` worth of its rate, so a full
+    bucket allows a short burst but not a whole minute's budget at once.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        """
+        Initialise the TokenBucket.
+
+        Args:
+            per_minute: Refill rate per minute
+            burst_seconds: Seconds of refill the bucket can hold
+        """
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the tokens accrued since the last refill."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        # Requests larger than the bucket wait for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Remove tokens; the level may go negative for oversized requests."""
+        self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Central scheduler for LLM calls.
+
+    Every request an agent sends, including retries and hedged duplicates,
+    acquires one request and its estimated tokens from the deployment's
+    buckets before it is sent. Calls that do not fit are queued
+    and served strictly in arrival order, so large prompts are not starved by
+    a stream of small ones. Once a call completes, the difference between the
+    estimated and the reported token usage is settled against the bucket.
+    Deployments without limits pass straight through.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        deployment_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        burst_seconds: float = 10.0,
+    ):
+        """
+        Initialise the LLMScheduler.
+
+        Args:
+            requests_per_minute: Default requests-per-minute budget per
+                deployment, or None for no limit
+            tokens_per_minute: Default tokens-per-minute budget per deployment,
+                or None for no limit
+            deployment_limits: Budgets for specific deployments, mapping
+                deployment names to "requests_per_minute" and/or
+                "tokens_per_minute"
+            burst_seconds: Seconds of budget that can be used in a burst
+        """
+        self.condition = threading.Condition()
+        self.deployments = {}
+        self.configure(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            deployment_limits=deployment_limits,
+            burst_seconds=burst_seconds,
+        )
+
+    def configure(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        deployment_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        burst_seconds: float = 10.0,
+    ) -> None:
+        """
+        Set the budgets. Buckets and statistics start afresh; calls already
+        queued keep waiting on their old buckets.
+
+        Args:
+            requests_per_minute: Default requests-per-minute budget per
+                deployment, or None for no limit
+            tokens_per_minute: Default tokens-per-minute budget per deployment,
+                or None for no limit
+            deployment_limits: Budgets for specific deployments
+            burst_seconds: Seconds of budget that can be used in a burst
+        """
+        with self.condition:
+            self.requests_per_minute = requests_per_minute
+            self.tokens_per_minute = tokens_per_minute
+            self.deployment_limits = deployment_limits or {}
+            self.burst_seconds = burst_seconds
+            self.deployments = {}
+
+    def is_limited(self, deployment: str) -> bool:
+        """
+        Check whether calls to a deployment are rate limited.
+
+        Args:
+            deployment: Name of the Azure OpenAI deployment
+
+        Returns:
+            True if the deployment has a request or token budget
+        """
+        with self.condition:
+            state = self._state(deployment)
+            return state["requests"] is not None or state["tokens"] is not None
+
+    def acquire(self, deployment: str, tokens: int) -> float:
+        """
+        Wait until a call fits the deployment's budgets and reserve it.
+
+        Args:
+            deployment: Name of the Azure OpenAI deployment
+            tokens: Estimated tokens for the call (prompt plus completion)
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        ticket = object()
+
+        with self.condition:
+            state = self._enqueue(deployment, ticket)
+            try:
+                while True:
+                    delay = self._try_reserve(state, ticket, tokens)
+                    if delay == 0:
+                        break
+                    self.condition.wait(delay)
+            finally:
+                self._dequeue(state, ticket)
+
+            return self._record_wait(state, tokens, time.monotonic() - start)
+
+    async def aacquire(self, deployment: str, tokens: int) -> float:
+        """
+        Wait without blocking the event loop until a call fits the
+        deployment's budgets, and reserve it.
+
+        Args:
+            deployment: Name of the Azure OpenAI deployment
+            tokens: Estimated tokens for the call (prompt plus completion)
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        ticket = object()
+
+        with self.condition:
+            state = self._enqueue(deployment, ticket)
+
+        try:
+            while True:
+                with self.condition:
+                    delay = self._try_reserve(state, ticket, tokens)
+                if delay == 0:
+                    break
+                await asyncio.sleep(min(delay, QUEUE_POLL_INTERVAL))
+        finally:
+            with self.condition:
+                self._dequeue(state, ticket)
+
+        with self.condition:
+            return self._record_wait(state, tokens, time.monotonic() - start)
+
+    def settle(
+        self, deployment: str, estimated_tokens: int, actual_tokens: Optional[int]
+    ) -> None:
+        """
+        Correct a reservation with the tokens the call actually used.
+
+        Args:
+            deployment: Name of the Azure OpenAI deployment
+            estimated_tokens: Tokens reserved for the call
+            actual_tokens: Tokens reported by the provider, or None if unknown
+        """
+        if actual_tokens is None:
+            return
+
+        with self.condition:
+            state = self._state(deployment)
+            state["stats"]["actual_tokens"] += actual_tokens
+            state["stats"]["settled_estimated_tokens"] += estimated_tokens
+
+            bucket = state["tokens"]
+            if bucket is not None:
+                bucket.refill(time.monotonic())
+                bucket.level = min(
+                    bucket.capacity, bucket.level + estimated_tokens - actual_tokens
+                )
+                # Returned tokens may let the head of the queue go
+                self.condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler statistics per deployment.
+
+        Returns:
+            Dictionary mapping deployment names to their budgets, current and
+            maximum queue depth, wait times and token estimates versus actual
+            usage
+        """
+        with self.condition:
+            deployments = {}
+            for deployment, state in sorted(self.deployments.items()):
+                stats = dict(state["stats"])
+                calls = stats["calls"]
+                stats["requests_per_minute"] = state["limits"]["requests_per_minute"]
+                stats["tokens_per_minute"] = state["limits"]["tokens_per_minute"]
+                stats["queue_depth"] = len(state["queue"])
+                stats["avg_wait"] = stats["total_wait"] / calls if calls else 0.0
+                stats["estimate_ratio"] = (
+                    stats["actual_tokens"] / stats["settled_estimated_tokens"]
+                    if stats["settled_estimated_tokens"]
+                    else None
+                )
+                deployments[deployment] = stats
+
+            return deployments
+
+    def _state(self, deployment: str) -> Dict[str, Any]:
+        """
+        Get the buckets, queue and statistics of a deployment. Caller holds
+        the lock.
+
+        Args:
+            deployment: Name of the Azure OpenAI deployment
+
+        Returns:
+            Deployment state
+        """
+        state = self.deployments.get(deployment)
+        if state is None:
+            limits = {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+            }
+            limits.update(self.deployment_limits.get(deployment, {}))
+
+            state = {
+                "limits": limits,
+                "requests": _bucket(limits["requests_per_minute"], self.burst_seconds),
+                "tokens": _bucket(limits["tokens_per_minute"], self.burst_seconds),
+                "queue": deque(),
+                "stats": {
+                    "calls": 0,
+                    "queued_calls": 0,
+                    "estimated_tokens": 0,
+                    "settled_estimated_tokens": 0,
+                    "actual_tokens": 0,
+                    "total_wait": 0.0,
+                    "max_wait": 0.0,
+                    "max_queue_depth": 0,
+                },
+            }
+            self.deployments[deployment] = state
+
+        return state
+
+    def _enqueue(self, deployment: str, ticket: object) -> Dict[str, Any]:
+        """Add a call to the back of its deployment's queue. Caller holds the lock."""
+        state = self._state(deployment)
+        state["queue"].append(ticket)
+        state["stats"]["max_queue_depth"] = max(
+            state["stats"]["max_queue_depth"], len(state["queue"])
+        )
+        return state
+
+    def _dequeue(self, state: Dict[str, Any], ticket: object) -> None:
+        """Remove a call from its queue, if still queued. Caller holds the lock."""
+        try:
+            state["queue"].remove(ticket)
+        except ValueError:
+            return
+        self.condition.notify_all()
+
+    def _try_reserve(self, state: Dict[str, Any], ticket: object, tokens: int) -> float:
+        """
+        Reserve a call's budget if it is at the front of the queue and fits.
+        Caller holds the lock.
+
+        Args:
+            state: Deployment state
+            ticket: Identifies the queued call
+            tokens: Estimated tokens for the call
+
+        Returns:
+            0 once reserved, otherwise seconds to wait before trying again
+        """
+        if state["queue"][0] is not ticket:
+            return QUEUE_POLL_INTERVAL
+
+        requests = state["requests"]
+        token_bucket = state["tokens"]
+        now = time.monotonic()
+
+        delay = 0.0
+        if requests is not None:
+            requests.refill(now)
+            delay = max(delay, requests.time_until(1))
+        if token_bucket is not None:
+            token_bucket.refill(now)
+            delay = max(delay, token_bucket.time_until(tokens))
+
+        if delay > 0:
+            return delay
+
+        if requests is not None:
+            requests.take(1)
+        if token_bucket is not None:
+            token_bucket.take(tokens)
+
+        state["queue"].popleft()
+        self.condition.notify_all()
+        return 0
+
+    def _record_wait(self, state: Dict[str, Any], tokens: int, wait: float) -> float:
+        """Record a reserved call and its wait. Caller holds the lock."""
+        stats = state["stats"]
+        stats["calls"] += 1
+        stats["queued_calls"] += int(wait >= QUEUE_POLL_INTERVAL)
+        stats["estimated_tokens"] += tokens
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        return wait
+
+
+def _bucket(per_minute: Optional[float], burst_seconds: float) -> Optional[TokenBucket]:
+    """Token bucket for a per-minute budget, or None for no limit."""
+    if per_minute is None:
+        return None
+    return TokenBucket(per_minute, burst_seconds)
+
+
+# Scheduler for all agents in the process
+llm_scheduler = LLMScheduler()
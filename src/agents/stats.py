@@ -0,0 +1,151 @@
+"""
+Prompt Statistics module for Financial Analysis System.
+
+Tracks prompt sizes and provider-side prefix cache hits for LLM calls.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.agents.encoding import count_tokens
+
+# Minimum prompt prefix the provider caches, in tokens
+MIN_CACHEABLE_PREFIX_TOKENS = 1024
+
+# How long the provider keeps an unused prefix cached, in seconds
+PREFIX_CACHE_TTL = 5 * 60
+
+
+class PromptStats:
+    """
+    Collects per-agent prompt statistics.
+
+    For every call it records the prompt size and, when the provider reports
+    it, how many prompt tokens were served from the provider's prefix cache.
+    Independently of the provider, it tracks whether the shared prefix (system
+    prompt plus data summary) was sent recently enough to be cached, which
+    shows whether prompts are laid out to benefit from caching at all.
+    """
+
+    def __init__(self):
+        """
+        Initialise the PromptStats.
+        """
+        self.lock = threading.Lock()
+        self.agents = {}
+
+        # Prefix hash -> (token count, last time sent)
+        self.prefixes = {}
+
+    def record(
+        self,
+        agent: str,
+        system_prompt: str,
+        prefix: str,
+        prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Record an LLM call.
+
+        Args:
+            agent: Name of the agent making the call
+            system_prompt: System prompt sent with the call
+            prefix: Shared part of the task prompt (see prompts.shared_prefix)
+            prompt: Complete task prompt
+            usage: Token usage reported for the call, if any
+        """
+        now = time.time()
+        prefix_text = system_prompt + prefix
+        prefix_hash = hashlib.sha256(prefix_text.encode()).hexdigest()
+
+        with self.lock:
+            seen = self.prefixes.get(prefix_hash)
+
+        # Count outside the lock; prefixes are only tokenised once
+        prefix_tokens = seen[0] if seen else count_tokens(prefix_text)
+
+        with self.lock:
+            # Forget prefixes the provider will have evicted
+            for key, (_, last_sent) in list(self.prefixes.items()):
+                if now - last_sent > PREFIX_CACHE_TTL:
+                    del self.prefixes[key]
+
+            reusable = (
+                prefix_hash in self.prefixes
+                and prefix_tokens >= MIN_CACHEABLE_PREFIX_TOKENS
+            )
+            self.prefixes[prefix_hash] = (prefix_tokens, now)
+
+            stats = self.agents.setdefault(
+                agent,
+                {
+                    "calls": 0,
+                    "prompt_chars": 0,
+                    "prefix_tokens": 0,
+                    "reusable_prefix_calls": 0,
+                    "reported_calls": 0,
+                    "prompt_tokens": 0,
+                    "cached_tokens": 0,
+                    "cache_hit_calls": 0,
+                },
+            )
+            stats["calls"] += 1
+            stats["prompt_chars"] += len(system_prompt) + len(prompt)
+            stats["prefix_tokens"] += prefix_tokens
+            stats["reusable_prefix_calls"] += int(reusable)
+
+            if usage:
+                cached_tokens = usage.get("cached_tokens", 0)
+                stats["reported_calls"] += 1
+                stats["prompt_tokens"] += usage.get("input_tokens", 0)
+                stats["cached_tokens"] += cached_tokens
+                stats["cache_hit_calls"] += int(cached_tokens > 0)
+
+    def reset(self) -> None:
+        """
+        Clear all statistics.
+        """
+        with self.lock:
+            self.agents = {}
+            self.prefixes = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get prompt statistics per agent.
+
+        Returns:
+            Dictionary mapping agent names to their call counts, average prompt
+            and shared prefix sizes, the fraction of calls whose prefix could be
+            served from the provider cache, and the provider-reported prefix
+            cache hit rates
+        """
+        with self.lock:
+            agents = {}
+            for agent, stats in sorted(self.agents.items()):
+                summary = dict(stats)
+                calls = stats["calls"]
+                summary["avg_prompt_chars"] = stats["prompt_chars"] / calls
+                summary["avg_prefix_tokens"] = stats["prefix_tokens"] / calls
+                summary["reusable_prefix_ratio"] = (
+                    stats["reusable_prefix_calls"] / calls
+                )
+                summary["cache_hit_ratio"] = (
+                    stats["cache_hit_calls"] / stats["reported_calls"]
+                    if stats["reported_calls"]
+                    else None
+                )
+                summary["cached_token_ratio"] = (
+                    stats["cached_tokens"] / stats["prompt_tokens"]
+                    if stats["prompt_tokens"]
+                    else None
+                )
+                agents[agent] = summary
+
+            return agents
+
+
+# Statistics for all agents in the process
+prompt_stats = PromptStats()
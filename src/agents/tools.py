@@ -0,0 +1,237 @@
+"""
+Analyst Tools module for Financial Analysis System.
+
+Exposes the data loader's analyses as function-calling tools, so that an
+analyst agent can fetch exact figures on demand instead of receiving the whole
+data summary up front.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from src.data.loader import FinancialDataLoader
+
+# Longest tool result passed back to the model, in characters
+MAX_TOOL_RESULT_CHARS = 8000
+
+# Columns whose distinct values are listed in the initial context
+CONTEXT_DIMENSIONS = ("Segment", "Country", "Product", "Discount Band", "Year")
+
+
+class SegmentInput(BaseModel):
+    """Arguments of the analyze_segment tool."""
+
+    segment_name: str = Field(description="Exact segment name, e.g. 'Government'")
+
+
+class ProductInput(BaseModel):
+    """Arguments of the analyze_product tool."""
+
+    product_name: str = Field(description="Exact product name, e.g. 'Carretera'")
+
+
+class SectionInput(BaseModel):
+    """Arguments of the get_summary_section tool."""
+
+    section: str = Field(description="Summary section name, e.g. 'country_analysis'")
+
+
+class AggregateInput(BaseModel):
+    """Arguments of the aggregate_metrics tool."""
+
+    group_by: List[str] = Field(
+        default_factory=list,
+        description="Columns to group by, e.g. ['Segment', 'Country']; empty for totals",
+    )
+    filters: Optional[Dict[str, List[Any]]] = Field(
+        default=None,
+        description="Columns mapped to the values to keep, e.g. {'Year': [2014]}",
+    )
+
+
+class NoInput(BaseModel):
+    """Arguments of tools that take none."""
+
+
+class AnalystToolkit:
+    """
+    Function-calling tools over a FinancialDataLoader.
+
+    Tool results come from the loader's analysis methods, which are cached per
+    dataset version when the loader has a cache manager, so repeated tool
+    calls across questions and requests are served from the cache.
+    """
+
+    def __init__(self, data_loader: FinancialDataLoader):
+        """
+        Initialise the AnalystToolkit.
+
+        Args:
+            data_loader: Loader for the dataset the tools query
+        """
+        self.data_loader = data_loader
+        self.lock = threading.Lock()
+        self.calls = {}
+
+        self.tools = [
+            StructuredTool.from_function(
+                func=self._summary_section,
+                name="get_summary_section",
+                description="Get one section of the precomputed data summary: "
+                "segment_analysis, country_analysis, product_analysis, "
+                "discount_analysis or monthly_analysis.",
+                args_schema=SectionInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.analyze_segment,
+                name="analyze_segment",
+                description="Detailed figures for one segment, with country, "
+                "product and monthly breakdowns.",
+                args_schema=SegmentInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.analyze_product,
+                name="analyze_product",
+                description="Detailed figures for one product, with segment and "
+                "country breakdowns.",
+                args_schema=ProductInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.analyze_discount_impact,
+                name="analyze_discount_impact",
+                description="Sales, profit and margins by discount band, overall "
+                "and per segment.",
+                args_schema=NoInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.get_correlation_matrix,
+                name="get_correlation_matrix",
+                description="Correlation coefficients between the numerical columns.",
+                args_schema=NoInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.get_segment_country_matrix,
+                name="get_segment_country_matrix",
+                description="Total profit for every segment and country pair.",
+                args_schema=NoInput,
+            ),
+            StructuredTool.from_function(
+                func=self.data_loader.aggregate_metrics,
+                name="aggregate_metrics",
+                description="Sales, profit, units sold and profit margin grouped "
+                "by any columns, optionally filtered to specific values. Use this "
+                "for figures the other tools do not cover.",
+                args_schema=AggregateInput,
+            ),
+        ]
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+
+    def context(self) -> str:
+        """
+        Describe the dataset compactly: its columns, the values of its main
+        dimensions and its overall totals.
+
+        Returns:
+            Initial context for the analyst
+        """
+        data = self.data_loader.data
+        if data is None:
+            data = self.data_loader.load_data()
+
+        lines = [
+            f"DATASET: {Path(self.data_loader.file_path).name} "
+            f"(version {self.data_loader.fingerprint()[:12]}, {len(data)} rows)",
+            "COLUMNS: "
+            + ", ".join(f"{column} ({data[column].dtype})" for column in data.columns),
+        ]
+
+        for dimension in CONTEXT_DIMENSIONS:
+            if dimension in data.columns:
+                values = sorted(data[dimension].dropna().unique().tolist(), key=str)
+                lines.append(f"{dimension.upper()}: {', '.join(map(str, values))}")
+
+        if {"Sales", "Profit"} <= set(data.columns):
+            sales = float(data["Sales"].sum())
+            profit = float(data["Profit"].sum())
+            lines.append(
+                f"TOTALS: Sales {sales:.0f} | Profit {profit:.0f} | "
+                f"Profit Margin {profit / sales * 100:.2f}%"
+            )
+
+        return "\n".join(lines)
+
+    def run(self, name: str, arguments: Dict[str, Any]) -> str:
+        """
+        Run a tool call requested by the model.
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+
+        Returns:
+            Tool result as compact JSON, or an error message the model can act on
+        """
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return json.dumps({"error": f"Unknown tool: {name}"})
+
+        try:
+            result = tool.invoke(arguments or {})
+        except Exception as e:
+            print(f"Error running tool {name}: {e}")
+            return json.dumps({"error": f"{name} failed: {e}"})
+
+        text = json.dumps(
+            _round_floats(result), separators=(",", ":"), default=_json_default
+        )
+        if len(text) > MAX_TOOL_RESULT_CHARS:
+            text = text[:MAX_TOOL_RESULT_CHARS] + "... (truncated)"
+        return text
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the number of calls per tool.
+
+        Returns:
+            Dictionary mapping tool names to call counts
+        """
+        with self.lock:
+            return dict(self.calls)
+
+    def _summary_section(self, section: str) -> Any:
+        """Get a section of the loader's data summary."""
+        summary = self.data_loader.summary_stats or (
+            self.data_loader.get_summary_statistics()
+        )
+        if section not in summary:
+            return {
+                "error": f"Unknown section: {section}",
+                "sections": [k for k, v in summary.items() if isinstance(v, list)],
+            }
+        return summary[section]
+
+
+def _json_default(value: Any) -> Any:
+    """Convert numpy and pandas values for JSON encoding."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _round_floats(value: Any) -> Any:
+    """Round floats in a tool result to two decimals to save tokens."""
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {key: _round_floats(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(item) for item in value]
+    return value
@@ -0,0 +1,466 @@
+"""
+Cache Codecs module for Financial Analysis System.
+Serialises and optionally compresses cache values for persistent storage.
+"""
+
+import base64
+import io
+import json
+import pickle
+import zlib
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Binary cache files start with this marker followed by a JSON header line
+MAGIC = b"FISC\x01"
+
+# File extensions used by the persistent cache
+JSON_EXTENSION = ".json"
+BINARY_EXTENSION = ".cache"
+CACHE_FILE_EXTENSIONS = (JSON_EXTENSION, BINARY_EXTENSION)
+
+SERIALIZERS = ("json", "pickle", "msgpack", "npz")
+
+# Serialisers that cannot run code while decoding, for entries from other
+# processes (msgpack only without its pickle extension)
+SAFE_SERIALIZERS = ("json", "msgpack")
+COMPRESSIONS = (None, "zlib", "zstd")
+
+# msgpack extension type codes
+_EXT_NDARRAY = 1
+_EXT_PICKLE = 2
+_EXT_TUPLE = 3
+
+
+class CacheCodecError(Exception):
+    """Raised when a cache entry cannot be encoded or decoded."""
+
+
+class CacheCodec:
+    """
+    Serialises cache values to bytes with an optional compression step.
+
+    The "json" serialiser without compression writes the legacy
+    {"timestamp", "value"} JSON document. All other combinations write a binary
+    file with a small header carrying the format and timestamp, so entries can
+    be decoded (and expired) regardless of the codec currently configured.
+    """
+
+    def __init__(
+        self,
+        serializer: str = "json",
+        compression: Optional[str] = None,
+        level: Optional[int] = None,
+        allow_pickle: bool = True,
+    ):
+        """
+        Initialise the CacheCodec.
+
+        Args:
+            serializer: Serialisation format ("json", "pickle", "msgpack" or "npz")
+            compression: Optional compression ("zlib" or "zstd")
+            level: Optional compression level
+            allow_pickle: Whether values msgpack cannot encode natively (e.g.
+                DataFrames) may fall back to pickle. Must be False for entries
+                read by untrusted readers; such values then fail to encode.
+        """
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if not allow_pickle and serializer not in SAFE_SERIALIZERS:
+            raise ValueError(f"The {serializer} serializer always uses pickle")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if serializer == "msgpack" and msgpack is None:
+            raise ImportError("The msgpack package is required for the msgpack codec")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("The zstandard package is required for zstd compression")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.level = level
+        self.allow_pickle = allow_pickle
+
+    @property
+    def is_legacy_json(self) -> bool:
+        """Whether this codec writes plain JSON cache files."""
+        return self.serializer == "json" and self.compression is None
+
+    @property
+    def extension(self) -> str:
+        """File extension for entries written by this codec."""
+        return JSON_EXTENSION if self.is_legacy_json else BINARY_EXTENSION
+
+    def __repr__(self) -> str:
+        if self.compression:
+            return f"CacheCodec('{self.serializer}+{self.compression}')"
+        return f"CacheCodec('{self.serializer}')"
+
+    def dumps(self, value: Any, timestamp: float) -> bytes:
+        """
+        Encode a cache entry.
+
+        Args:
+            value: Value to cache
+            timestamp: Timestamp for the cache entry
+
+        Returns:
+            Encoded bytes ready to be written to disk
+        """
+        if self.is_legacy_json:
+            return json.dumps({"timestamp": timestamp, "value": value}).encode()
+
+        try:
+            if self.serializer != "json":
+                value = _pack_images(value)
+
+            payload = _serialize(self.serializer, value, self.allow_pickle)
+            payload = _compress(self.compression, payload, self.level)
+        except CacheCodecError:
+            raise
+        except Exception as e:
+            raise CacheCodecError(f"Could not encode cache value with {self}: {e}")
+
+        header = {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "timestamp": timestamp,
+        }
+
+        return MAGIC + json.dumps(header).encode() + b"\n" + payload
+
+
+def get_codec(spec: Union[str, CacheCodec, None]) -> CacheCodec:
+    """
+    Get a codec from a specification string such as "pickle+zlib".
+
+    Args:
+        spec: Codec specification, an existing codec, or None for legacy JSON
+
+    Returns:
+        CacheCodec instance
+    """
+    if isinstance(spec, CacheCodec):
+        return spec
+    if not spec:
+        return CacheCodec()
+
+    serializer, _, compression = spec.partition("+")
+    return CacheCodec(serializer, compression or None)
+
+
+def safe_codec(codec: CacheCodec) -> CacheCodec:
+    """
+    Get a codec whose entries can be decoded without unpickling, for entries
+    shared with other processes.
+
+    Args:
+        codec: Codec configured for the entry's namespace
+
+    Returns:
+        The codec's safe equivalent: its own serialiser when safe, otherwise
+        msgpack (or JSON without msgpack), keeping its compression
+    """
+    if codec.serializer in SAFE_SERIALIZERS:
+        serializer = codec.serializer
+    else:
+        serializer = "msgpack" if msgpack is not None else "json"
+
+    return CacheCodec(serializer, codec.compression, codec.level, allow_pickle=False)
+
+
+def loads(data: bytes, allow_pickle: bool = True) -> Tuple[Any, float]:
+    """
+    Decode a cache entry written by any codec.
+
+    Args:
+        data: Raw bytes of the cache file
+        allow_pickle: Whether entries that need unpickling may be decoded.
+            Must be False for data from untrusted sources, since unpickling
+            can run arbitrary code.
+
+    Returns:
+        Tuple of (value, timestamp)
+    """
+    try:
+        if not data.startswith(MAGIC):
+            entry = json.loads(data)
+            return entry["value"], entry["timestamp"]
+
+        header, payload = _split_header(data)
+        if not allow_pickle and header["serializer"] not in SAFE_SERIALIZERS:
+            raise CacheCodecError(
+                f"Refusing to decode untrusted {header['serializer']} entry"
+            )
+
+        payload = _decompress(header["compression"], payload)
+        value = _unpack_images(
+            _deserialize(header["serializer"], payload, allow_pickle)
+        )
+
+        return value, header["timestamp"]
+
+    except CacheCodecError:
+        raise
+    except Exception as e:
+        raise CacheCodecError(f"Invalid cache entry: {e}")
+
+
+def load_file(cache_file: str) -> Tuple[Any, float]:
+    """
+    Read and decode a cache file.
+
+    Args:
+        cache_file: Path to the cache file
+
+    Returns:
+        Tuple of (value, timestamp)
+    """
+    with open(cache_file, "rb") as f:
+        return loads(f.read())
+
+
+def load_timestamp(cache_file: str) -> float:
+    """
+    Read only the timestamp of a cache file.
+
+    Binary entries keep the timestamp in their header, so large values are not
+    decoded just to check expiry.
+
+    Args:
+        cache_file: Path to the cache file
+
+    Returns:
+        Timestamp of the cache entry
+    """
+    if cache_file.endswith(JSON_EXTENSION):
+        return load_file(cache_file)[1]
+
+    try:
+        with open(cache_file, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise CacheCodecError("Missing cache header")
+            return json.loads(f.readline())["timestamp"]
+    except CacheCodecError:
+        raise
+    except Exception as e:
+        raise CacheCodecError(f"Invalid cache header: {e}")
+
+
+def _split_header(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """Split a binary cache entry into its header and payload."""
+    newline = data.index(b"\n", len(MAGIC))
+    header = json.loads(data[len(MAGIC) : newline])
+    return header, data[newline + 1 :]
+
+
+def _compress(
+    compression: Optional[str], payload: bytes, level: Optional[int]
+) -> bytes:
+    """Compress a payload."""
+    if compression == "zlib":
+        return zlib.compress(payload, 6 if level is None else level)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(
+            payload
+        )
+    return payload
+
+
+def _decompress(compression: Optional[str], payload: bytes) -> bytes:
+    """Decompress a payload."""
+    if compression == "zlib":
+        return zlib.decompress(payload)
+    if compression == "zstd":
+        if zstandard is None:
+            raise CacheCodecError("The zstandard package is required to read entry")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def _serialize(serializer: str, value: Any, allow_pickle: bool = True) -> bytes:
+    """Serialise a value to bytes."""
+    if serializer == "json":
+        return json.dumps(value).encode()
+    if serializer == "pickle":
+        return pickle.dumps(value, protocol=5)
+    if serializer == "msgpack":
+        return msgpack.packb(
+            value,
+            default=_msgpack_default if allow_pickle else _msgpack_default_safe,
+            use_bin_type=True,
+            strict_types=True,
+        )
+    if serializer == "npz":
+        return _npz_dumps(value)
+    raise CacheCodecError(f"Unknown cache serializer: {serializer}")
+
+
+def _deserialize(serializer: str, payload: bytes, allow_pickle: bool = True) -> Any:
+    """Deserialise a value from bytes."""
+    if serializer == "json":
+        return json.loads(payload)
+    if serializer == "pickle":
+        return pickle.loads(payload)
+    if serializer == "msgpack":
+        if msgpack is None:
+            raise CacheCodecError("The msgpack package is required to read entry")
+        return msgpack.unpackb(
+            payload,
+            ext_hook=_msgpack_ext_hook if allow_pickle else _msgpack_ext_hook_safe,
+            raw=False,
+            strict_map_key=False,
+        )
+    if serializer == "npz":
+        return _npz_loads(payload)
+    raise CacheCodecError(f"Unknown cache serializer: {serializer}")
+
+
+def _msgpack_default(obj: Any, allow_pickle: bool = True) -> Any:
+    """Encode types msgpack does not support natively."""
+    if isinstance(obj, tuple):
+        return msgpack.ExtType(
+            _EXT_TUPLE,
+            msgpack.packb(
+                list(obj),
+                default=_msgpack_default if allow_pickle else _msgpack_default_safe,
+                use_bin_type=True,
+                strict_types=True,
+            ),
+        )
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        buf = io.BytesIO()
+        np.save(buf, obj, allow_pickle=False)
+        return msgpack.ExtType(_EXT_NDARRAY, buf.getvalue())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, list):
+        return list(obj)
+
+    if not allow_pickle:
+        raise TypeError(f"Cannot encode {type(obj).__name__} without pickle")
+
+    # DataFrames, Series and anything else fall back to pickle
+    return msgpack.ExtType(_EXT_PICKLE, pickle.dumps(obj, protocol=5))
+
+
+def _msgpack_default_safe(obj: Any) -> Any:
+    """Encode types msgpack does not support natively, without pickle."""
+    return _msgpack_default(obj, allow_pickle=False)
+
+
+def _msgpack_ext_hook(code: int, data: bytes, allow_pickle: bool = True) -> Any:
+    """Decode msgpack extension types."""
+    if code == _EXT_TUPLE:
+        return tuple(
+            msgpack.unpackb(
+                data,
+                ext_hook=_msgpack_ext_hook if allow_pickle else _msgpack_ext_hook_safe,
+                raw=False,
+                strict_map_key=False,
+            )
+        )
+    if code == _EXT_NDARRAY:
+        return np.load(io.BytesIO(data), allow_pickle=False)
+    if code == _EXT_PICKLE:
+        if not allow_pickle:
+            raise CacheCodecError("Refusing to unpickle untrusted msgpack value")
+        return pickle.loads(data)
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_ext_hook_safe(code: int, data: bytes) -> Any:
+    """Decode msgpack extension types, refusing pickled values."""
+    return _msgpack_ext_hook(code, data, allow_pickle=False)
+
+
+def _npz_dumps(value: Any) -> bytes:
+    """
+    Serialise a value with numpy arrays stored as raw npz members.
+
+    Arrays anywhere in the value are extracted into the archive and the
+    remaining structure is pickled alongside them.
+    """
+    arrays = {}
+
+    def extract(obj):
+        if isinstance(obj, np.ndarray) and obj.dtype != object:
+            name = f"arr_{len(arrays)}"
+            arrays[name] = obj
+            return {"__npz_array__": name}
+        if isinstance(obj, dict):
+            return {k: extract(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(extract(v) for v in obj)
+        return obj
+
+    skeleton = pickle.dumps(extract(value), protocol=5)
+    arrays["__skeleton__"] = np.frombuffer(skeleton, dtype=np.uint8)
+
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _npz_loads(payload: bytes) -> Any:
+    """Deserialise a value written by _npz_dumps."""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+
+    skeleton = pickle.loads(arrays.pop("__skeleton__").tobytes())
+
+    def restore(obj):
+        if isinstance(obj, dict):
+            if set(obj) == {"__npz_array__"}:
+                return arrays[obj["__npz_array__"]]
+            return {k: restore(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(restore(v) for v in obj)
+        return obj
+
+    return restore(skeleton)
+
+
+def _pack_images(value: Any) -> Any:
+    """
+    Replace base64 chart images with their raw bytes.
+
+    Chart data produced by VisualisationGenerator stores PNGs as base64 strings,
+    which are a third larger than the image itself.
+    """
+    if isinstance(value, dict):
+        packed = {k: _pack_images(v) for k, v in value.items()}
+        if value.get("chart_type") == "base64_image" and isinstance(
+            value.get("image_data"), str
+        ):
+            packed["image_data"] = {
+                "__base64_bytes__": base64.b64decode(value["image_data"])
+            }
+        return packed
+    if isinstance(value, list):
+        return [_pack_images(v) for v in value]
+    return value
+
+
+def _unpack_images(value: Any) -> Any:
+    """Restore base64 chart images packed by _pack_images."""
+    if isinstance(value, dict):
+        if set(value) == {"__base64_bytes__"}:
+            return base64.b64encode(value["__base64_bytes__"]).decode("utf-8")
+        return {k: _unpack_images(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unpack_images(v) for v in value]
+    return value
@@ -3,14 +3,37 @@ Cache Manager module for Financial Analysis System.
 Provides caching functionality to improve performance.
 """
 
+import atexit
+import copy
 import functools
 import hashlib
 import json
 import os
+import queue
+import tempfile
 import threading
 import time
 from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.cache.codecs import (
+    CACHE_FILE_EXTENSIONS,
+    CacheCodec,
+    CacheCodecError,
+    get_codec,
+    load_timestamp,
+    loads,
+    safe_codec,
+)
+from src.cache.metrics import CacheMetrics
+from src.cache.shared import SharedCacheClient
+from src.maintenance.scheduler import MaintenanceScheduler, iter_remove_old_files
+
+# Temporary files older than this are left over from interrupted writes
+ORPHANED_TEMP_FILE_AGE = 3600
 
 
 class CacheManager:
@@ -19,7 +42,19 @@ class CacheManager:
     """
 
     def __init__(
-        self, cache_dir: str = "cache", max_age_days: int = 7, memcache_size: int = 100
+        self,
+        cache_dir: str = "cache",
+        max_age_days: int = 7,
+        memcache_size: int = 100,
+        namespace_ttls: Optional[Dict[str, Tuple[float, float]]] = None,
+        namespace_codecs: Optional[Dict[str, Union[str, CacheCodec]]] = None,
+        write_behind: bool = False,
+        write_queue_size: int = 1000,
+        write_batch_size: int = 50,
+        shared_address: Optional[str] = None,
+        shared_secret: Optional[str] = None,
+        scheduler: Optional[MaintenanceScheduler] = None,
+        sweep_interval_seconds: float = 3600,
     ):
         """
         Initialise the CacheManager.
@@ -28,20 +63,118 @@ class CacheManager:
             cache_dir: Directory to store persistent cache
             max_age_days: Maximum age for cache entries in days
             memcache_size: Maximum number of entries in memory cache
+            namespace_ttls: Optional mapping of key namespace (the key prefix before
+                the first underscore, e.g. "qa" or "stats") to a (soft, hard) TTL
+                pair in seconds. Entries older than the soft TTL are served stale
+                while a background refresh runs; entries older than the hard TTL
+                are expired.
+            namespace_codecs: Optional mapping of key namespace to the codec used
+                for its persistent entries, either a CacheCodec or a specification
+                such as "pickle+zlib" or "msgpack+zstd". Namespaces without a codec
+                are stored as plain JSON.
+            write_behind: Whether to persist entries from a background writer
+                instead of on the calling thread
+            write_queue_size: Maximum number of keys waiting to be persisted in
+                write-behind mode; further writes are dropped (memory tier only)
+            write_batch_size: Maximum number of entries persisted per batch
+            shared_address: Optional address of a shared cache daemon
+                ("unix:/path" or "host:port", see src.cache.shared). When set,
+                entries are shared with every worker process connected to the
+                daemon, and writes and invalidations in one worker evict stale
+                copies from the memory tier of the others. Shared entries are
+                encoded without pickle, so values only pickle can encode (e.g.
+                DataFrames) stay local to the worker.
+            shared_secret: Secret for signing shared entries; required when
+                shared_address is a TCP address
+            scheduler: Optional maintenance scheduler. When given, expired entries
+                and orphaned temporary files are swept incrementally in the
+                background instead of synchronously on startup.
+            sweep_interval_seconds: Interval between background expiry sweeps
         """
         self.cache_dir = cache_dir
         self.max_age = timedelta(days=max_age_days)
         self.memcache_size = memcache_size
         self.memcache = {}
 
+        # Per-namespace (soft, hard) TTLs in seconds
+        self.namespace_ttls = {}
+        for namespace, (soft_ttl, hard_ttl) in (namespace_ttls or {}).items():
+            self.set_namespace_ttl(namespace, soft_ttl, hard_ttl)
+
+        # Per-namespace codecs for persistent entries
+        self.default_codec = CacheCodec()
+        self.namespace_codecs = {
+            namespace: get_codec(spec)
+            for namespace, spec in (namespace_codecs or {}).items()
+        }
+
+        # Keys with a background refresh in flight
+        self.refreshing = set()
+
+        # Per-namespace hit/miss counters and latency histograms
+        self.metrics = CacheMetrics()
+
         # Create cache directory if it doesn't exist
         os.makedirs(cache_dir, exist_ok=True)
 
         # Initialise lock for thread safety
         self.lock = threading.Lock()
 
-        # Clean old cache entries on startup
-        self.clean_old_entries()
+        # Serialises disk writes with invalidations so removed entries stay removed
+        self.io_lock = threading.Lock()
+
+        # Write-behind persistence: entries waiting to be written, keyed by cache key
+        self.write_behind = write_behind
+        self.write_batch_size = write_batch_size
+        self.pending_writes = {}
+        self.write_queue = queue.Queue(maxsize=write_queue_size)
+        self.write_stats = {
+            "queued": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "errors": 0,
+        }
+        self.writer_thread = None
+
+        if write_behind:
+            self.writer_thread = threading.Thread(
+                target=self._write_behind_worker, daemon=True
+            )
+            self.writer_thread.start()
+
+            # Flush pending writes when the process exits
+            atexit.register(self.close)
+
+        # Cross-process tier shared with other workers
+        self.shared = None
+        if shared_address:
+            self.shared = SharedCacheClient(
+                shared_address,
+                on_event=self._handle_shared_event,
+                secret=shared_secret,
+            )
+
+        # Clean old cache entries, in the background if a scheduler is available
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.add_job(
+                f"cache-expiry:{cache_dir}",
+                self.iter_clean_old_entries,
+                sweep_interval_seconds,
+                priority=10,
+                initial_delay=0,
+            )
+            scheduler.add_job(
+                f"cache-temp-files:{cache_dir}",
+                lambda: iter_remove_old_files(
+                    cache_dir, ORPHANED_TEMP_FILE_AGE, suffix=".tmp"
+                ),
+                sweep_interval_seconds,
+                priority=50,
+            )
+        else:
+            self.clean_old_entries()
 
     def _generate_key(self, data: Any) -> str:
         """
@@ -61,56 +194,360 @@ class CacheManager:
 
         return hashlib.md5(data_str.encode()).hexdigest()
 
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
+    def make_key(self, prefix: str, data: Any) -> str:
+        """
+        Build a namespaced cache key from arbitrary input data.
+
+        Args:
+            prefix: Key prefix (the first component is used as the namespace)
+            data: Input data to hash
+
+        Returns:
+            Cache key of the form "<prefix>_<hash>"
+        """
+        return f"{prefix}_{self._generate_key(data)}"
+
+    def _namespace(self, key: str) -> str:
+        """
+        Get the namespace of a cache key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Key prefix before the first underscore, or an empty string
+        """
+        return key.split("_", 1)[0] if "_" in key else ""
+
+    def set_namespace_ttl(
+        self, namespace: str, soft_ttl_seconds: float, hard_ttl_seconds: float
+    ) -> None:
+        """
+        Configure stale-while-revalidate TTLs for a namespace.
+
+        Args:
+            namespace: Key namespace (e.g. "qa", "stats", "viz")
+            soft_ttl_seconds: Age after which entries are refreshed in the background
+            hard_ttl_seconds: Age after which entries are expired
+        """
+        if soft_ttl_seconds > hard_ttl_seconds:
+            raise ValueError(
+                f"Soft TTL ({soft_ttl_seconds}s) cannot exceed hard TTL "
+                f"({hard_ttl_seconds}s) for namespace '{namespace}'"
+            )
+
+        self.namespace_ttls[namespace] = (soft_ttl_seconds, hard_ttl_seconds)
+
+    def _get_ttls(self, key: str) -> Tuple[float, float]:
+        """
+        Get the (soft, hard) TTLs in seconds that apply to a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (soft_ttl, hard_ttl); both default to max_age
+        """
+        max_age = self.max_age.total_seconds()
+        return self.namespace_ttls.get(self._namespace(key), (max_age, max_age))
+
+    def _get_codec(self, key: str) -> CacheCodec:
+        """
+        Get the codec used to persist a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CacheCodec for the key's namespace
+        """
+        return self.namespace_codecs.get(self._namespace(key), self.default_codec)
+
+    def _cache_files(self, key: str) -> List[str]:
+        """
+        Get the possible persistent cache file paths for a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            List of file paths, one per supported file extension
+        """
+        return [
+            os.path.join(self.cache_dir, f"{key}{extension}")
+            for extension in CACHE_FILE_EXTENSIONS
+        ]
+
+    def _key_from_filename(self, filename: str) -> Optional[str]:
+        """
+        Get the cache key stored in a persistent cache file.
+
+        Args:
+            filename: Name of a file in the cache directory
+
+        Returns:
+            Cache key, or None if the file is not a cache entry
+        """
+        for extension in CACHE_FILE_EXTENSIONS:
+            if filename.endswith(extension):
+                return filename[: -len(extension)]
+        return None
+
+    def _is_expired(self, key: str, timestamp: float) -> bool:
+        """
+        Check whether an entry is past its hard TTL.
+
+        Args:
+            key: Cache key
+            timestamp: Timestamp of the cache entry
+
+        Returns:
+            True if the entry has expired
+        """
+        return timestamp + self._get_ttls(key)[1] < time.time()
+
+    def get(
+        self, key: str, refresh_func: Optional[Callable[[], Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Get a value from the cache.
 
+        Stale entries (past the soft TTL but within the hard TTL) are returned;
+        pass refresh_func, or use get_or_refresh, to also schedule a background
+        refresh for them.
+
         Args:
             key: Cache key
+            refresh_func: Optional function that computes the value for this
+                key, called in the background when the entry is stale
 
         Returns:
             Cached value or None if not found or expired
         """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+
+        value, timestamp = entry
+        if refresh_func is not None:
+            self._refresh_if_stale(key, timestamp, refresh_func)
+
+        return value
+
+    def get_or_refresh(self, key: str, refresh_func: Callable[[], Any]) -> Any:
+        """
+        Get a value using stale-while-revalidate semantics.
+
+        Fresh entries are returned directly. Stale entries are returned immediately
+        and a background refresh is scheduled. Missing or expired entries are
+        computed synchronously and cached.
+
+        Args:
+            key: Cache key
+            refresh_func: Function that computes the value for this key
+
+        Returns:
+            Cached or freshly computed value
+        """
+        entry = self._lookup(key)
+
+        if entry is None:
+            value = refresh_func()
+            self.set(key, value)
+            return value
+
+        value, timestamp = entry
+
+        # Serve stale entries immediately and refresh in the background
+        self._refresh_if_stale(key, timestamp, refresh_func)
+
+        return value
+
+    def _refresh_if_stale(
+        self, key: str, timestamp: float, refresh_func: Callable[[], Any]
+    ) -> None:
+        """
+        Schedule a background refresh if an entry is past its soft TTL.
+
+        Args:
+            key: Cache key
+            timestamp: Timestamp of the cached entry
+            refresh_func: Function that computes the value for this key
+        """
+        soft_ttl = self._get_ttls(key)[0]
+        if timestamp + soft_ttl < time.time():
+            self.metrics.increment(self._namespace(key), "stale_serves")
+            self._schedule_refresh(key, refresh_func)
+
+    def _schedule_refresh(self, key: str, refresh_func: Callable[[], Any]) -> None:
+        """
+        Refresh a cache entry in a background thread.
+
+        Only one refresh runs per key at a time.
+
+        Args:
+            key: Cache key
+            refresh_func: Function that computes the value for this key
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh_worker():
+            try:
+                self.set(key, refresh_func())
+            except Exception as e:
+                # Keep serving the stale value; it expires at the hard TTL
+                print(f"Background refresh failed for cache key {key}: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        thread = threading.Thread(target=refresh_worker, daemon=True)
+        thread.start()
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Look up a cache entry and record the lookup in the cache metrics.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (value, timestamp) or None if not found or expired
+        """
+        start_time = time.perf_counter()
+        entry, tier, nbytes = self._lookup_tiers(key)
+
+        self.metrics.record_get(
+            self._namespace(key), tier, time.perf_counter() - start_time, nbytes
+        )
+
+        return entry
+
+    def _lookup_tiers(
+        self, key: str
+    ) -> Tuple[Optional[Tuple[Any, float]], Optional[str], int]:
+        """
+        Look up a cache entry in the memory, shared and persistent tiers.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of ((value, timestamp) or None if not found or expired, name of
+            the tier that served the entry, bytes read from shared or disk tiers)
+        """
         # Try memory cache first (faster)
         with self.lock:
             if key in self.memcache:
                 entry = self.memcache[key]
 
                 # Check if expired
-                if entry["timestamp"] + self.max_age.total_seconds() < time.time():
+                if self._is_expired(key, entry["timestamp"]):
                     del self.memcache[key]
-                    return None
+                    self.metrics.increment(self._namespace(key), "expirations")
+                    return None, None, 0
 
                 # Return the cached value
-                return entry["value"]
+                return (entry["value"], entry["timestamp"]), "memory", 0
+
+            # Entries evicted from memory may still be waiting to be persisted
+            if key in self.pending_writes:
+                value, timestamp = self.pending_writes[key]
+                if not self._is_expired(key, timestamp):
+                    return (value, timestamp), "pending", 0
+
+        # Try the cache shared with other worker processes
+        if self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                try:
+                    # Other processes are not trusted to send pickles
+                    value, timestamp = loads(data, allow_pickle=False)
+                    if not self._is_expired(key, timestamp):
+                        with self.lock:
+                            self._add_to_memcache(key, value, timestamp)
+                        return (value, timestamp), "shared", len(data)
+                except CacheCodecError:
+                    pass
 
         # Try persistent cache if not in memory
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
+        for cache_file in self._cache_files(key):
+            if not os.path.exists(cache_file):
+                continue
 
-        if os.path.exists(cache_file):
             try:
-                with open(cache_file, "r") as f:
-                    cache_entry = json.load(f)
+                with open(cache_file, "rb") as f:
+                    data = f.read()
+                value, timestamp = loads(data)
 
                 # Check if expired
-                timestamp = cache_entry["timestamp"]
-                if timestamp + self.max_age.total_seconds() < time.time():
+                if self._is_expired(key, timestamp):
                     # Remove expired entry
-                    os.remove(cache_file)
-                    return None
+                    self._remove_file(cache_file)
+                    self.metrics.increment(self._namespace(key), "expirations")
+                    return None, None, len(data)
 
                 # Add to memory cache for faster access next time
                 with self.lock:
-                    self._add_to_memcache(key, cache_entry["value"], timestamp)
+                    self._add_to_memcache(key, value, timestamp)
+
+                # Let other workers pick it up without touching disk
+                self._share(key, value, timestamp)
 
-                return cache_entry["value"]
+                return (value, timestamp), "disk", len(data)
 
-            except (json.JSONDecodeError, KeyError):
+            except FileNotFoundError:
+                # Removed by another process since the existence check
+                continue
+
+            except CacheCodecError:
                 # Invalid cache entry, remove it
-                os.remove(cache_file)
-                return None
+                self._remove_file(cache_file)
+                return None, None, 0
 
-        return None
+        return None, None, 0
+
+    def _share(self, key: str, value: Any, timestamp: float) -> None:
+        """
+        Publish an entry to the shared cache, if one is configured.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            timestamp: Timestamp for the cache entry
+        """
+        if self.shared is None:
+            return
+
+        try:
+            data = safe_codec(self._get_codec(key)).dumps(value, timestamp)
+        except (CacheCodecError, TypeError, ValueError) as e:
+            print(f"Could not share cache key {key}: {e}")
+            return
+
+        self.shared.set(key, data, timestamp)
+
+    def _handle_shared_event(self, event: Dict[str, Any]) -> None:
+        """
+        Drop memory tier entries made stale by another worker.
+
+        Args:
+            event: Event broadcast by the shared cache daemon
+        """
+        kind = event.get("event")
+
+        with self.lock:
+            if kind in ("set", "invalidate"):
+                self.memcache.pop(event.get("key"), None)
+            elif kind == "invalidate_prefix":
+                prefix = event.get("prefix", "")
+                for key in [key for key in self.memcache if key.startswith(prefix)]:
+                    del self.memcache[key]
+            elif kind == "clear":
+                self.memcache.clear()
 
     def set(self, key: str, value: Any) -> None:
         """
@@ -120,19 +557,242 @@ class CacheManager:
             key: Cache key
             value: Value to cache
         """
+        start_time = time.perf_counter()
         timestamp = time.time()
 
         # Add to memory cache
         with self.lock:
             self._add_to_memcache(key, value, timestamp)
 
+        # Add to the cache shared with other workers
+        self._share(key, value, timestamp)
+
         # Add to persistent cache
-        cache_entry = {"timestamp": timestamp, "value": value}
+        if self.write_behind:
+            self._enqueue_write(key, value, timestamp)
+        else:
+            with self.io_lock:
+                self._write_to_disk(key, value, timestamp)
+
+        self.metrics.record_set(self._namespace(key), time.perf_counter() - start_time)
+
+    def _write_to_disk(self, key: str, value: Any, timestamp: float) -> None:
+        """
+        Write a cache entry to the persistent cache.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            timestamp: Timestamp for the cache entry
+        """
+        codec = self._get_codec(key)
+        cache_file = os.path.join(self.cache_dir, f"{key}{codec.extension}")
+        payload = codec.dumps(value, timestamp)
+
+        # Write to a temporary file and rename it into place, so readers in other
+        # processes never see a partially written entry
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            self._remove_file(tmp_file)
+            raise
+
+        self.metrics.increment(self._namespace(key), "bytes_written", len(payload))
+
+        # Remove any copy written by a previously configured codec
+        for other_file in self._cache_files(key):
+            if other_file != cache_file:
+                self._remove_file(other_file)
+
+    def _remove_file(self, cache_file: str) -> bool:
+        """
+        Remove a cache file that another process may already have removed.
+
+        Args:
+            cache_file: Path to the cache file
+
+        Returns:
+            True if this call removed the file
+        """
+        try:
+            os.remove(cache_file)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _enqueue_write(self, key: str, value: Any, timestamp: float) -> None:
+        """
+        Queue a cache entry for the background writer.
+
+        Repeated writes to a key that is already queued are coalesced, so only
+        the latest value is persisted.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            timestamp: Timestamp for the cache entry
+        """
+        with self.lock:
+            already_queued = key in self.pending_writes
+            self.pending_writes[key] = (value, timestamp)
+
+            if already_queued:
+                return
+
+            try:
+                self.write_queue.put_nowait(key)
+                self.write_stats["queued"] += 1
+            except queue.Full:
+                # The value stays in the memory tier but is not persisted
+                del self.pending_writes[key]
+                self.write_stats["dropped"] += 1
+
+    def _write_behind_worker(self) -> None:
+        """
+        Persist queued cache entries in batches until close() is called.
+        """
+        while True:
+            batch = [self.write_queue.get()]
+
+            # Drain whatever else is waiting, up to the batch size
+            while len(batch) < self.write_batch_size:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            with self.io_lock:
+                for key in batch:
+                    if key is None:
+                        stop = True
+                        continue
+
+                    with self.lock:
+                        entry = self.pending_writes.pop(key, None)
+
+                    if entry is None:
+                        # Invalidated before it was persisted
+                        continue
+
+                    try:
+                        self._write_to_disk(key, *entry)
+                        outcome = "written"
+                    except Exception as e:
+                        outcome = "errors"
+                        print(f"Failed to persist cache key {key}: {e}")
+
+                    with self.lock:
+                        self.write_stats[outcome] += 1
+
+            with self.lock:
+                self.write_stats["batches"] += 1
+            for _ in batch:
+                self.write_queue.task_done()
+
+            if stop:
+                return
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all queued write-behind entries have been persisted.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+        Returns:
+            True if the queue was drained, False if the timeout expired
+        """
+        if self.writer_thread is None:
+            return True
+
+        # The queue notifies this condition when its last task is done
+        with self.write_queue.all_tasks_done:
+            return self.write_queue.all_tasks_done.wait_for(
+                lambda: not self.write_queue.unfinished_tasks, timeout
+            )
+
+    def close(self) -> None:
+        """
+        Flush pending writes and stop the background writer.
+        """
+        if self.writer_thread is None or not self.writer_thread.is_alive():
+            return
+
+        # The sentinel is queued behind any pending writes
+        self.write_queue.put(None)
+        self.writer_thread.join()
+
+    def get_write_behind_stats(self) -> Dict[str, Any]:
+        """
+        Get write-behind persistence metrics.
+
+        Returns:
+            Dictionary with queue depth, pending entries and write counters
+        """
+        with self.lock:
+            stats = dict(self.write_stats)
+            stats["pending"] = len(self.pending_writes)
 
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
+        stats["enabled"] = self.write_behind
+        stats["queue_depth"] = self.write_queue.qsize()
+        stats["queue_capacity"] = self.write_queue.maxsize
 
-        with open(cache_file, "w") as f:
-            json.dump(cache_entry, f)
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of cache metrics and current cache sizes.
+
+        Returns:
+            Dictionary with per-namespace counters and latency histograms, entry
+            counts and bytes on disk per namespace, write-behind metrics and,
+            when configured, shared cache daemon statistics
+        """
+        stats = self.metrics.snapshot()
+
+        with self.lock:
+            memory_entries = {}
+            for key in self.memcache:
+                namespace = self._namespace(key) or "(none)"
+                memory_entries[namespace] = memory_entries.get(namespace, 0) + 1
+            memory_total = len(self.memcache)
+            refreshing = len(self.refreshing)
+
+        disk = {}
+        for filename in os.listdir(self.cache_dir):
+            key = self._key_from_filename(filename)
+            if key is None:
+                continue
+
+            try:
+                size = os.path.getsize(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                continue
+
+            usage = disk.setdefault(self._namespace(key) or "(none)", {})
+            usage["entries"] = usage.get("entries", 0) + 1
+            usage["bytes"] = usage.get("bytes", 0) + size
+
+        stats["memory"] = {
+            "entries": memory_total,
+            "capacity": self.memcache_size,
+            "namespaces": memory_entries,
+        }
+        stats["disk"] = {
+            "entries": sum(usage["entries"] for usage in disk.values()),
+            "bytes": sum(usage["bytes"] for usage in disk.values()),
+            "namespaces": disk,
+        }
+        stats["refreshing"] = refreshing
+        stats["write_behind"] = self.get_write_behind_stats()
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+
+        return stats
 
     def _add_to_memcache(self, key: str, value: Any, timestamp: float) -> None:
         """
@@ -143,12 +803,14 @@ class CacheManager:
             value: Value to cache
             timestamp: Timestamp for the cache entry
         """
-        # If we're at capacity, remove the oldest entry
-        if len(self.memcache) >= self.memcache_size:
+        # If we're at capacity, remove the oldest entry (replacing a key
+        # already in memory needs no room)
+        if key not in self.memcache and len(self.memcache) >= self.memcache_size:
             oldest_key = min(
                 self.memcache.keys(), key=lambda k: self.memcache[k]["timestamp"]
             )
             del self.memcache[oldest_key]
+            self.metrics.increment(self._namespace(oldest_key), "evictions")
 
         # Add the new entry
         self.memcache[key] = {"timestamp": timestamp, "value": value}
@@ -170,13 +832,22 @@ class CacheManager:
             if key in self.memcache:
                 del self.memcache[key]
                 found = True
+            if self.pending_writes.pop(key, None) is not None:
+                found = True
 
-        # Remove from persistent cache
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
+        # Remove from the shared cache (other workers are notified)
+        if self.shared is not None and self.shared.delete(key):
             found = True
 
+        # Remove from persistent cache
+        with self.io_lock:
+            for cache_file in self._cache_files(key):
+                if self._remove_file(cache_file):
+                    found = True
+
+        if found:
+            self.metrics.increment(self._namespace(key), "invalidations")
+
         return found
 
     def clean_old_entries(self) -> int:
@@ -186,41 +857,53 @@ class CacheManager:
         Returns:
             Number of entries cleaned
         """
-        count = 0
+        return sum(self.iter_clean_old_entries())
 
+    def iter_clean_old_entries(self) -> Iterator[int]:
+        """
+        Clean old entries from the cache incrementally, one file per step.
+
+        Yields:
+            Number of entries removed by each step
+        """
         # Clean memory cache
         with self.lock:
             current_time = time.time()
             keys_to_remove = []
 
             for key, entry in self.memcache.items():
-                if entry["timestamp"] + self.max_age.total_seconds() < current_time:
+                if entry["timestamp"] + self._get_ttls(key)[1] < current_time:
                     keys_to_remove.append(key)
 
             for key in keys_to_remove:
                 del self.memcache[key]
-                count += 1
+                self.metrics.increment(self._namespace(key), "expirations")
+
+        yield len(keys_to_remove)
 
         # Clean persistent cache
         for filename in os.listdir(self.cache_dir):
-            if filename.endswith(".json"):
-                cache_file = os.path.join(self.cache_dir, filename)
+            key = self._key_from_filename(filename)
+            if key is None:
+                continue
 
-                try:
-                    with open(cache_file, "r") as f:
-                        cache_entry = json.load(f)
+            cache_file = os.path.join(self.cache_dir, filename)
 
-                    timestamp = cache_entry["timestamp"]
-                    if timestamp + self.max_age.total_seconds() < time.time():
-                        os.remove(cache_file)
-                        count += 1
+            try:
+                timestamp = load_timestamp(cache_file)
+                expired = self._is_expired(key, timestamp)
+            except FileNotFoundError:
+                # Removed by another process
+                continue
+            except CacheCodecError:
+                # Invalid cache entry, remove it
+                expired = True
 
-                except (json.JSONDecodeError, KeyError):
-                    # Invalid cache entry, remove it
-                    os.remove(cache_file)
-                    count += 1
+            removed = expired and self._remove_file(cache_file)
+            if removed:
+                self.metrics.increment(self._namespace(key), "expirations")
 
-        return count
+            yield int(removed)
 
     def clear_all(self) -> int:
         """
@@ -235,12 +918,18 @@ class CacheManager:
         with self.lock:
             count += len(self.memcache)
             self.memcache.clear()
+            self.pending_writes.clear()
+
+        # Clear the shared cache (other workers are notified)
+        if self.shared is not None:
+            self.shared.clear()
 
         # Clear persistent cache
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith(".json"):
-                os.remove(os.path.join(self.cache_dir, filename))
-                count += 1
+        with self.io_lock:
+            for filename in os.listdir(self.cache_dir):
+                if self._key_from_filename(filename) is not None:
+                    if self._remove_file(os.path.join(self.cache_dir, filename)):
+                        count += 1
 
         return count
 
@@ -328,35 +1017,43 @@ class CacheManager:
 
     def timed_invalidation(self, keys_or_prefixes: list, interval_seconds: int):
         """
-        Start a thread to invalidate specific keys at regular intervals.
+        Invalidate specific keys at regular intervals.
+
+        The invalidation runs as a job on the maintenance scheduler (one is
+        created and started if the cache manager has none), so repeated calls do
+        not each start a thread. Calling this again with the same keys replaces
+        the existing job.
 
         Args:
-            keys_or_prefixes: List of keys or key prefixes to invalidate
+            keys_or_prefixes: List of keys or key prefixes (ending in "*") to
+                invalidate
             interval_seconds: Interval between invalidations in seconds
 
         Returns:
-            Thread object for the invalidation process
+            Name of the scheduled job
         """
+        if self.scheduler is None:
+            self.scheduler = MaintenanceScheduler()
+            self.scheduler.start()
 
-        def invalidation_worker():
-            while True:
-                for key_or_prefix in keys_or_prefixes:
-                    if key_or_prefix.endswith("*"):
-                        # This is a prefix, invalidate all matching keys
-                        prefix = key_or_prefix[:-1]
-                        self._invalidate_by_prefix(prefix)
-                    else:
-                        # This is a single key
-                        self.invalidate(key_or_prefix)
+        keys_or_prefixes = list(keys_or_prefixes)
 
-                # Sleep for the specified interval
-                time.sleep(interval_seconds)
-
-        # Start the invalidation thread
-        thread = threading.Thread(target=invalidation_worker, daemon=True)
-        thread.start()
+        def invalidation_job():
+            for key_or_prefix in keys_or_prefixes:
+                if key_or_prefix.endswith("*"):
+                    # This is a prefix, invalidate all matching keys
+                    yield from self.iter_invalidate_by_prefix(key_or_prefix[:-1])
+                else:
+                    # This is a single key
+                    yield int(self.invalidate(key_or_prefix))
 
-        return thread
+        return self.scheduler.add_job(
+            f"cache-invalidation:{self.cache_dir}:{','.join(keys_or_prefixes)}",
+            invalidation_job,
+            interval_seconds,
+            priority=20,
+            initial_delay=0,
+        )
 
     def _invalidate_by_prefix(self, prefix: str) -> int:
         """
@@ -368,21 +1065,141 @@ class CacheManager:
         Returns:
             Number of entries invalidated
         """
-        count = 0
+        return sum(self.iter_invalidate_by_prefix(prefix))
 
+    def iter_invalidate_by_prefix(self, prefix: str) -> Iterator[int]:
+        """
+        Invalidate entries with keys starting with a prefix, one file per step.
+
+        Args:
+            prefix: Key prefix to match
+
+        Yields:
+            Number of entries invalidated by each step
+        """
         # Invalidate in memory cache
         with self.lock:
             keys_to_remove = [key for key in self.memcache if key.startswith(prefix)]
             for key in keys_to_remove:
                 del self.memcache[key]
-                count += 1
+                self.metrics.increment(self._namespace(key), "invalidations")
+
+            for key in [key for key in self.pending_writes if key.startswith(prefix)]:
+                del self.pending_writes[key]
+
+        # Invalidate in the shared cache (other workers are notified)
+        if self.shared is not None:
+            self.shared.delete_prefix(prefix)
+
+        yield len(keys_to_remove)
 
         # Invalidate in persistent cache
         for filename in os.listdir(self.cache_dir):
-            if filename.endswith(".json"):
-                key = filename[:-5]  # Remove .json extension
-                if key.startswith(prefix):
-                    os.remove(os.path.join(self.cache_dir, filename))
-                    count += 1
+            key = self._key_from_filename(filename)
+            if key is not None and key.startswith(prefix):
+                with self.io_lock:
+                    removed = self._remove_file(os.path.join(self.cache_dir, filename))
+                if removed:
+                    self.metrics.increment(self._namespace(key), "invalidations")
+                yield int(removed)
 
-        return count
+
+def canonical_encode(obj: Any) -> bytes:
+    """
+    Encode a value into a canonical byte string for use in cache keys.
+
+    Unlike json.dumps, this handles tuples, sets, bytes, numpy values and pandas
+    objects, and gives the same encoding across processes and restarts.
+
+    Args:
+        obj: Value to encode
+
+    Returns:
+        Canonical byte encoding of the value
+
+    Raises:
+        TypeError: If the value contains an unsupported type
+    """
+    if obj is None or isinstance(obj, bool):
+        return repr(obj).encode()
+    if isinstance(obj, (int, float, str)):
+        return f"{type(obj).__name__}:{obj!r}".encode()
+    if isinstance(obj, (bytes, bytearray)):
+        return b"bytes:" + hashlib.sha256(obj).hexdigest().encode()
+    if isinstance(obj, np.generic):
+        return canonical_encode(obj.item())
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return b"ndarray:" + canonical_encode(obj.tolist())
+        digest = hashlib.sha256(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        return f"ndarray:{obj.dtype.str}:{obj.shape}:{digest}".encode()
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha256(
+            pd.util.hash_pandas_object(obj, index=True).values.tobytes()
+        ).hexdigest()
+        columns = obj.columns.tolist() if isinstance(obj, pd.DataFrame) else obj.name
+        return b"pandas:" + canonical_encode(columns) + digest.encode()
+    if isinstance(obj, (list, tuple)):
+        items = b",".join(canonical_encode(item) for item in obj)
+        return f"{type(obj).__name__}[".encode() + items + b"]"
+    if isinstance(obj, (set, frozenset)):
+        items = b",".join(sorted(canonical_encode(item) for item in obj))
+        return b"set{" + items + b"}"
+    if isinstance(obj, dict):
+        items = sorted(
+            (canonical_encode(k), canonical_encode(v)) for k, v in obj.items()
+        )
+        return b"dict{" + b",".join(k + b":" + v for k, v in items) + b"}"
+
+    raise TypeError(f"Cannot canonically encode value of type {type(obj).__name__}")
+
+
+def content_cached_method(namespace: str):
+    """
+    Decorator to memoize methods by dataset content and arguments.
+
+    Keys combine the instance's dataset content fingerprint with a canonical
+    encoding of the method name and arguments, so persistent entries are valid
+    across restarts and shared between worker processes. The instance must have
+    a `cache_manager` attribute (caching is skipped when it is None) and a
+    `fingerprint()` method. Calls with arguments that cannot be canonically
+    encoded are not cached. Callers get a copy of the result, so editing it
+    does not change the cached entry.
+
+    Args:
+        namespace: Cache key namespace for the memoized results
+
+    Returns:
+        Decorator function
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self_instance, *args, **kwargs):
+            cache = getattr(self_instance, "cache_manager", None)
+            if cache is None:
+                return method(self_instance, *args, **kwargs)
+
+            try:
+                arguments = canonical_encode([method.__qualname__, list(args), kwargs])
+            except TypeError:
+                return method(self_instance, *args, **kwargs)
+
+            fingerprint = self_instance.fingerprint()[:16]
+            digest = hashlib.sha256(arguments).hexdigest()[:32]
+            key = f"{namespace}_{fingerprint}_{digest}"
+
+            # Try to get from cache
+            cached_result = cache.get(key)
+            if cached_result is not None:
+                return copy.deepcopy(cached_result)
+
+            # Call the method and cache the result
+            result = method(self_instance, *args, **kwargs)
+            cache.set(key, result)
+
+            return copy.deepcopy(result)
+
+        return wrapper
+
+    return decorator
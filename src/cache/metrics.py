@@ -0,0 +1,223 @@
+"""
+Cache Metrics module for Financial Analysis System.
+Collects per-namespace cache counters and latency histograms.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+# Counters tracked for every namespace
+COUNTERS = (
+    "hits",
+    "memory_hits",
+    "pending_hits",
+    "shared_hits",
+    "disk_hits",
+    "misses",
+    "stale_serves",
+    "expirations",
+    "evictions",
+    "invalidations",
+    "sets",
+    "bytes_read",
+    "bytes_written",
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = LATENCY_BUCKETS_MS):
+        """
+        Initialise the LatencyHistogram.
+
+        Args:
+            buckets_ms: Ascending bucket upper bounds in milliseconds; an overflow
+                bucket is added for larger values
+        """
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Record a single observation.
+
+        Args:
+            seconds: Observed latency in seconds
+        """
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Estimate a percentile as the upper bound of the bucket containing it.
+
+        Args:
+            fraction: Percentile as a fraction between 0 and 1
+
+        Returns:
+            Estimated latency in milliseconds, or None without observations
+        """
+        if self.count == 0:
+            return None
+
+        rank = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                if index < len(self.buckets_ms):
+                    return min(self.buckets_ms[index], self.max_ms)
+                return self.max_ms
+
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a summary of the histogram.
+
+        Returns:
+            Dictionary with count, mean, max, percentile estimates and buckets
+        """
+        labels = [f"<={bound}ms" for bound in self.buckets_ms]
+        labels.append(f">{self.buckets_ms[-1]}ms")
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "max_ms": self.max_ms if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class CacheMetrics:
+    """
+    Thread-safe cache counters and get/set latency histograms per namespace.
+    """
+
+    def __init__(self):
+        """
+        Initialise the CacheMetrics.
+        """
+        self.lock = threading.Lock()
+        self.namespaces = {}
+
+    def _namespace(self, namespace: str) -> Dict[str, Any]:
+        """
+        Get the metrics for a namespace, creating them if needed. Caller holds
+        the lock.
+
+        Args:
+            namespace: Cache key namespace
+
+        Returns:
+            Dictionary of counters and histograms
+        """
+        metrics = self.namespaces.get(namespace)
+        if metrics is None:
+            metrics = {counter: 0 for counter in COUNTERS}
+            metrics["get_latency"] = LatencyHistogram()
+            metrics["set_latency"] = LatencyHistogram()
+            self.namespaces[namespace] = metrics
+        return metrics
+
+    def increment(self, namespace: str, counter: str, amount: int = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            namespace: Cache key namespace
+            counter: Counter name (one of COUNTERS)
+            amount: Amount to add
+        """
+        with self.lock:
+            self._namespace(namespace)[counter] += amount
+
+    def record_get(
+        self, namespace: str, tier: Optional[str], seconds: float, nbytes: int = 0
+    ) -> None:
+        """
+        Record a cache lookup.
+
+        Args:
+            namespace: Cache key namespace
+            tier: Tier that served the entry ("memory", "pending", "shared" or
+                "disk"), or None for a miss
+            seconds: Lookup latency in seconds
+            nbytes: Bytes read from the shared or persistent tier
+        """
+        with self.lock:
+            metrics = self._namespace(namespace)
+            if tier is None:
+                metrics["misses"] += 1
+            else:
+                metrics["hits"] += 1
+                metrics[f"{tier}_hits"] += 1
+            metrics["bytes_read"] += nbytes
+            metrics["get_latency"].record(seconds)
+
+    def record_set(self, namespace: str, seconds: float) -> None:
+        """
+        Record a cache write.
+
+        Args:
+            namespace: Cache key namespace
+            seconds: Latency of the write as seen by the caller, in seconds
+        """
+        with self.lock:
+            metrics = self._namespace(namespace)
+            metrics["sets"] += 1
+            metrics["set_latency"].record(seconds)
+
+    def reset(self) -> None:
+        """
+        Clear all metrics.
+        """
+        with self.lock:
+            self.namespaces = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a point-in-time copy of all metrics.
+
+        Returns:
+            Dictionary with per-namespace metrics and totals across namespaces
+        """
+        with self.lock:
+            namespaces = {}
+            totals = {counter: 0 for counter in COUNTERS}
+
+            for namespace, metrics in sorted(self.namespaces.items()):
+                summary = {counter: metrics[counter] for counter in COUNTERS}
+                summary["hit_ratio"] = _hit_ratio(summary)
+                summary["get_latency"] = metrics["get_latency"].snapshot()
+                summary["set_latency"] = metrics["set_latency"].snapshot()
+                namespaces[namespace or "(none)"] = summary
+
+                for counter in COUNTERS:
+                    totals[counter] += metrics[counter]
+
+        totals["hit_ratio"] = _hit_ratio(totals)
+
+        return {"namespaces": namespaces, "totals": totals}
+
+
+def _hit_ratio(counters: Dict[str, int]) -> Optional[float]:
+    """Fraction of lookups that were hits, or None without lookups."""
+    lookups = counters["hits"] + counters["misses"]
+    return counters["hits"] / lookups if lookups else None
@@ -0,0 +1,626 @@
+"""
+Shared Cache module for Financial Analysis System.
+Provides a cache daemon shared by all worker processes on a host, and the
+client CacheManager uses to talk to it.
+
+The daemon speaks a small framed protocol over a TCP or Unix socket. Each frame
+is an 8-byte header holding the JSON header length and payload length (both
+big-endian unsigned 32-bit integers), followed by the JSON header and the raw
+payload. Requests carry an "op" (GET, SET, DEL, DELPREFIX, CLEAR, SUBSCRIBE or
+STATS); responses carry a "status". Values are opaque bytes to the daemon, so a
+stand-in server in another language only needs to implement this framing.
+
+The daemon does not authenticate clients, so any process that can connect can
+store values. Unix sockets are created readable and writable by their owner
+only. Clients sign every value with an HMAC of a shared secret when one is
+configured (required for TCP addresses) and discard values that fail the check.
+
+Run the daemon with:
+    python -m src.cache.shared --address unix:/tmp/financial-cache.sock
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+FRAME_HEADER = struct.Struct(">II")
+
+# Upper bound for a single frame, to reject garbage from misbehaving peers
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+DEFAULT_ADDRESS = "unix:/tmp/financial-cache.sock"
+
+# Length of the HMAC-SHA256 signature prefixed to signed values
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+class SharedCacheError(Exception):
+    """Raised when the shared cache daemon cannot be reached or misbehaves."""
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Parse a shared cache address.
+
+    Args:
+        address: "unix:/path/to/socket" or "host:port"
+
+    Returns:
+        Tuple of (socket family, socket address)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid shared cache address: {address}")
+
+    return socket.AF_INET, (host, int(port))
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    """
+    Send a single protocol frame.
+
+    Args:
+        sock: Connected socket
+        header: JSON-serialisable frame header
+        payload: Raw frame payload
+    """
+    header_bytes = json.dumps(header).encode()
+    sock.sendall(
+        FRAME_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload
+    )
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """
+    Receive a single protocol frame.
+
+    Args:
+        sock: Connected socket
+
+    Returns:
+        Tuple of (header, payload), or None if the peer closed the connection
+    """
+    prefix = _recv_exactly(sock, FRAME_HEADER.size)
+    if prefix is None:
+        return None
+
+    header_length, payload_length = FRAME_HEADER.unpack(prefix)
+    if header_length + payload_length > MAX_FRAME_SIZE:
+        raise SharedCacheError(
+            f"Frame of {header_length + payload_length} bytes exceeds limit"
+        )
+
+    header_bytes = _recv_exactly(sock, header_length)
+    payload = _recv_exactly(sock, payload_length) if payload_length else b""
+    if header_bytes is None or payload is None:
+        raise SharedCacheError("Connection closed mid-frame")
+
+    return json.loads(header_bytes), payload
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or return None on a clean end of stream."""
+    chunks = []
+    remaining = size
+
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise SharedCacheError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+
+    return b"".join(chunks)
+
+
+class SharedCacheServer:
+    """
+    In-memory LRU cache shared by every worker process connected to it.
+
+    Writes and invalidations are broadcast to subscribed clients so they can
+    drop stale copies from their own memory tier.
+    """
+
+    def __init__(self, address: str, max_entries: int = 10000):
+        """
+        Initialise the SharedCacheServer.
+
+        Args:
+            address: Address to listen on ("unix:/path" or "host:port")
+            max_entries: Maximum number of entries held by the daemon
+        """
+        self.address = address
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.stats = {"gets": 0, "hits": 0, "sets": 0, "evictions": 0}
+        self.server = None
+
+    def serve_forever(self) -> None:
+        """
+        Listen for connections until shutdown() is called.
+        """
+        family, sock_address = parse_address(self.address)
+        cache = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                cache._handle_connection(self.request)
+
+        if family == socket.AF_UNIX:
+            # Remove a socket file left behind by a previous daemon
+            if os.path.exists(sock_address):
+                os.remove(sock_address)
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+
+        server_class.daemon_threads = True
+        server_class.allow_reuse_address = True
+
+        if family == socket.AF_UNIX:
+            # Create the socket file accessible to its owner only
+            umask = os.umask(0o177)
+            try:
+                self.server = server_class(sock_address, Handler)
+            finally:
+                os.umask(umask)
+            os.chmod(sock_address, 0o600)
+        else:
+            self.server = server_class(sock_address, Handler)
+
+        print(f"Shared cache listening on {self.address}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if family == socket.AF_UNIX and os.path.exists(sock_address):
+                os.remove(sock_address)
+
+    def shutdown(self) -> None:
+        """
+        Stop serving connections.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+
+    def _handle_connection(self, sock: socket.socket) -> None:
+        """
+        Serve requests from a single client connection.
+
+        Args:
+            sock: Connected client socket
+        """
+        try:
+            while True:
+                frame = recv_frame(sock)
+                if frame is None:
+                    return
+
+                header, payload = frame
+                if header.get("op") == "SUBSCRIBE":
+                    self._subscribe(sock, header.get("client_id"))
+                    return
+
+                response, response_payload = self._handle_request(header, payload)
+                send_frame(sock, response, response_payload)
+
+        except (OSError, SharedCacheError, ValueError) as e:
+            print(f"Shared cache connection error: {e}")
+
+    def _handle_request(
+        self, header: Dict[str, Any], payload: bytes
+    ) -> Tuple[Dict[str, Any], bytes]:
+        """
+        Handle a single request.
+
+        Args:
+            header: Request header
+            payload: Request payload
+
+        Returns:
+            Tuple of (response header, response payload)
+        """
+        op = header.get("op")
+        key = header.get("key")
+        origin = header.get("client_id")
+
+        if op == "GET":
+            with self.lock:
+                self.stats["gets"] += 1
+                entry = self.entries.get(key)
+                if entry is None:
+                    return {"status": "miss"}, b""
+
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+
+            return {"status": "hit", "timestamp": entry[1]}, entry[0]
+
+        if op == "SET":
+            with self.lock:
+                self.stats["sets"] += 1
+                self.entries[key] = (payload, header.get("timestamp", time.time()))
+                self.entries.move_to_end(key)
+
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+
+            self._broadcast({"event": "set", "key": key}, origin)
+            return {"status": "ok"}, b""
+
+        if op == "DEL":
+            with self.lock:
+                found = self.entries.pop(key, None) is not None
+
+            self._broadcast({"event": "invalidate", "key": key}, origin)
+            return {"status": "ok", "count": int(found)}, b""
+
+        if op == "DELPREFIX":
+            prefix = header.get("prefix", "")
+            with self.lock:
+                keys = [k for k in self.entries if k.startswith(prefix)]
+                for k in keys:
+                    del self.entries[k]
+
+            self._broadcast({"event": "invalidate_prefix", "prefix": prefix}, origin)
+            return {"status": "ok", "count": len(keys)}, b""
+
+        if op == "CLEAR":
+            with self.lock:
+                count = len(self.entries)
+                self.entries.clear()
+
+            self._broadcast({"event": "clear"}, origin)
+            return {"status": "ok", "count": count}, b""
+
+        if op == "STATS":
+            with self.lock:
+                stats = dict(self.stats)
+                stats["entries"] = len(self.entries)
+                stats["subscribers"] = len(self.subscribers)
+
+            return {"status": "ok", "stats": stats}, b""
+
+        return {"status": "error", "message": f"Unknown operation: {op}"}, b""
+
+    def _subscribe(self, sock: socket.socket, client_id: Optional[str]) -> None:
+        """
+        Register a connection to receive invalidation events until it closes.
+
+        Args:
+            sock: Connected client socket
+            client_id: ID of the subscribing client
+        """
+        send_lock = threading.Lock()
+        with self.lock:
+            self.subscribers[sock] = (client_id, send_lock)
+
+        try:
+            with send_lock:
+                send_frame(sock, {"status": "ok"})
+
+            # Block until the client goes away; events are pushed by _broadcast
+            while sock.recv(1024):
+                pass
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.subscribers.pop(sock, None)
+
+    def _broadcast(self, event: Dict[str, Any], origin: Optional[str]) -> None:
+        """
+        Send an event to every subscriber except the client that caused it.
+
+        Args:
+            event: Event header
+            origin: ID of the client that caused the event
+        """
+        with self.lock:
+            subscribers = [
+                (sock, send_lock)
+                for sock, (client_id, send_lock) in self.subscribers.items()
+                if client_id != origin
+            ]
+
+        for sock, send_lock in subscribers:
+            try:
+                # Events for one subscriber may be sent from several handler threads
+                with send_lock:
+                    send_frame(sock, event)
+            except OSError:
+                with self.lock:
+                    self.subscribers.pop(sock, None)
+
+
+class SharedCacheClient:
+    """
+    Client for the shared cache daemon.
+
+    Requests use one connection per thread. Failures never propagate to the
+    caller: requests degrade to cache misses, and the client keeps retrying the
+    connection in the background. With a secret, values are signed when stored
+    and values with a missing or wrong signature are treated as misses.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        timeout: float = 1.0,
+        retry_interval: float = 5.0,
+        secret: Optional[str] = None,
+    ):
+        """
+        Initialise the SharedCacheClient.
+
+        Args:
+            address: Address of the daemon ("unix:/path" or "host:port")
+            on_event: Optional callback for writes and invalidations made by
+                other clients
+            timeout: Socket timeout for requests in seconds
+            retry_interval: Seconds to wait before reconnecting after a failure
+            secret: Secret shared by all clients for signing values; required
+                for TCP addresses, which any local process can connect to
+        """
+        self.address = address
+        self.family, self.sock_address = parse_address(address)
+        if self.family != socket.AF_UNIX and not secret:
+            raise ValueError(
+                "A shared secret is required for TCP shared cache addresses"
+            )
+        self.secret = secret.encode() if secret else None
+        self.client_id = uuid.uuid4().hex
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.local = threading.local()
+        self.down_until = 0.0
+        self.closed = threading.Event()
+        self.subscriber_thread = None
+
+        if on_event is not None:
+            self.subscriber_thread = threading.Thread(
+                target=self._subscriber_worker, args=(on_event,), daemon=True
+            )
+            self.subscriber_thread.start()
+
+    def _connect(self, timeout: Optional[float]) -> socket.socket:
+        """Open a new connection to the daemon."""
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.sock_address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(
+        self, header: Dict[str, Any], payload: bytes = b""
+    ) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        Send a request on this thread's connection.
+
+        Args:
+            header: Request header
+            payload: Request payload
+
+        Returns:
+            Tuple of (response header, response payload), or None if the daemon
+            is unavailable
+        """
+        if self.closed.is_set() or time.time() < self.down_until:
+            return None
+
+        header["client_id"] = self.client_id
+
+        try:
+            sock = getattr(self.local, "sock", None)
+            if sock is None:
+                sock = self._connect(self.timeout)
+                self.local.sock = sock
+
+            send_frame(sock, header, payload)
+            response = recv_frame(sock)
+            if response is None:
+                raise SharedCacheError("Connection closed by shared cache")
+
+            return response
+
+        except (OSError, SharedCacheError, ValueError) as e:
+            print(f"Shared cache unavailable at {self.address}: {e}")
+            self._drop_connection()
+            self.down_until = time.time() + self.retry_interval
+            return None
+
+    def _drop_connection(self) -> None:
+        """Close this thread's connection."""
+        sock = getattr(self.local, "sock", None)
+        self.local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get the encoded entry stored for a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Encoded entry, or None on a miss or if the daemon is unavailable
+        """
+        response = self._request({"op": "GET", "key": key})
+        if response is None or response[0].get("status") != "hit":
+            return None
+
+        data = response[1]
+        if self.secret is None:
+            return data
+
+        signature, data = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self._sign(key, data)):
+            print(f"Discarding shared cache entry {key} with an invalid signature")
+            return None
+        return data
+
+    def set(self, key: str, data: bytes, timestamp: float) -> bool:
+        """
+        Store an encoded entry.
+
+        Args:
+            key: Cache key
+            data: Encoded entry
+            timestamp: Timestamp of the entry
+
+        Returns:
+            True if the daemon stored the entry
+        """
+        if self.secret is not None:
+            data = self._sign(key, data) + data
+
+        response = self._request(
+            {"op": "SET", "key": key, "timestamp": timestamp}, data
+        )
+        return response is not None and response[0].get("status") == "ok"
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete an entry and notify other clients.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            True if the daemon held the entry
+        """
+        response = self._request({"op": "DEL", "key": key})
+        return response is not None and response[0].get("count", 0) > 0
+
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Delete all entries whose keys start with a prefix and notify other clients.
+
+        Args:
+            prefix: Key prefix to match
+
+        Returns:
+            Number of entries deleted
+        """
+        response = self._request({"op": "DELPREFIX", "prefix": prefix})
+        return response[0].get("count", 0) if response is not None else 0
+
+    def clear(self) -> int:
+        """
+        Delete all entries and notify other clients.
+
+        Returns:
+            Number of entries deleted
+        """
+        response = self._request({"op": "CLEAR"})
+        return response[0].get("count", 0) if response is not None else 0
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get daemon statistics.
+
+        Returns:
+            Dictionary of daemon counters, or None if the daemon is unavailable
+        """
+        response = self._request({"op": "STATS"})
+        return response[0].get("stats") if response is not None else None
+
+    def _sign(self, key: str, data: bytes) -> bytes:
+        """HMAC of a value bound to its key, so values cannot be moved between keys."""
+        return hmac.new(self.secret, key.encode() + b"\0" + data, "sha256").digest()
+
+    def close(self) -> None:
+        """
+        Close connections and stop listening for events.
+        """
+        self.closed.set()
+        self._drop_connection()
+
+    def _subscriber_worker(self, on_event: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Receive events from the daemon, reconnecting whenever the connection drops.
+
+        Args:
+            on_event: Callback for each event
+        """
+        while not self.closed.is_set():
+            sock = None
+            try:
+                sock = self._connect(self.timeout)
+                send_frame(sock, {"op": "SUBSCRIBE", "client_id": self.client_id})
+
+                # Events arrive at arbitrary times, so wait without a timeout
+                sock.settimeout(None)
+                if recv_frame(sock) is None:
+                    raise SharedCacheError("Subscription rejected")
+
+                # Anything may have changed while we were disconnected
+                on_event({"event": "clear"})
+
+                while not self.closed.is_set():
+                    frame = recv_frame(sock)
+                    if frame is None:
+                        break
+                    on_event(frame[0])
+
+            except (OSError, SharedCacheError, ValueError):
+                pass
+            finally:
+                if sock is not None:
+                    sock.close()
+
+            self.closed.wait(self.retry_interval)
+
+
+def main():
+    """Run the shared cache daemon."""
+    parser = argparse.ArgumentParser(description="Shared cache daemon")
+    parser.add_argument(
+        "--address",
+        default=os.environ.get("CACHE_SHARED_ADDRESS", DEFAULT_ADDRESS),
+        help='Address to listen on ("unix:/path" or "host:port"); TCP '
+        "addresses need CACHE_SHARED_SECRET set for every worker",
+    )
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=int(os.environ.get("CACHE_SHARED_MAX_ENTRIES", "10000")),
+        help="Maximum number of entries held in memory",
+    )
+    args = parser.parse_args()
+
+    server = SharedCacheServer(args.address, max_entries=args.max_entries)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shared cache stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Cache Warm-up module for Financial Analysis System.
+Precomputes cache entries in the background after a dataset is activated.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class CacheWarmer:
+    """
+    Runs a list of warm-up tasks in a background thread with visible progress.
+
+    Starting a new run cancels the previous one, so switching datasets stops
+    work for the dataset that is no longer active.
+    """
+
+    def __init__(self):
+        """
+        Initialise the CacheWarmer.
+        """
+        self.lock = threading.Lock()
+        self.thread = None
+        self.cancel_event = None
+        self.progress = {"state": "idle"}
+
+    def start(self, run_id: str, tasks: List[Tuple[str, Callable[[], Any]]]) -> None:
+        """
+        Start a warm-up run, cancelling any run already in progress.
+
+        Args:
+            run_id: Identifier for the run (e.g. the dataset ID)
+            tasks: List of (name, function) pairs to run in order
+        """
+        cancel_event = threading.Event()
+        progress = {
+            "run_id": run_id,
+            "state": "running",
+            "total": len(tasks),
+            "completed": 0,
+            "failed": [],
+            "current": None,
+            "started_at": time.time(),
+            "finished_at": None,
+        }
+
+        with self.lock:
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+
+            self.cancel_event = cancel_event
+            self.progress = progress
+
+        def warmup_worker():
+            for name, task in tasks:
+                if cancel_event.is_set():
+                    break
+
+                with self.lock:
+                    progress["current"] = name
+
+                try:
+                    task()
+                except Exception as e:
+                    print(f"Cache warm-up task {name} failed: {e}")
+                    with self.lock:
+                        progress["failed"].append({"task": name, "error": str(e)})
+
+                with self.lock:
+                    progress["completed"] += 1
+
+            with self.lock:
+                progress["current"] = None
+                progress["finished_at"] = time.time()
+                if cancel_event.is_set() and progress["completed"] < len(tasks):
+                    progress["state"] = "cancelled"
+                else:
+                    progress["state"] = "completed"
+
+        self.thread = threading.Thread(target=warmup_worker, daemon=True)
+        self.thread.start()
+
+    def cancel(self) -> bool:
+        """
+        Cancel the current warm-up run.
+
+        The task in progress finishes, but no further tasks are started.
+
+        Returns:
+            True if a running warm-up was cancelled, False otherwise
+        """
+        with self.lock:
+            if self.cancel_event is None or self.progress.get("state") != "running":
+                return False
+
+            self.cancel_event.set()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the current warm-up run to finish.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+        Returns:
+            True if no run is in progress when this returns
+        """
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Get the progress of the current or last warm-up run.
+
+        Returns:
+            Dictionary with run state, task counts and failures
+        """
+        with self.lock:
+            progress = dict(self.progress)
+            if "failed" in progress:
+                progress["failed"] = list(progress["failed"])
+
+        return progress
@@ -7,9 +7,16 @@ import csv
 import json
 import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
 
 
 class ConversationManager:
@@ -299,6 +306,85 @@ class ConversationManager:
 
         return True
 
+    def compact_index(self) -> int:
+        """
+        Remove index entries whose conversation files no longer exist.
+
+        Only one process compacts the index at a time; when several workers
+        share the conversations directory, the others skip their run.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._compaction_lock() as locked:
+            if not locked:
+                print("Conversation index is being compacted by another process")
+                return 0
+
+            # Other workers may have changed the index since this one loaded it
+            self.conversations_index = self._load_conversations_index()
+            return self._compact_index()
+
+    @contextmanager
+    def _compaction_lock(self) -> Iterator[bool]:
+        """
+        Try to take the index compaction lock without waiting.
+
+        The lock is held on a file next to the index and is released by the
+        operating system if the process dies.
+
+        Yields:
+            True if the lock was taken, False if another process holds it
+        """
+        with open(f"{self.conversations_index_file}.lock", "a+") as lock_file:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+
+            # Closing the file releases the lock
+            yield True
+
+    def _compact_index(self) -> int:
+        """
+        Remove index entries whose conversation files no longer exist.
+        Caller holds the compaction lock.
+
+        Returns:
+            Number of entries removed
+        """
+        conversations = self.conversations_index["conversations"]
+        existing = [
+            conv
+            for conv in conversations
+            if os.path.exists(
+                os.path.join(self.conversations_dir, f"{conv['id']}.json")
+            )
+        ]
+
+        removed = len(conversations) - len(existing)
+        if removed == 0:
+            return 0
+
+        self.conversations_index["conversations"] = existing
+
+        # Point the current conversation at a conversation that still exists
+        existing_ids = {conv["id"] for conv in existing}
+        if self.conversations_index["current_conversation"] not in existing_ids:
+            self.conversations_index["current_conversation"] = (
+                existing[0]["id"] if existing else None
+            )
+
+        # Save index
+        self._save_conversations_index(self.conversations_index)
+
+        return removed
+
     def export_conversation(
         self, conversation_id: str, format: str = "json", file_path: str = None
     ) -> str:
@@ -4,29 +4,66 @@ Data Loader Module for Financial Analysis System
 This module handles loading and preprocessing the financial dataset.
 """
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from src.cache.manager import CacheManager, content_cached_method
+
+MONTH_ORDER = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
 
 class FinancialDataLoader:
     """
     Handles loading and preprocessing financial data for the multi-agent system.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, cache_manager: Optional[CacheManager] = None):
         """
         Initialise the data loader.
 
         Args:
             file_path: Path to the financial data Excel file
+            cache_manager: Optional CacheManager used to memoize analyses
         """
         self.file_path = file_path
+        self.cache_manager = cache_manager
         self.data = None
         self.summary_stats = {}
+        self._fingerprint = None
+
+    def fingerprint(self) -> str:
+        """
+        Get a fingerprint of the dataset file contents.
+
+        Returns:
+            SHA-256 hex digest of the data file
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            with open(self.file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
 
     def load_data(self) -> pd.DataFrame:
         """
@@ -45,6 +82,12 @@ class FinancialDataLoader:
             col.strip() if isinstance(col, str) else col for col in self.data.columns
         ]
 
+        # Order months by the calendar rather than alphabetically
+        if "Month Name" in self.data.columns:
+            self.data["Month Name"] = pd.Categorical(
+                self.data["Month Name"], categories=MONTH_ORDER, ordered=True
+            )
+
         print(f"Loaded {len(self.data)} rows with {len(self.data.columns)} columns")
         return self.data
 
@@ -52,6 +95,17 @@ class FinancialDataLoader:
         """
         Calculate summary statistics for the dataset.
 
+        Returns:
+            Dictionary containing summary statistics
+        """
+        self.summary_stats = self._summary_statistics()
+        return self.summary_stats
+
+    @content_cached_method("loader")
+    def _summary_statistics(self) -> Dict[str, Any]:
+        """
+        Calculate summary statistics for the dataset without storing them.
+
         Returns:
             Dictionary containing summary statistics
         """
@@ -59,7 +113,7 @@ class FinancialDataLoader:
             self.load_data()
 
         # Basic dataset information
-        self.summary_stats = {
+        summary_stats = {
             "row_count": len(self.data),
             "column_count": len(self.data.columns),
             "columns": self.data.columns.tolist(),
@@ -82,7 +136,7 @@ class FinancialDataLoader:
         segment_stats["Profit Margin"] = (
             segment_stats["Profit"] / segment_stats["Sales"]
         ) * 100
-        self.summary_stats["segment_analysis"] = segment_stats.to_dict(orient="records")
+        summary_stats["segment_analysis"] = segment_stats.to_dict(orient="records")
 
         # Country analysis
         country_stats = (
@@ -94,7 +148,7 @@ class FinancialDataLoader:
         country_stats["Profit Margin"] = (
             country_stats["Profit"] / country_stats["Sales"]
         ) * 100
-        self.summary_stats["country_analysis"] = country_stats.to_dict(orient="records")
+        summary_stats["country_analysis"] = country_stats.to_dict(orient="records")
 
         # Product analysis
         product_stats = (
@@ -106,7 +160,7 @@ class FinancialDataLoader:
         product_stats["Profit Margin"] = (
             product_stats["Profit"] / product_stats["Sales"]
         ) * 100
-        self.summary_stats["product_analysis"] = product_stats.to_dict(orient="records")
+        summary_stats["product_analysis"] = product_stats.to_dict(orient="records")
 
         # Discount band analysis
         discount_stats = (
@@ -125,40 +179,20 @@ class FinancialDataLoader:
         discount_stats["Profit Margin"] = (
             discount_stats["Profit"] / discount_stats["Sales"]
         ) * 100
-        self.summary_stats["discount_analysis"] = discount_stats.to_dict(
-            orient="records"
-        )
-
-        # Monthly trends
-        # Ensure proper ordering of months
-        month_order = [
-            "January",
-            "February",
-            "March",
-            "April",
-            "May",
-            "June",
-            "July",
-            "August",
-            "September",
-            "October",
-            "November",
-            "December",
-        ]
+        summary_stats["discount_analysis"] = discount_stats.to_dict(orient="records")
 
-        self.data["Month Name"] = pd.Categorical(
-            self.data["Month Name"], categories=month_order, ordered=True
-        )
+        # Monthly trends (months are ordered by the calendar in load_data)
         monthly_stats = (
             self.data.groupby("Month Name")
             .agg({"Sales": "sum", "Profit": "sum", "Units Sold": "sum"})
             .reset_index()
         )
 
-        self.summary_stats["monthly_analysis"] = monthly_stats.to_dict(orient="records")
+        summary_stats["monthly_analysis"] = monthly_stats.to_dict(orient="records")
 
-        return self.summary_stats
+        return summary_stats
 
+    @content_cached_method("loader")
     def get_segment_country_matrix(self) -> Dict[str, Dict[str, float]]:
         """
         Create a matrix of Segment x Country for profit analysis.
@@ -182,6 +216,7 @@ class FinancialDataLoader:
 
         return result
 
+    @content_cached_method("loader")
     def get_correlation_matrix(self) -> Dict[str, Dict[str, float]]:
         """
         Calculate correlation matrix for numerical columns.
@@ -261,6 +296,7 @@ class FinancialDataLoader:
         print(f"Summary statistics saved to {output_path}")
         return output_path
 
+    @content_cached_method("loader")
     def analyze_segment(self, segment_name: str) -> Dict[str, Any]:
         """
         Perform detailed analysis for a specific segment.
@@ -328,6 +364,7 @@ class FinancialDataLoader:
 
         return result
 
+    @content_cached_method("loader")
     def analyze_product(self, product_name: str) -> Dict[str, Any]:
         """
         Perform detailed analysis for a specific product.
@@ -388,6 +425,7 @@ class FinancialDataLoader:
 
         return result
 
+    @content_cached_method("loader")
     def analyze_discount_impact(self) -> Dict[str, Any]:
         """
         Analyze the impact of discounts on profit margins.
@@ -451,6 +489,60 @@ class FinancialDataLoader:
 
         return result
 
+    @content_cached_method("loader")
+    def aggregate_metrics(
+        self,
+        group_by: List[str],
+        filters: Optional[Dict[str, List[Any]]] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate sales, profit and units sold by any combination of columns.
+
+        Args:
+            group_by: Columns to group by (e.g. ["Segment", "Country"]); empty
+                for overall totals
+            filters: Optional mapping of columns to the values to keep
+            limit: Maximum number of groups returned, largest sales first
+
+        Returns:
+            Dictionary with the matching row count, the groups with their
+            totals and profit margin, and whether groups were left out
+        """
+        if self.data is None:
+            self.load_data()
+
+        filters = filters or {}
+        unknown = [
+            column
+            for column in list(group_by) + list(filters)
+            if column not in self.data.columns
+        ]
+        if unknown:
+            return {
+                "error": f"Unknown columns: {', '.join(unknown)}",
+                "columns": self.data.columns.tolist(),
+            }
+
+        data = self.data
+        for column, values in filters.items():
+            data = data[data[column].isin(values)]
+
+        measures = {"Sales": "sum", "Profit": "sum", "Units Sold": "sum"}
+        if group_by:
+            grouped = data.groupby(list(group_by), observed=True).agg(measures)
+            grouped = grouped.reset_index().sort_values("Sales", ascending=False)
+        else:
+            grouped = data.agg(measures).to_frame().T
+
+        grouped["Profit Margin"] = (grouped["Profit"] / grouped["Sales"]) * 100
+
+        return {
+            "row_count": len(data),
+            "groups": grouped.head(limit).to_dict(orient="records"),
+            "truncated": len(grouped) > limit,
+        }
+
 
 if __name__ == "__main__":
     # Test the loader
@@ -0,0 +1,314 @@
+"""
+Maintenance Scheduler module for Financial Analysis System.
+Runs periodic housekeeping jobs on a single background thread.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class MaintenanceScheduler:
+    """
+    Runs periodic maintenance jobs from a prioritised timer queue.
+
+    Jobs may be plain functions or generator functions. Generators are run
+    incrementally: the scheduler advances them for at most one time slice, then
+    pauses and lets other due jobs run before resuming, so long sweeps never
+    hold caches or disks busy for long stretches.
+    """
+
+    def __init__(self, time_slice: float = 0.02, slice_pause: float = 0.05):
+        """
+        Initialise the MaintenanceScheduler.
+
+        Args:
+            time_slice: Maximum time in seconds an incremental job runs at once
+            slice_pause: Time in seconds between the slices of a job
+        """
+        self.time_slice = time_slice
+        self.slice_pause = slice_pause
+        self.jobs = {}
+
+        # Timer queue ordered by due time, and due entries ordered by priority
+        self.queue = []
+        self.ready = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval_seconds: float,
+        priority: int = 100,
+        initial_delay: Optional[float] = None,
+    ) -> str:
+        """
+        Add a periodic job, replacing any job with the same name.
+
+        Args:
+            name: Unique job name
+            func: Function to run; generator functions are run incrementally
+            interval_seconds: Time between the starts of consecutive runs
+            priority: Lower values run first when several jobs are due
+            initial_delay: Delay before the first run (defaults to the interval)
+
+        Returns:
+            Name of the job
+        """
+        if interval_seconds <= 0:
+            raise ValueError(f"Interval for job '{name}' must be positive")
+
+        delay = interval_seconds if initial_delay is None else initial_delay
+
+        with self.condition:
+            generation = self.jobs[name]["generation"] + 1 if name in self.jobs else 0
+            self.jobs[name] = {
+                "func": func,
+                "interval": interval_seconds,
+                "priority": priority,
+                "generation": generation,
+                "stats": {
+                    "runs": 0,
+                    "slices": 0,
+                    "errors": 0,
+                    "last_error": None,
+                    "last_started": None,
+                    "last_duration": None,
+                    "busy_time": 0.0,
+                    "max_slice": 0.0,
+                },
+            }
+            self._push(time.monotonic() + delay, name, generation, None)
+
+        return name
+
+    def remove_job(self, name: str) -> bool:
+        """
+        Remove a job. A run in progress stops after its current slice.
+
+        Args:
+            name: Job name
+
+        Returns:
+            True if the job existed
+        """
+        with self.condition:
+            return self.jobs.pop(name, None) is not None
+
+    def run_now(self, name: str) -> bool:
+        """
+        Run a job as soon as possible instead of waiting for its next slot.
+
+        Args:
+            name: Job name
+
+        Returns:
+            True if the job exists
+        """
+        with self.condition:
+            job = self.jobs.get(name)
+            if job is None:
+                return False
+
+            # Pending entries of the old generation are skipped
+            job["generation"] += 1
+            self._push(time.monotonic(), name, job["generation"], None)
+
+        return True
+
+    def start(self) -> None:
+        """
+        Start the scheduler thread.
+        """
+        with self.condition:
+            if self.thread is not None and self.thread.is_alive():
+                return
+
+            self.stopped = False
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the scheduler thread after the current slice.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait indefinitely
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get run statistics for each job.
+
+        Returns:
+            Dictionary mapping job names to their statistics
+        """
+        with self.condition:
+            return {
+                name: dict(job["stats"], interval=job["interval"])
+                for name, job in self.jobs.items()
+            }
+
+    def _push(
+        self, run_at: float, name: str, generation: int, state: Optional[Dict]
+    ) -> None:
+        """
+        Queue a job run (or the continuation of one). Caller holds the lock.
+
+        Args:
+            run_at: Monotonic time at which to run
+            name: Job name
+            generation: Job generation the entry belongs to
+            state: In-progress run state, or None to start a new run
+        """
+        heapq.heappush(
+            self.queue, (run_at, next(self.sequence), name, generation, state)
+        )
+        self.condition.notify_all()
+
+    def _worker(self) -> None:
+        """
+        Run due jobs until stop() is called.
+        """
+        while True:
+            with self.condition:
+                while not self.stopped:
+                    # Move every due entry to the ready queue
+                    now = time.monotonic()
+                    while self.queue and self.queue[0][0] <= now:
+                        run_at, sequence, name, generation, state = heapq.heappop(
+                            self.queue
+                        )
+                        job = self.jobs.get(name)
+                        if job is not None:
+                            heapq.heappush(
+                                self.ready,
+                                (job["priority"], sequence, name, generation, state),
+                            )
+
+                    if self.ready:
+                        break
+                    if self.queue:
+                        self.condition.wait(self.queue[0][0] - now)
+                    else:
+                        self.condition.wait()
+
+                if self.stopped:
+                    return
+
+                _, _, name, generation, state = heapq.heappop(self.ready)
+                job = self.jobs.get(name)
+                if job is None or job["generation"] != generation:
+                    continue
+
+            self._run_slice(name, job, generation, state)
+
+    def _run_slice(
+        self, name: str, job: Dict[str, Any], generation: int, state: Optional[Dict]
+    ) -> None:
+        """
+        Run one time slice of a job and queue whatever comes next.
+
+        Args:
+            name: Job name
+            job: Job definition
+            generation: Job generation being run
+            state: In-progress run state, or None to start a new run
+        """
+        stats = job["stats"]
+        slice_start = time.monotonic()
+        finished = True
+
+        try:
+            if state is None:
+                state = {"started": slice_start, "iterator": None}
+                stats["last_started"] = time.time()
+                result = job["func"]()
+                if isinstance(result, Iterator):
+                    state["iterator"] = result
+
+            iterator = state["iterator"]
+            if iterator is not None:
+                finished = False
+                while time.monotonic() - slice_start < self.time_slice:
+                    try:
+                        next(iterator)
+                    except StopIteration:
+                        finished = True
+                        break
+
+        except Exception as e:
+            finished = True
+            stats["errors"] += 1
+            stats["last_error"] = str(e)
+            print(f"Maintenance job {name} failed: {e}")
+
+        slice_end = time.monotonic()
+
+        with self.condition:
+            stats["slices"] += 1
+            stats["busy_time"] += slice_end - slice_start
+            stats["max_slice"] = max(stats["max_slice"], slice_end - slice_start)
+
+            current = self.jobs.get(name)
+            if current is not job or job["generation"] != generation:
+                # Removed or rescheduled while running
+                return
+
+            if finished:
+                stats["runs"] += 1
+                stats["last_duration"] = slice_end - state["started"]
+                next_run = max(state["started"] + job["interval"], slice_end)
+                self._push(next_run, name, generation, None)
+            else:
+                self._push(slice_end + self.slice_pause, name, generation, state)
+
+
+def iter_remove_old_files(
+    directory: str, max_age_seconds: float, suffix: str = ""
+) -> Iterator[int]:
+    """
+    Remove files older than a maximum age, one file per step.
+
+    Args:
+        directory: Directory to clean (missing directories are ignored)
+        max_age_seconds: Files last modified longer ago than this are removed
+        suffix: Optional filename suffix to restrict the cleanup to
+
+    Yields:
+        1 for each file removed and 0 for each file kept
+    """
+    if not os.path.isdir(directory):
+        return
+
+    cutoff = time.time() - max_age_seconds
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith(suffix):
+                yield 0
+                continue
+
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    yield 1
+                    continue
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+
+            yield 0
@@ -0,0 +1,256 @@
+"""
+Question Context module for Financial Analysis System.
+
+Selects the parts of the data summary that are relevant to a question, and adds
+drill-downs for the specific segments, countries, products and other values it
+mentions.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Dimensions a question can refer to: the words that name the dimension, the
+# data summary section with its breakdown (if any), and how values are matched.
+# Values that are also common words ("High", "May") are only matched together
+# with a dimension keyword or with their usual capitalisation.
+DIMENSIONS = {
+    "Segment": {
+        "keywords": ("segment",),
+        "section": "segment_analysis",
+    },
+    "Country": {
+        "keywords": ("country", "countries", "region", "geograph", "market"),
+        "section": "country_analysis",
+    },
+    "Product": {
+        "keywords": ("product",),
+        "section": "product_analysis",
+    },
+    "Discount Band": {
+        "keywords": ("discount",),
+        "section": "discount_analysis",
+        "requires_keyword": True,
+    },
+    "Month Name": {
+        "keywords": ("month", "season", "quarter"),
+        "section": "monthly_analysis",
+        "case_sensitive": True,
+    },
+    "Year": {
+        "keywords": ("year", "annual"),
+        "section": None,
+    },
+}
+
+# Other names used for dimension values; upper-case abbreviations are matched
+# case-sensitively
+VALUE_ALIASES = {
+    "United States of America": ("United States", "USA", "US"),
+}
+
+# Dimensions drilled into when a question names values but no other dimension
+DEFAULT_DRILL_DOWN_DIMENSIONS = ("Segment", "Country", "Product")
+
+# Scalar values of the data summary that are always included
+OVERVIEW_KEYS = ("row_count", "total_sales", "total_profit", "overall_profit_margin")
+
+# Measures aggregated for drill-downs
+MEASURES = ("Sales", "Profit", "Units Sold")
+
+
+class QuestionContextBuilder:
+    """
+    Builds the data context for a question from the dataset and its summary.
+
+    Questions that mention neither a dimension nor one of its values get the
+    full summary. Otherwise the context holds the overview figures, the
+    breakdowns for the dimensions the question is about and, for each value it
+    names, the totals and breakdowns of just the matching rows.
+    """
+
+    def __init__(self, data: pd.DataFrame, data_summary: Dict[str, Any]):
+        """
+        Initialise the QuestionContextBuilder.
+
+        Args:
+            data: Dataset the summary was computed from
+            data_summary: Dictionary containing data summary
+        """
+        self.data = data
+        self.data_summary = data_summary
+
+        # Patterns matching each value of each dimension present in the data
+        self.value_patterns = {}
+        for dimension in DIMENSIONS:
+            if dimension not in data.columns:
+                continue
+
+            case_sensitive = DIMENSIONS[dimension].get("case_sensitive", False)
+            patterns = []
+            for value in data[dimension].dropna().unique():
+                # Plain Python values keep the context JSON-serialisable
+                if hasattr(value, "item"):
+                    value = value.item()
+                patterns.append((value, _value_pattern(value, case_sensitive)))
+            self.value_patterns[dimension] = patterns
+
+    def match(self, question: str) -> Dict[str, Any]:
+        """
+        Find the dimensions and values a question refers to.
+
+        Args:
+            question: User's question about the financial data
+
+        Returns:
+            Dictionary with "dimensions", the dimensions named by keyword, and
+            "values", mapping dimensions to the values the question mentions
+        """
+        question_lower = question.lower()
+
+        dimensions = [
+            dimension
+            for dimension, spec in DIMENSIONS.items()
+            if dimension in self.value_patterns
+            and any(keyword in question_lower for keyword in spec["keywords"])
+        ]
+
+        values = {}
+        for dimension, patterns in self.value_patterns.items():
+            if (
+                DIMENSIONS[dimension].get("requires_keyword")
+                and dimension not in dimensions
+            ):
+                continue
+
+            # Capitalisation at the start of the question carries no meaning
+            start = 1 if DIMENSIONS[dimension].get("case_sensitive") else 0
+            matched = [
+                value for value, pattern in patterns if pattern.search(question, start)
+            ]
+            if matched:
+                values[dimension] = matched
+
+        return {"dimensions": dimensions, "values": values}
+
+    def build(self, question: str) -> Dict[str, Any]:
+        """
+        Build the data context for a question.
+
+        Args:
+            question: User's question about the financial data
+
+        Returns:
+            Data summary restricted to what the question is about
+        """
+        matches = self.match(question)
+        dimensions = matches["dimensions"]
+        values = matches["values"]
+
+        if not dimensions and not values:
+            return self.data_summary
+
+        context = {
+            key: self.data_summary[key]
+            for key in OVERVIEW_KEYS
+            if key in self.data_summary
+        }
+
+        # Breakdowns for every dimension the question touches
+        for dimension in DIMENSIONS:
+            section = DIMENSIONS[dimension]["section"]
+            if (
+                (dimension in dimensions or dimension in values)
+                and section
+                and section in self.data_summary
+            ):
+                context[section] = self.data_summary[section]
+
+        if values:
+            context.update(self._drill_down(values, dimensions))
+
+        return context
+
+    def _drill_down(
+        self, values: Dict[str, List[Any]], dimensions: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Summarise the rows matching the values a question mentions.
+
+        Args:
+            values: Mapping of dimensions to mentioned values
+            dimensions: Dimensions named by keyword in the question
+
+        Returns:
+            Dictionary with the focus description, totals of the matching rows
+            and their breakdowns by the other relevant dimensions
+        """
+        mask = pd.Series(True, index=self.data.index)
+        for dimension, dimension_values in values.items():
+            mask &= self.data[dimension].isin(dimension_values)
+        subset = self.data[mask]
+
+        focus = "; ".join(
+            f"{dimension} = {', '.join(str(v) for v in dimension_values)}"
+            for dimension, dimension_values in values.items()
+        )
+        drill_down = {"focus": focus, "focus_rows": len(subset)}
+
+        if subset.empty:
+            return drill_down
+
+        drill_down["focus_totals"] = _aggregate(subset)
+
+        # Break the focus down by the dimensions the question asks about, or by
+        # the main dimensions it does not already fix
+        breakdown_dimensions = [d for d in dimensions if d not in values] or [
+            d
+            for d in DEFAULT_DRILL_DOWN_DIMENSIONS
+            if d not in values and d in self.value_patterns
+        ]
+
+        # Comparisons between several named values also need them side by side
+        breakdown_dimensions += [
+            dimension
+            for dimension, dimension_values in values.items()
+            if len(dimension_values) > 1
+        ]
+
+        for dimension in breakdown_dimensions:
+            key = "focus_by_" + dimension.lower().replace(" ", "_")
+            drill_down[key] = [
+                dict({dimension: value}, **_aggregate(rows))
+                for value, rows in subset.groupby(dimension, observed=True)
+            ]
+
+        return drill_down
+
+
+def _value_pattern(value: Any, case_sensitive: bool = False) -> "re.Pattern":
+    """Pattern matching a dimension value or its aliases as whole words."""
+    names = [re.escape(str(value))]
+    if not case_sensitive:
+        names = [f"(?i:{name})" for name in names]
+
+    for alias in VALUE_ALIASES.get(str(value), ()):
+        if alias.isupper() or case_sensitive:
+            names.append(re.escape(alias))
+        else:
+            names.append(f"(?i:{re.escape(alias)})")
+
+    return re.compile(rf"(?<!\w)(?:{'|'.join(names)})(?!\w)")
+
+
+def _aggregate(rows: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """Totals and profit margin of a set of rows."""
+    totals = {
+        measure: float(rows[measure].sum())
+        for measure in MEASURES
+        if measure in rows.columns
+    }
+
+    if totals.get("Sales"):
+        totals["Profit Margin"] = totals.get("Profit", 0.0) / totals["Sales"] * 100
+
+    return totals
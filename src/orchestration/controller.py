@@ -4,19 +4,39 @@ Orchestration Controller for Financial Analysis System
 This module manages the coordination between the Data Analyst and Insight Generator agents.
 """
 
+import asyncio
 import json
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from src.agents.agents import (
+    DEFAULT_CACHE_MAX_TEMPERATURE,
+    DEFAULT_MAX_TOOL_ROUNDS,
     DataAnalystAgent,
     HypothesisGeneratorAgent,
     InsightGeneratorAgent,
+    ToolCallingAnalystAgent,
 )
+from src.cache.manager import CacheManager
 from src.data.loader import FinancialDataLoader
+from src.orchestration.context import QuestionContextBuilder
+from src.orchestration.routing import FAST_TIER, LARGE_TIER, question_router
+
+# Task for the initial exploratory analysis
+INITIAL_ANALYSIS_TASK = """
+        Perform an initial exploratory analysis of the financial dataset. 
+        Identify the most significant patterns, trends, or anomalies in the data.
+        Focus on:
+        1. Differences in performance across segments
+        2. Patterns in profit margins
+        3. Notable country-specific trends
+        4. Product performance variations
+        5. The relationship between discounts and profitability
+        """
 
 
 class FinancialInsightController:
@@ -32,6 +52,16 @@ class FinancialInsightController:
         insight_deployment: str = "gpt-4o",
         log_interactions: bool = True,
         streaming: bool = True,
+        cache_manager: Optional[CacheManager] = None,
+        hypothesis_concurrency: int = 4,
+        cache_llm_responses: bool = True,
+        llm_cache_max_temperature: Optional[float] = DEFAULT_CACHE_MAX_TEMPERATURE,
+        question_context: bool = True,
+        hypothesis_batching: bool = True,
+        hypothesis_pipelining: bool = True,
+        analyst_tools: bool = False,
+        max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+        fast_deployment: Optional[str] = None,
     ):
         """
         Initialise the Financial Insight Controller.
@@ -43,16 +73,43 @@ class FinancialInsightController:
             insight_deployment: Azure OpenAI deployment name for the Insight Generator Agent
             log_interactions: Whether to log agent interactions
             streaming: Whether to stream agent outputs
+            cache_manager: Optional CacheManager used to memoize data analyses
+            hypothesis_concurrency: Maximum number of hypotheses tested at once
+            cache_llm_responses: Whether agents cache LLM responses in the cache
+                manager
+            llm_cache_max_temperature: Only cache LLM responses from agents whose
+                temperature is at most this value, or None to cache them all
+            question_context: Whether Q&A prompts only include the parts of the
+                data summary relevant to the question
+            hypothesis_batching: Whether hypotheses are tested several at a
+                time in structured batch calls rather than one call each
+            hypothesis_pipelining: Whether insight discovery tests each
+                hypothesis as soon as it has been generated, overlapping
+                generation with testing
+            analyst_tools: Whether analysis questions are answered by the
+                tool-calling analyst, which fetches figures on demand instead
+                of receiving the data summary
+            max_tool_rounds: Maximum number of tool round-trips per question
+                for the tool-calling analyst
+            fast_deployment: Azure OpenAI deployment for Q&A questions the
+                question router scores as simple, or None to answer every
+                question with the analyst and insight deployments
         """
+        if hypothesis_concurrency < 1:
+            raise ValueError("hypothesis_concurrency must be at least 1")
+
         self.data_path = data_path
         self.output_dir = output_dir
         self.log_interactions = log_interactions
+        self.hypothesis_concurrency = hypothesis_concurrency
+        self.hypothesis_batching = hypothesis_batching
+        self.hypothesis_pipelining = hypothesis_pipelining
 
         # Create output directory
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
         # Initialise data loader
-        self.data_loader = FinancialDataLoader(data_path)
+        self.data_loader = FinancialDataLoader(data_path, cache_manager=cache_manager)
 
         # Load the data and generate summary statistics
         self.data = self.data_loader.load_data()
@@ -61,27 +118,103 @@ class FinancialInsightController:
         # Save summary statistics
         self.data_loader.save_summary_to_json(f"{output_dir}/data_summary.json")
 
+        # Select question-specific data for Q&A prompts (built on first use)
+        self.question_context = question_context
+        self.context_builder = None
+
         # Initialise agents
-        self.analyst_agent = DataAnalystAgent(
-            deployment_name=analyst_deployment,
-            temperature=0.1,
-            streaming=streaming,
-            data_loader=self.data_loader,
-        )
+        llm_cache = {
+            "cache_manager": cache_manager if cache_llm_responses else None,
+            "cache_max_temperature": llm_cache_max_temperature,
+        }
 
-        self.hypothesis_agent = HypothesisGeneratorAgent(
-            deployment_name=analyst_deployment,
-            temperature=0.7,  # Higher temperature for creative hypothesis generation
-            streaming=streaming,
-        )
+        agent_settings = {
+            "streaming": streaming,
+            "analyst_tools": analyst_tools,
+            "max_tool_rounds": max_tool_rounds,
+            "llm_cache": llm_cache,
+        }
+        self.tier_agents = {
+            LARGE_TIER: self._create_agents(
+                analyst_deployment, insight_deployment, **agent_settings
+            )
+        }
+        if fast_deployment:
+            # Q&A questions simple enough for the fast tier are answered here
+            self.tier_agents[FAST_TIER] = self._create_agents(
+                fast_deployment, fast_deployment, **agent_settings
+            )
 
-        self.insight_agent = InsightGeneratorAgent(
-            deployment_name=insight_deployment, temperature=0.4, streaming=streaming
-        )
+        self.analyst_agent = self.tier_agents[LARGE_TIER]["analyst"]
+        self.hypothesis_agent = self.tier_agents[LARGE_TIER]["hypothesis"]
+        self.insight_agent = self.tier_agents[LARGE_TIER]["insight"]
+        self.tool_analyst_agent = self.tier_agents[LARGE_TIER]["tool_analyst"]
 
         # Initialise interaction log
         self.interaction_log = []
 
+        # Number of interactions at the start of the log already saved to disk
+        self.saved_interaction_count = 0
+
+    def _create_agents(
+        self,
+        analyst_deployment: str,
+        insight_deployment: str,
+        streaming: bool,
+        analyst_tools: bool,
+        max_tool_rounds: int,
+        llm_cache: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Create one set of agents.
+
+        Args:
+            analyst_deployment: Deployment for the analyst and hypothesis agents
+            insight_deployment: Deployment for the insight agent
+            streaming: Whether to stream agent outputs
+            analyst_tools: Whether to create the tool-calling analyst
+            max_tool_rounds: Maximum number of tool round-trips per question
+            llm_cache: LLM response cache settings for the agents
+
+        Returns:
+            Dictionary with the "analyst", "hypothesis", "insight" and
+            "tool_analyst" agents; "tool_analyst" is None without analyst tools
+        """
+        agents = {
+            "analyst": DataAnalystAgent(
+                deployment_name=analyst_deployment,
+                temperature=0.1,
+                streaming=streaming,
+                data_loader=self.data_loader,
+                **llm_cache,
+            ),
+            "hypothesis": HypothesisGeneratorAgent(
+                deployment_name=analyst_deployment,
+                temperature=0.7,  # Higher temperature for creative hypothesis generation
+                streaming=streaming,
+                **llm_cache,
+            ),
+            "insight": InsightGeneratorAgent(
+                deployment_name=insight_deployment,
+                temperature=0.4,
+                streaming=streaming,
+                **llm_cache,
+            ),
+            "tool_analyst": None,
+        }
+
+        if analyst_tools:
+            agents["tool_analyst"] = ToolCallingAnalystAgent(
+                self.data_loader,
+                deployment_name=analyst_deployment,
+                temperature=0.1,
+                streaming=streaming,
+                max_tool_rounds=max_tool_rounds,
+                **llm_cache,
+            )
+
+        return agents
+
     def log_interaction(self, agent: str, input_data: Any, output_data: Any) -> None:
         """
         Log an agent interaction.
@@ -115,11 +248,58 @@ class FinancialInsightController:
 
         log_path = f"{self.output_dir}/interaction_log.json"
 
+        interactions = list(self.interaction_log)
         with open(log_path, "w") as f:
-            json.dump(self.interaction_log, f, indent=2)
+            json.dump(interactions, f, indent=2)
+
+        self.saved_interaction_count = len(interactions)
 
         return log_path
 
+    def rotate_interaction_log(
+        self, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3
+    ) -> bool:
+        """
+        Rotate the saved interaction log once it grows past a size limit.
+
+        The log is moved to interaction_log.1.json (older backups shift up, and
+        the oldest is removed), and interactions it contains are dropped from
+        memory so the next save starts a new file.
+
+        Args:
+            max_bytes: Size in bytes at which the log is rotated
+            backup_count: Number of rotated logs to keep
+
+        Returns:
+            True if the log was rotated
+        """
+        log_path = f"{self.output_dir}/interaction_log.json"
+
+        if not os.path.exists(log_path) or os.path.getsize(log_path) < max_bytes:
+            return False
+
+        for index in range(backup_count, 0, -1):
+            backup_path = f"{self.output_dir}/interaction_log.{index}.json"
+            if not os.path.exists(backup_path):
+                continue
+            if index == backup_count:
+                os.remove(backup_path)
+            else:
+                os.replace(
+                    backup_path, f"{self.output_dir}/interaction_log.{index + 1}.json"
+                )
+
+        if backup_count > 0:
+            os.replace(log_path, f"{self.output_dir}/interaction_log.1.json")
+        else:
+            os.remove(log_path)
+
+        # Saved interactions now live in the backup
+        del self.interaction_log[: self.saved_interaction_count]
+        self.saved_interaction_count = 0
+
+        return True
+
     def run_initial_analysis(self) -> str:
         """
         Run initial exploratory analysis of the financial data.
@@ -127,23 +307,15 @@ class FinancialInsightController:
         Returns:
             Analysis results as a string
         """
-        # Define the initial analysis task
-        task = """
-        Perform an initial exploratory analysis of the financial dataset. 
-        Identify the most significant patterns, trends, or anomalies in the data.
-        Focus on:
-        1. Differences in performance across segments
-        2. Patterns in profit margins
-        3. Notable country-specific trends
-        4. Product performance variations
-        5. The relationship between discounts and profitability
-        """
-
         # Run the analysis
-        analysis_results = self.analyst_agent.analyze(task, self.data_summary)
+        analysis_results = self.analyst_agent.analyze(
+            INITIAL_ANALYSIS_TASK, self.data_summary
+        )
 
         # Log the interaction
-        self.log_interaction("DataAnalystAgent", task, analysis_results)
+        self.log_interaction(
+            "DataAnalystAgent", INITIAL_ANALYSIS_TASK, analysis_results
+        )
 
         # Save the results
         with open(f"{self.output_dir}/initial_analysis.txt", "w") as f:
@@ -151,6 +323,26 @@ class FinancialInsightController:
 
         return analysis_results
 
+    async def arun_initial_analysis(self) -> str:
+        """
+        Run initial exploratory analysis of the financial data asynchronously.
+
+        Returns:
+            Analysis results as a string
+        """
+        analysis_results = await self.analyst_agent.aanalyze(
+            INITIAL_ANALYSIS_TASK, self.data_summary
+        )
+
+        self.log_interaction(
+            "DataAnalystAgent", INITIAL_ANALYSIS_TASK, analysis_results
+        )
+
+        with open(f"{self.output_dir}/initial_analysis.txt", "w") as f:
+            f.write(analysis_results)
+
+        return analysis_results
+
     def generate_hypotheses(self, analysis_results: str) -> List[Dict[str, Any]]:
         """
         Generate hypotheses based on initial analysis using the dedicated Hypothesis Generator.
@@ -166,6 +358,214 @@ class FinancialInsightController:
             data_summary=self.data_summary, initial_analysis=analysis_results
         )
 
+        # Log and save the results
+        self._save_hypotheses(analysis_results, hypotheses)
+
+        return hypotheses
+
+    async def agenerate_hypotheses(self, analysis_results: str) -> List[Dict[str, Any]]:
+        """
+        Generate hypotheses based on initial analysis asynchronously.
+
+        Args:
+            analysis_results: Results from initial analysis
+
+        Returns:
+            List of generated hypotheses with additional metadata
+        """
+        hypotheses = await self.hypothesis_agent.agenerate_hypotheses(
+            data_summary=self.data_summary, initial_analysis=analysis_results
+        )
+
+        self._save_hypotheses(analysis_results, hypotheses)
+
+        return hypotheses
+
+    def generate_and_test_hypotheses(
+        self, analysis_results: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """
+        Generate hypotheses and test them as soon as the Hypothesis Generator
+        has finished writing them, while it writes the next.
+
+        With hypothesis batching, hypotheses are held back until the next one
+        would not fit in the batch token budget and the full batch is then
+        tested in one call; otherwise each hypothesis is tested on its own.
+
+        Args:
+            analysis_results: Results from initial analysis
+
+        Returns:
+            Tuple of the generated hypotheses and their testing results
+        """
+        hypotheses = []
+        hypothesis_texts = []
+        pending = []
+        futures = []
+
+        with ThreadPoolExecutor(
+            max_workers=self.hypothesis_concurrency,
+            thread_name_prefix="hypothesis-test",
+        ) as executor:
+
+            def submit(batches):
+                for batch in batches:
+                    print(
+                        "Testing hypotheses "
+                        f"{', '.join(str(i + 1) for i in batch)} as they are generated"
+                    )
+                    futures.append(
+                        (
+                            batch,
+                            executor.submit(
+                                self._test_hypothesis_batch,
+                                [hypothesis_texts[i] for i in batch],
+                            ),
+                        )
+                    )
+
+            for hypothesis in self.hypothesis_agent.generate_hypotheses_stream(
+                data_summary=self.data_summary, initial_analysis=analysis_results
+            ):
+                hypotheses.append(hypothesis)
+                hypothesis_texts.extend(self._hypothesis_texts([hypothesis]))
+                pending.append(len(hypothesis_texts) - 1)
+                submit(self._take_full_batches(hypothesis_texts, pending))
+
+            submit(self._take_full_batches(hypothesis_texts, pending, final=True))
+
+            self._save_hypotheses(analysis_results, hypotheses)
+
+            outcomes = [None] * len(hypothesis_texts)
+            for batch, future in futures:
+                try:
+                    for position, result in enumerate(future.result()):
+                        outcomes[batch[position]] = (result, None)
+                except Exception as e:
+                    for i in batch:
+                        print(f"Hypothesis test {i+1} failed: {e}")
+                        outcomes[i] = (None, str(e))
+
+        testing_results = self._record_test_results(hypothesis_texts, outcomes)
+        return hypotheses, testing_results
+
+    async def agenerate_and_test_hypotheses(
+        self, analysis_results: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """
+        Generate hypotheses asynchronously, testing them as soon as they have
+        been written while the next is generated.
+
+        Hypotheses are grouped into batches as they arrive, as in
+        generate_and_test_hypotheses().
+
+        Args:
+            analysis_results: Results from initial analysis
+
+        Returns:
+            Tuple of the generated hypotheses and their testing results
+        """
+        semaphore = asyncio.Semaphore(self.hypothesis_concurrency)
+
+        async def run_batch(batch_texts):
+            async with semaphore:
+                return await self._atest_hypothesis_batch(batch_texts)
+
+        hypotheses = []
+        hypothesis_texts = []
+        pending = []
+        tasks = []
+
+        def submit(batches):
+            for batch in batches:
+                print(
+                    "Testing hypotheses "
+                    f"{', '.join(str(i + 1) for i in batch)} as they are generated"
+                )
+                tasks.append(
+                    (
+                        batch,
+                        asyncio.ensure_future(
+                            run_batch([hypothesis_texts[i] for i in batch])
+                        ),
+                    )
+                )
+
+        try:
+            async for hypothesis in self.hypothesis_agent.agenerate_hypotheses_stream(
+                data_summary=self.data_summary, initial_analysis=analysis_results
+            ):
+                hypotheses.append(hypothesis)
+                hypothesis_texts.extend(self._hypothesis_texts([hypothesis]))
+                pending.append(len(hypothesis_texts) - 1)
+                submit(self._take_full_batches(hypothesis_texts, pending))
+        except BaseException:
+            for _, task in tasks:
+                task.cancel()
+            raise
+
+        submit(self._take_full_batches(hypothesis_texts, pending, final=True))
+
+        self._save_hypotheses(analysis_results, hypotheses)
+
+        results = await asyncio.gather(
+            *(task for _, task in tasks), return_exceptions=True
+        )
+
+        outcomes = [None] * len(hypothesis_texts)
+        for (batch, _), batch_results in zip(tasks, results):
+            for position, i in enumerate(batch):
+                if isinstance(batch_results, Exception):
+                    print(f"Hypothesis test {i+1} failed: {batch_results}")
+                    outcomes[i] = (None, str(batch_results))
+                else:
+                    outcomes[i] = (batch_results[position], None)
+
+        testing_results = self._record_test_results(hypothesis_texts, outcomes)
+        return hypotheses, testing_results
+
+    def _take_full_batches(
+        self, hypothesis_texts: List[str], pending: List[int], final: bool = False
+    ) -> List[List[int]]:
+        """
+        Remove the batches that are ready to test from the hypotheses still
+        waiting for one.
+
+        A batch is ready once the next hypothesis no longer fits in it, when
+        hypothesis batching is disabled, or when no more hypotheses will come.
+
+        Args:
+            hypothesis_texts: All hypotheses generated so far
+            pending: Positions in `hypothesis_texts` not yet tested, in order;
+                the positions taken are removed from it
+            final: Whether generation has finished
+
+        Returns:
+            List of batches, each a list of positions in `hypothesis_texts`
+        """
+        batches = [
+            [pending[j] for j in batch]
+            for batch in self._hypothesis_batches(
+                [hypothesis_texts[i] for i in pending]
+            )
+        ]
+        if self.hypothesis_batching and not final:
+            # The last batch may still have room for the next hypothesis
+            batches = batches[:-1]
+
+        del pending[: sum(len(batch) for batch in batches)]
+        return batches
+
+    def _save_hypotheses(
+        self, analysis_results: str, hypotheses: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Log generated hypotheses and save them as JSON and readable text.
+
+        Args:
+            analysis_results: Initial analysis the hypotheses were generated from
+            hypotheses: Generated hypotheses
+        """
         # Log the interaction
         self.log_interaction(
             "HypothesisGeneratorAgent",
@@ -187,8 +587,6 @@ class FinancialInsightController:
                 f.write(f"BUSINESS IMPACT:\n{hypothesis['business_impact']}\n\n")
                 f.write("-" * 80 + "\n\n")
 
-        return hypotheses
-
     def full_hypothesis_workflow(self) -> str:
         """
         Run the complete hypothesis workflow from initial analysis to final insights.
@@ -212,13 +610,18 @@ class FinancialInsightController:
 
         # Step 4: Test Hypotheses
         print("\n=== Testing Hypotheses ===")
-        testing_results = []
-        for hypothesis in structured_hypotheses:
-            print(f"Testing hypothesis: {hypothesis['title']}")
-            result = self.analyst_agent.test_hypothesis(
-                hypothesis["description"], self.data_summary
-            )
-            testing_results.append({"hypothesis": hypothesis, "result": result})
+        outcomes = self._run_hypothesis_tests(
+            [hypothesis["description"] for hypothesis in structured_hypotheses]
+        )
+
+        # Failed tests are left out of the synthesis
+        testing_results = [
+            {"hypothesis": hypothesis, "result": result}
+            for hypothesis, (result, error) in zip(structured_hypotheses, outcomes)
+            if error is None
+        ]
+        if structured_hypotheses and not testing_results:
+            raise RuntimeError("All hypothesis tests failed")
 
         # Step 5: Synthesize Insights
         print("\n=== Synthesizing Insights ===")
@@ -234,19 +637,35 @@ class FinancialInsightController:
         print("\n=== Hypothesis Workflow Complete ===")
         return insights
 
-    def parse_hypotheses(self, hypotheses_text: str) -> List[Dict[str, Any]]:
+    def parse_hypotheses(
+        self, hypotheses: Union[str, List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
         """
-        Parse raw hypotheses text into structured format.
+        Parse hypotheses into structured format.
 
         Args:
-            hypotheses_text: Raw text containing hypotheses
+            hypotheses: Raw text containing hypotheses, or hypotheses generated
+                by the Hypothesis Generator
 
         Returns:
             List of structured hypothesis objects
         """
+        if not isinstance(hypotheses, str):
+            return [
+                self._structured_hypothesis(
+                    i,
+                    hypothesis["hypothesis"],
+                    description,
+                    "\n".join(str(value) for value in hypothesis.values()),
+                )
+                for i, (hypothesis, description) in enumerate(
+                    zip(hypotheses, self._hypothesis_texts(hypotheses)), 1
+                )
+            ]
+
         # This is a simplified implementation - in production, you would want more robust parsing
         structured_hypotheses = []
-        hypothesis_sections = hypotheses_text.split("Hypothesis")
+        hypothesis_sections = hypotheses.split("Hypothesis")
 
         # Skip the first section if it doesn't contain a hypothesis
         start_idx = 0 if hypothesis_sections[0].strip() else 1
@@ -264,37 +683,54 @@ class FinancialInsightController:
             # Remove any leading numbers or special characters
             title = re.sub(r"^[0-9.:\-]*\s*", "", title_line)
 
-            # Default values
-            importance = "Medium"
-            confidence = "Medium"
-
-            # Check for importance indicators
-            if "high importance" in section.lower() or "critical" in section.lower():
-                importance = "High"
-            elif "low importance" in section.lower() or "minor" in section.lower():
-                importance = "Low"
-
-            # Check for confidence indicators
-            if (
-                "high confidence" in section.lower()
-                or "strong evidence" in section.lower()
-            ):
-                confidence = "High"
-            elif "low confidence" in section.lower() or "tentative" in section.lower():
-                confidence = "Low"
-
             structured_hypotheses.append(
-                {
-                    "id": f"hyp_{i}",
-                    "title": title,
-                    "description": section,
-                    "importance": importance,
-                    "confidence": confidence,
-                }
+                self._structured_hypothesis(i, title, section, section)
             )
 
         return structured_hypotheses
 
+    def _structured_hypothesis(
+        self, index: int, title: str, description: str, text: str
+    ) -> Dict[str, Any]:
+        """
+        Build a structured hypothesis, judging its importance and confidence
+        from its wording.
+
+        Args:
+            index: One-based position of the hypothesis
+            title: Short title
+            description: Hypothesis text to test
+            text: All text about the hypothesis
+
+        Returns:
+            Structured hypothesis object
+        """
+        text = text.lower()
+
+        # Default values
+        importance = "Medium"
+        confidence = "Medium"
+
+        # Check for importance indicators
+        if "high importance" in text or "critical" in text:
+            importance = "High"
+        elif "low importance" in text or "minor" in text:
+            importance = "Low"
+
+        # Check for confidence indicators
+        if "high confidence" in text or "strong evidence" in text:
+            confidence = "High"
+        elif "low confidence" in text or "tentative" in text:
+            confidence = "Low"
+
+        return {
+            "id": f"hyp_{index}",
+            "title": title,
+            "description": description,
+            "importance": importance,
+            "confidence": confidence,
+        }
+
     def format_hypothesis_results(self, testing_results: List[Dict[str, Any]]) -> str:
         """
         Format tested hypotheses for synthesis.
@@ -317,49 +753,255 @@ class FinancialInsightController:
 
         return "\n".join(result)
 
-    def test_hypotheses(self, hypotheses: str) -> List[Dict[str, str]]:
+    def test_hypotheses(
+        self, hypotheses: Union[str, List[Dict[str, Any]]]
+    ) -> List[Dict[str, str]]:
         """
         Test the generated hypotheses.
 
         Args:
-            hypotheses: String containing hypotheses
+            hypotheses: String containing hypotheses, or hypotheses generated by
+                the Hypothesis Generator
 
         Returns:
             List of dictionaries with hypothesis testing results
         """
+        hypothesis_texts = self._hypothesis_texts(hypotheses)
+
+        # Test the hypotheses in parallel, up to the concurrency limit
+        outcomes = self._run_hypothesis_tests(hypothesis_texts)
+
+        # Log and save the results
+        return self._record_test_results(hypothesis_texts, outcomes)
+
+    async def atest_hypotheses(
+        self, hypotheses: Union[str, List[Dict[str, Any]]]
+    ) -> List[Dict[str, str]]:
+        """
+        Test the generated hypotheses concurrently on the event loop.
+
+        Args:
+            hypotheses: String containing hypotheses, or hypotheses generated by
+                the Hypothesis Generator
+
+        Returns:
+            List of dictionaries with hypothesis testing results, in input order
+        """
+        hypothesis_texts = self._hypothesis_texts(hypotheses)
+        batches = self._hypothesis_batches(hypothesis_texts)
+        semaphore = asyncio.Semaphore(self.hypothesis_concurrency)
+
+        async def run_batch(batch):
+            async with semaphore:
+                return await self._atest_hypothesis_batch(
+                    [hypothesis_texts[i] for i in batch]
+                )
+
+        # The batches are independent, so they share the event loop
+        results = await asyncio.gather(
+            *(run_batch(batch) for batch in batches), return_exceptions=True
+        )
+
+        outcomes = [None] * len(hypothesis_texts)
+        for batch, batch_results in zip(batches, results):
+            for position, i in enumerate(batch):
+                if isinstance(batch_results, Exception):
+                    print(f"Hypothesis test {i+1} failed: {batch_results}")
+                    outcomes[i] = (None, str(batch_results))
+                else:
+                    outcomes[i] = (batch_results[position], None)
+
+        return self._record_test_results(hypothesis_texts, outcomes)
+
+    def _run_hypothesis_tests(
+        self, hypothesis_texts: List[str]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Test hypotheses on a thread pool bounded by hypothesis_concurrency.
+        With hypothesis batching, each task tests one batch of hypotheses in
+        a single call; otherwise each task tests one hypothesis.
+
+        Args:
+            hypothesis_texts: Hypotheses to test
+
+        Returns:
+            List of (result, error) pairs in input order; error is None for
+            successful tests and result is None for failed ones
+        """
+        if not hypothesis_texts:
+            return []
+
+        batches = self._hypothesis_batches(hypothesis_texts)
+        max_workers = min(self.hypothesis_concurrency, len(batches))
+        outcomes = [None] * len(hypothesis_texts)
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hypothesis-test"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._test_hypothesis_batch, [hypothesis_texts[i] for i in batch]
+                )
+                for batch in batches
+            ]
+
+            # Place results by position so they line up with the input
+            for batch, future in zip(batches, futures):
+                try:
+                    for position, result in enumerate(future.result()):
+                        outcomes[batch[position]] = (result, None)
+                except Exception as e:
+                    for i in batch:
+                        print(f"Hypothesis test {i+1} failed: {e}")
+                        outcomes[i] = (None, str(e))
+
+        return outcomes
+
+    def _test_hypothesis_batch(self, hypothesis_texts: List[str]) -> List[str]:
+        """
+        Test one batch of hypotheses.
+
+        Args:
+            hypothesis_texts: Hypotheses in the batch
+
+        Returns:
+            Hypothesis testing results, in input order
+        """
+        if self.hypothesis_batching:
+            return self.analyst_agent.test_hypothesis_batch(
+                hypothesis_texts, self.data_summary
+            )
+
+        return [
+            self.analyst_agent.test_hypothesis(text, self.data_summary)
+            for text in hypothesis_texts
+        ]
+
+    async def _atest_hypothesis_batch(self, hypothesis_texts: List[str]) -> List[str]:
+        """
+        Test one batch of hypotheses asynchronously.
+
+        Args:
+            hypothesis_texts: Hypotheses in the batch
+
+        Returns:
+            Hypothesis testing results, in input order
+        """
+        if self.hypothesis_batching:
+            return await self.analyst_agent.atest_hypothesis_batch(
+                hypothesis_texts, self.data_summary
+            )
+
+        return [
+            await self.analyst_agent.atest_hypothesis(text, self.data_summary)
+            for text in hypothesis_texts
+        ]
+
+    def _hypothesis_batches(self, hypothesis_texts: List[str]) -> List[List[int]]:
+        """
+        Group hypotheses into the units tested by one LLM call.
+
+        Args:
+            hypothesis_texts: Hypotheses to test
+
+        Returns:
+            List of batches, each a list of positions in `hypothesis_texts`;
+            one hypothesis per batch unless hypothesis batching is enabled
+        """
+        if not self.hypothesis_batching:
+            return [[i] for i in range(len(hypothesis_texts))]
+
+        return self.analyst_agent.split_hypothesis_batches(
+            hypothesis_texts, self.data_summary
+        )
+
+    def _record_test_results(
+        self,
+        hypothesis_texts: List[str],
+        outcomes: List[Tuple[Optional[str], Optional[str]]],
+    ) -> List[Dict[str, str]]:
+        """
+        Log and save hypothesis test outcomes.
+
+        Args:
+            hypothesis_texts: Hypotheses that were tested
+            outcomes: (result, error) pair for each hypothesis
+
+        Returns:
+            List of dictionaries with hypothesis testing results; failed tests
+            carry an "error" key
+        """
+        if hypothesis_texts and all(error is not None for _, error in outcomes):
+            raise RuntimeError(f"All hypothesis tests failed: {outcomes[0][1]}")
+
+        return [
+            self._record_test_result(i, text, result, error)
+            for i, (text, (result, error)) in enumerate(zip(hypothesis_texts, outcomes))
+        ]
+
+    def _hypothesis_texts(
+        self, hypotheses: Union[str, List[Dict[str, Any]]]
+    ) -> List[str]:
+        """
+        Split hypotheses into the individual texts to test.
+
+        Args:
+            hypotheses: String containing hypotheses, or hypotheses generated by
+                the Hypothesis Generator
+
+        Returns:
+            List of hypothesis texts
+        """
+        if not isinstance(hypotheses, str):
+            return [
+                f"Hypothesis: {hypothesis['hypothesis']}" for hypothesis in hypotheses
+            ]
+
         # Extract individual hypotheses from the text
         # This is a simplified approach; in a production system,
         # you would want more robust parsing
         hypothesis_sections = hypotheses.split("Hypothesis")
 
         # Remove any empty sections
-        hypothesis_sections = [
-            section.strip() for section in hypothesis_sections if section.strip()
+        return [
+            f"Hypothesis: {section.strip()}"
+            for section in hypothesis_sections
+            if section.strip()
         ]
 
-        # Test each hypothesis
-        testing_results = []
+    def _record_test_result(
+        self,
+        index: int,
+        hypothesis_text: str,
+        result: Optional[str],
+        error: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Log a hypothesis test and save it to the output directory.
 
-        for i, section in enumerate(hypothesis_sections):
-            # Clean up the hypothesis text
-            hypothesis_text = f"Hypothesis: {section}"
+        Args:
+            index: Zero-based position of the hypothesis
+            hypothesis_text: Hypothesis that was tested
+            result: Test result, or None if the test failed
+            error: Error message if the test failed
 
-            # Test the hypothesis
-            result = self.analyst_agent.test_hypothesis(
-                hypothesis_text, self.data_summary
-            )
+        Returns:
+            Dictionary with the hypothesis and its result
+        """
+        if error is not None:
+            result = f"Hypothesis test failed: {error}"
 
-            # Log the interaction
-            self.log_interaction("DataAnalystAgent", hypothesis_text, result)
+        # Log the interaction
+        self.log_interaction("DataAnalystAgent", hypothesis_text, result)
 
-            # Add to results
-            testing_results.append({"hypothesis": hypothesis_text, "result": result})
+        # Save individual result
+        with open(f"{self.output_dir}/hypothesis_test_{index+1}.txt", "w") as f:
+            f.write(f"HYPOTHESIS:\n{hypothesis_text}\n\nRESULT:\n{result}")
 
-            # Save individual result
-            with open(f"{self.output_dir}/hypothesis_test_{i+1}.txt", "w") as f:
-                f.write(f"HYPOTHESIS:\n{hypothesis_text}\n\nRESULT:\n{result}")
+        if error is not None:
+            return {"hypothesis": hypothesis_text, "result": result, "error": error}
 
-        return testing_results
+        return {"hypothesis": hypothesis_text, "result": result}
 
     def synthesize_insights(self, testing_results: List[Dict[str, str]]) -> str:
         """
@@ -371,19 +1013,67 @@ class FinancialInsightController:
         Returns:
             Synthesized insights as a string
         """
-        # Combine all hypothesis testing results into a single text
-        combined_results = "\n\n".join(
-            [
-                f"HYPOTHESIS {i+1}:\n{result['hypothesis']}\n\nTEST RESULT:\n{result['result']}"
-                for i, result in enumerate(testing_results)
-            ]
-        )
+        combined_results = self._combine_test_results(testing_results)
 
         # Synthesize insights
         insights = self.insight_agent.synthesize_insights(
             combined_results, self.data_summary
         )
 
+        # Log and save the results
+        self._save_synthesized_insights(combined_results, insights)
+
+        return insights
+
+    async def asynthesize_insights(self, testing_results: List[Dict[str, str]]) -> str:
+        """
+        Synthesize insights from hypothesis testing results asynchronously.
+
+        Args:
+            testing_results: List of hypothesis testing results
+
+        Returns:
+            Synthesized insights as a string
+        """
+        combined_results = self._combine_test_results(testing_results)
+
+        insights = await self.insight_agent.asynthesize_insights(
+            combined_results, self.data_summary
+        )
+
+        self._save_synthesized_insights(combined_results, insights)
+
+        return insights
+
+    def _combine_test_results(self, testing_results: List[Dict[str, str]]) -> str:
+        """
+        Combine all successful hypothesis testing results into a single text.
+
+        Args:
+            testing_results: List of hypothesis testing results
+
+        Returns:
+            Combined results for synthesis
+        """
+        successful_results = [
+            result for result in testing_results if "error" not in result
+        ]
+
+        return "\n\n".join(
+            [
+                f"HYPOTHESIS {i+1}:\n{result['hypothesis']}\n\nTEST RESULT:\n{result['result']}"
+                for i, result in enumerate(successful_results)
+            ]
+        )
+
+    def _save_synthesized_insights(self, combined_results: str, insights: str) -> None:
+        """
+        Log synthesized insights and save them to the output directory.
+
+        Args:
+            combined_results: Combined hypothesis testing results
+            insights: Synthesized insights
+        """
         # Log the interaction
         self.log_interaction("InsightGeneratorAgent", combined_results, insights)
 
@@ -391,8 +1081,6 @@ class FinancialInsightController:
         with open(f"{self.output_dir}/synthesized_insights.txt", "w") as f:
             f.write(insights)
 
-        return insights
-
     def run_full_insight_discovery(self) -> str:
         """
         Run the complete insight discovery process.
@@ -406,13 +1094,16 @@ class FinancialInsightController:
         print("\n=== Running Initial Analysis ===")
         analysis_results = self.run_initial_analysis()
 
-        # Step 2: Generate Hypotheses
-        print("\n=== Generating Hypotheses ===")
-        hypotheses = self.generate_hypotheses(analysis_results)
+        # Steps 2 and 3: Generate and Test Hypotheses
+        if self.hypothesis_pipelining:
+            print("\n=== Generating and Testing Hypotheses ===")
+            _, testing_results = self.generate_and_test_hypotheses(analysis_results)
+        else:
+            print("\n=== Generating Hypotheses ===")
+            hypotheses = self.generate_hypotheses(analysis_results)
 
-        # Step 3: Test Hypotheses
-        print("\n=== Testing Hypotheses ===")
-        testing_results = self.test_hypotheses(hypotheses)
+            print("\n=== Testing Hypotheses ===")
+            testing_results = self.test_hypotheses(hypotheses)
 
         # Step 4: Synthesize Insights
         print("\n=== Synthesizing Insights ===")
@@ -424,6 +1115,42 @@ class FinancialInsightController:
         print("\n=== Insight Discovery Complete ===")
         return insights
 
+    async def arun_full_insight_discovery(self) -> str:
+        """
+        Run the complete insight discovery process on an asyncio event loop.
+
+        Hypotheses are tested concurrently, and with hypothesis pipelining each
+        test starts as soon as its hypothesis has been generated; the other
+        stages depend on each other and run in order.
+
+        Returns:
+            Final insights as a string
+        """
+        print("Starting the financial insight discovery process...")
+
+        print("\n=== Running Initial Analysis ===")
+        analysis_results = await self.arun_initial_analysis()
+
+        if self.hypothesis_pipelining:
+            print("\n=== Generating and Testing Hypotheses ===")
+            _, testing_results = await self.agenerate_and_test_hypotheses(
+                analysis_results
+            )
+        else:
+            print("\n=== Generating Hypotheses ===")
+            hypotheses = await self.agenerate_hypotheses(analysis_results)
+
+            print("\n=== Testing Hypotheses ===")
+            testing_results = await self.atest_hypotheses(hypotheses)
+
+        print("\n=== Synthesizing Insights ===")
+        insights = await self.asynthesize_insights(testing_results)
+
+        self.save_interaction_log()
+
+        print("\n=== Insight Discovery Complete ===")
+        return insights
+
     def run_specific_analysis(
         self, analysis_type: str, parameter: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -499,52 +1226,62 @@ class FinancialInsightController:
         """
         Run a Q&A interaction with the system.
 
+        The question is answered by the agents of the tier the question router
+        picks for it, and the time taken is recorded for that tier.
+
         Args:
             question: User's question about the financial data
 
         Returns:
             Answer to the question
         """
-        # Determine which agent should handle the question
-        if any(
-            keyword in question.lower()
-            for keyword in [
-                "why",
-                "insight",
-                "reason",
-                "implication",
-                "suggest",
-                "recommend",
-                "strategy",
-            ]
-        ):
-            # Insight-oriented question, send to Insight Generator
-            task = f"Answer the following question about the financial data: {question}"
+        # Determine which agent should handle the question, and on which tier
+        route = self._route_question(question)
+        tier, score = self._question_tier(question, route)
+        agents = self.tier_agents[tier]
+
+        start = time.monotonic()
+        try:
+            answer = self._answer_question(question, route, agents)
+        except Exception:
+            self._record_question(tier, route, agents, score, start, failed=True)
+            raise
+
+        self._record_question(tier, route, agents, score, start)
+        return answer
 
-            # Include both the question and data summary
-            enhanced_summary = {"question": question, "data_summary": self.data_summary}
+    def _answer_question(
+        self, question: str, route: str, agents: Dict[str, Any]
+    ) -> str:
+        """
+        Answer a question with one tier's agents.
 
-            # Convert to string for the agent
-            enhanced_summary_str = json.dumps(enhanced_summary, indent=2)
+        Args:
+            question: User's question about the financial data
+            route: "insight", "hypothesis" or "analysis"
+            agents: Agents of the tier answering the question
 
-            # Get answer from Insight Generator
-            answer = self.insight_agent.generate_insights(task, enhanced_summary_str)
+        Returns:
+            Answer to the question
+        """
+        if route == "insight":
+            # Insight-oriented question, send to Insight Generator with the
+            # data relevant to it
+            data_context = self._question_context(question)
+            answer = agents["insight"].answer_question(question, data_context)
 
             # Log the interaction
             self.log_interaction(
                 "InsightGeneratorAgent",
-                {"task": task, "data": enhanced_summary},
+                {"question": question, "data": data_context},
                 answer,
             )
 
-        elif any(
-            keyword in question.lower()
-            for keyword in ["hypothesis", "hunch", "theory", "conjecture", "test"]
-        ):
+        elif route == "hypothesis":
             # Hypothesis-oriented question, send to Hypothesis Generator then test with Analyst
 
             # First generate a hypothesis
-            hypotheses = self.hypothesis_agent.generate_hypotheses(
+            hypotheses = agents["hypothesis"].generate_hypotheses(
                 data_summary=self.data_summary,
                 initial_analysis=f"User question: {question}",
             )
@@ -559,7 +1296,7 @@ class FinancialInsightController:
             # Test the first hypothesis
             if hypotheses:
                 hypothesis_text = hypotheses[0]["hypothesis"]
-                test_result = self.analyst_agent.test_hypothesis(
+                test_result = agents["analyst"].test_hypothesis(
                     hypothesis_text, self.data_summary
                 )
 
@@ -577,22 +1314,286 @@ class FinancialInsightController:
                         answer += f"{i}. {h['hypothesis']}\n"
             else:
                 # Fallback to analyst if no hypotheses generated
-                answer = self.analyst_agent.analyze(
-                    f"Answer this question: {question}", self.data_summary
+                answer = agents["analyst"].analyze(
+                    f"Answer this question: {question}",
+                    self._question_context(question),
                 )
 
+        elif agents["tool_analyst"] is not None:
+            # Analysis-oriented question, answered with figures fetched by tools
+            answer = agents["tool_analyst"].answer(question)
+
+            self.log_interaction(
+                "ToolCallingAnalystAgent",
+                {"question": question},
+                answer,
+            )
+
         else:
             # Analysis-oriented question, send to Data Analyst
             task = f"Answer the following question about the financial data: {question}"
 
-            # Get answer from Data Analyst
-            answer = self.analyst_agent.analyze(task, self.data_summary)
+            # Get answer from Data Analyst, with the data relevant to the question
+            context = self._question_context(question)
+            answer = agents["analyst"].analyze(task, context)
 
             # Log the interaction
             self.log_interaction(
                 "DataAnalystAgent",
-                {"task": task, "data_summary": self.data_summary},
+                {"task": task, "data_summary": context},
                 answer,
             )
 
         return answer
+
+    def stream_q_and_a(self, question: str) -> Iterator[str]:
+        """
+        Run a Q&A interaction, yielding the answer as it is generated.
+
+        Questions are routed to the same agents and tiers as run_q_and_a.
+        Hypothesis questions generate their hypotheses up front and stream the
+        test.
+
+        Args:
+            question: User's question about the financial data
+
+        Yields:
+            Chunks of the answer
+        """
+        route = self._route_question(question)
+        tier, score = self._question_tier(question, route)
+        agents = self.tier_agents[tier]
+
+        start = time.monotonic()
+        first_chunk_latency = None
+        try:
+            for chunk in self._stream_answer(question, route, agents):
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - start
+                yield chunk
+        except Exception:
+            self._record_question(tier, route, agents, score, start, failed=True)
+            raise
+
+        self._record_question(
+            tier, route, agents, score, start, first_chunk_latency=first_chunk_latency
+        )
+
+    def _stream_answer(
+        self, question: str, route: str, agents: Dict[str, Any]
+    ) -> Iterator[str]:
+        """
+        Answer a question with one tier's agents, yielding the answer as it is
+        generated.
+
+        Args:
+            question: User's question about the financial data
+            route: "insight", "hypothesis" or "analysis"
+            agents: Agents of the tier answering the question
+
+        Yields:
+            Chunks of the answer
+        """
+        chunks = []
+
+        def emit(chunk_iterator):
+            for chunk in chunk_iterator:
+                chunks.append(chunk)
+                yield chunk
+
+        if route == "insight":
+            data_context = self._question_context(question)
+            yield from emit(
+                agents["insight"].answer_question_stream(question, data_context)
+            )
+
+            self.log_interaction(
+                "InsightGeneratorAgent",
+                {"question": question, "data": data_context},
+                "".join(chunks),
+            )
+
+        elif route == "hypothesis":
+            hypotheses = agents["hypothesis"].generate_hypotheses(
+                data_summary=self.data_summary,
+                initial_analysis=f"User question: {question}",
+            )
+
+            self.log_interaction(
+                "HypothesisGeneratorAgent",
+                {"data_summary": self.data_summary, "question": question},
+                hypotheses,
+            )
+
+            if hypotheses:
+                hypothesis_text = hypotheses[0]["hypothesis"]
+
+                yield from emit(
+                    [
+                        f"Based on your question, I've generated and tested a hypothesis:\n\n",
+                        f"**Hypothesis**: {hypothesis_text}\n\n",
+                        "**Analysis Results**:\n",
+                    ]
+                )
+
+                test_start = len(chunks)
+                yield from emit(
+                    agents["analyst"].test_hypothesis_stream(
+                        hypothesis_text, self.data_summary
+                    )
+                )
+                self.log_interaction(
+                    "DataAnalystAgent", hypothesis_text, "".join(chunks[test_start:])
+                )
+
+                yield from emit(["\n\n"])
+
+                if len(hypotheses) > 1:
+                    yield from emit(
+                        ["I also considered these additional hypotheses:\n\n"]
+                        + [
+                            f"{i}. {h['hypothesis']}\n"
+                            for i, h in enumerate(hypotheses[1:], 2)
+                        ]
+                    )
+            else:
+                # Fallback to analyst if no hypotheses generated
+                yield from emit(
+                    agents["analyst"].analyze_stream(
+                        f"Answer this question: {question}",
+                        self._question_context(question),
+                    )
+                )
+
+        elif agents["tool_analyst"] is not None:
+            # Tool round-trips complete before the answer is known
+            yield from emit([agents["tool_analyst"].answer(question)])
+
+            self.log_interaction(
+                "ToolCallingAnalystAgent",
+                {"question": question},
+                "".join(chunks),
+            )
+
+        else:
+            task = f"Answer the following question about the financial data: {question}"
+
+            context = self._question_context(question)
+            yield from emit(agents["analyst"].analyze_stream(task, context))
+
+            self.log_interaction(
+                "DataAnalystAgent",
+                {"task": task, "data_summary": context},
+                "".join(chunks),
+            )
+
+    def _question_tier(self, question: str, route: str) -> Tuple[str, float]:
+        """
+        Pick the tier that answers a question.
+
+        Args:
+            question: User's question about the financial data
+            route: "insight", "hypothesis" or "analysis"
+
+        Returns:
+            Tuple of the tier and the question's complexity score; the large
+            tier unless a fast deployment is configured
+        """
+        decision = question_router.classify(question, route)
+        if decision["tier"] not in self.tier_agents:
+            return LARGE_TIER, decision["score"]
+        return decision["tier"], decision["score"]
+
+    def _record_question(
+        self,
+        tier: str,
+        route: str,
+        agents: Dict[str, Any],
+        score: float,
+        start: float,
+        first_chunk_latency: Optional[float] = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Record an answered question with the question router.
+
+        Args:
+            tier: Tier that answered the question
+            route: "insight", "hypothesis" or "analysis"
+            agents: Agents of that tier
+            score: Complexity score of the question
+            start: Monotonic time answering started
+            first_chunk_latency: Seconds until the first chunk, if streamed
+            failed: Whether answering failed
+        """
+        if route == "analysis" and agents["tool_analyst"] is not None:
+            agent = agents["tool_analyst"]
+        else:
+            agent = agents.get(route, agents["analyst"])
+
+        question_router.record(
+            tier,
+            agent.deployment_name,
+            route,
+            score,
+            time.monotonic() - start,
+            first_chunk_latency=first_chunk_latency,
+            failed=failed,
+        )
+
+    def _question_context(self, question: str) -> Dict[str, Any]:
+        """
+        Get the data context to answer a question with.
+
+        Args:
+            question: User's question about the financial data
+
+        Returns:
+            The parts of the data summary relevant to the question, or the full
+            summary if question-aware context is disabled
+        """
+        if not self.question_context:
+            return self.data_summary
+
+        # Rebuild when the data has been reloaded
+        if (
+            self.context_builder is None
+            or self.context_builder.data_summary is not self.data_summary
+        ):
+            self.context_builder = QuestionContextBuilder(self.data, self.data_summary)
+
+        return self.context_builder.build(question)
+
+    def _route_question(self, question: str) -> str:
+        """
+        Decide which agent should handle a question.
+
+        Args:
+            question: User's question about the financial data
+
+        Returns:
+            "insight", "hypothesis" or "analysis"
+        """
+        question_lower = question.lower()
+
+        if any(
+            keyword in question_lower
+            for keyword in [
+                "why",
+                "insight",
+                "reason",
+                "implication",
+                "suggest",
+                "recommend",
+                "strategy",
+            ]
+        ):
+            return "insight"
+
+        if any(
+            keyword in question_lower
+            for keyword in ["hypothesis", "hunch", "theory", "conjecture", "test"]
+        ):
+            return "hypothesis"
+
+        return "analysis"
@@ -0,0 +1,248 @@
+"""
+Question Routing module for Financial Analysis System.
+
+Scores questions by complexity so that simple lookups can be answered by a
+fast, cheap deployment and only demanding questions go to the large one, and
+tracks the latency of each tier.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from src.agents.policy import percentile
+
+# Tiers, from cheapest to most capable
+FAST_TIER = "fast"
+LARGE_TIER = "large"
+
+# Base score of each agent route: synthesis and hypothesis testing need more
+# reasoning than answering from figures
+ROUTE_WEIGHTS = {"analysis": 0.0, "insight": 2.0, "hypothesis": 3.0}
+
+# Terms that ask for comparison, explanation or prediction; each distinct term
+# found adds a point
+COMPLEX_TERMS = (
+    "compare",
+    "comparison",
+    "versus",
+    " vs",
+    "trend",
+    "over time",
+    "correlat",
+    "relationship",
+    "impact",
+    "affect",
+    "explain",
+    "why",
+    "driver",
+    "forecast",
+    "predict",
+    "recommend",
+    "strategy",
+    "breakdown",
+    "across",
+)
+
+# Openings of single-figure lookups, which take a point off
+LOOKUP_PATTERN = re.compile(
+    r"^\s*(which|what (is|was|are|were)|how (much|many)|list|show)\b", re.IGNORECASE
+)
+
+# Latency samples kept per tier for percentiles
+LATENCY_WINDOW = 200
+
+# Routing decisions kept for tuning the thresholds
+RECENT_DECISIONS = 20
+
+
+class ComplexityRouter:
+    """
+    Routes questions to a fast or a large tier by a complexity score.
+
+    The score adds the weight of the question's agent route, a point per
+    `words_per_point` words, a point per complex term and half a point per
+    additional clause or question, and takes a point off for plain lookups.
+    Questions scoring at most `fast_threshold` go to the fast tier. Scores
+    and latencies of recent decisions are kept so the thresholds can be tuned
+    against what each tier actually delivers.
+    """
+
+    def __init__(self, fast_threshold: float = 1.5, words_per_point: float = 12.0):
+        """
+        Initialise the ComplexityRouter.
+
+        Args:
+            fast_threshold: Highest score answered by the fast tier
+            words_per_point: Question length, in words, that adds one point
+        """
+        self.lock = threading.Lock()
+        self.tiers = {}
+        self.recent = deque(maxlen=RECENT_DECISIONS)
+        self.configure(fast_threshold=fast_threshold, words_per_point=words_per_point)
+
+    def configure(
+        self,
+        fast_threshold: Optional[float] = None,
+        words_per_point: Optional[float] = None,
+    ) -> None:
+        """
+        Update the thresholds. Statistics are kept.
+
+        Args:
+            fast_threshold: Highest score answered by the fast tier
+            words_per_point: Question length, in words, that adds one point
+        """
+        if words_per_point is not None and float(words_per_point) <= 0:
+            raise ValueError("words_per_point must be positive")
+
+        with self.lock:
+            if fast_threshold is not None:
+                self.fast_threshold = float(fast_threshold)
+            if words_per_point is not None:
+                self.words_per_point = float(words_per_point)
+
+    def score(self, question: str, route: str) -> float:
+        """
+        Score the complexity of a question.
+
+        Args:
+            question: User's question about the financial data
+            route: Agent route of the question ("analysis", "insight" or
+                "hypothesis")
+
+        Returns:
+            Complexity score; higher means more demanding
+        """
+        question_lower = f" {question.lower()}"
+
+        score = ROUTE_WEIGHTS.get(route, 0.0)
+        score += len(question.split()) / self.words_per_point
+        score += sum(term in question_lower for term in COMPLEX_TERMS)
+        score += 0.5 * question_lower.count(" and ")
+        score += 0.5 * max(0, question.count("?") - 1)
+        if LOOKUP_PATTERN.match(question):
+            score -= 1.0
+
+        return round(score, 2)
+
+    def classify(self, question: str, route: str) -> Dict[str, Any]:
+        """
+        Choose the tier for a question.
+
+        Args:
+            question: User's question about the financial data
+            route: Agent route of the question
+
+        Returns:
+            Dictionary with the "tier" and the "score" it was chosen by
+        """
+        score = self.score(question, route)
+        tier = FAST_TIER if score <= self.fast_threshold else LARGE_TIER
+        return {"tier": tier, "score": score}
+
+    def record(
+        self,
+        tier: str,
+        deployment: str,
+        route: str,
+        score: Optional[float],
+        latency: float,
+        first_chunk_latency: Optional[float] = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Record an answered question.
+
+        Args:
+            tier: Tier that answered the question
+            deployment: Deployment that answered the question
+            route: Agent route of the question
+            score: Complexity score, or None if the question was not scored
+            latency: Seconds until the answer was complete
+            first_chunk_latency: Seconds until the first chunk of a streamed
+                answer, if streamed
+            failed: Whether answering failed
+        """
+        with self.lock:
+            stats = self.tiers.get(tier)
+            if stats is None:
+                stats = {
+                    "deployments": {},
+                    "questions": 0,
+                    "failed": 0,
+                    "routes": {},
+                    "total_score": 0.0,
+                    "scored": 0,
+                    "latencies": deque(maxlen=LATENCY_WINDOW),
+                    "first_chunk_latencies": deque(maxlen=LATENCY_WINDOW),
+                }
+                self.tiers[tier] = stats
+
+            stats["deployments"][deployment] = (
+                stats["deployments"].get(deployment, 0) + 1
+            )
+            stats["questions"] += 1
+            stats["failed"] += int(failed)
+            stats["routes"][route] = stats["routes"].get(route, 0) + 1
+            if score is not None:
+                stats["total_score"] += score
+                stats["scored"] += 1
+            if not failed:
+                stats["latencies"].append(latency)
+                if first_chunk_latency is not None:
+                    stats["first_chunk_latencies"].append(first_chunk_latency)
+
+            self.recent.append(
+                {
+                    "tier": tier,
+                    "route": route,
+                    "score": score,
+                    "latency": round(latency, 3),
+                    "failed": failed,
+                }
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get routing statistics.
+
+        Returns:
+            Dictionary with the thresholds, per-tier question counts by
+            deployment and route, average scores and latency percentiles,
+            and the most recent decisions
+        """
+        with self.lock:
+            tiers = {}
+            for tier, stats in sorted(self.tiers.items()):
+                latencies = sorted(stats["latencies"])
+                first_chunks = sorted(stats["first_chunk_latencies"])
+                tiers[tier] = {
+                    "deployments": dict(stats["deployments"]),
+                    "questions": stats["questions"],
+                    "failed": stats["failed"],
+                    "routes": dict(stats["routes"]),
+                    "avg_score": (
+                        stats["total_score"] / stats["scored"]
+                        if stats["scored"]
+                        else None
+                    ),
+                    "avg_latency": (
+                        sum(latencies) / len(latencies) if latencies else None
+                    ),
+                    "latency_p50": percentile(latencies, 50),
+                    "latency_p95": percentile(latencies, 95),
+                    "first_chunk_p50": percentile(first_chunks, 50),
+                }
+
+            return {
+                "fast_threshold": self.fast_threshold,
+                "words_per_point": self.words_per_point,
+                "tiers": tiers,
+                "recent": list(self.recent),
+            }
+
+
+# Router for all controllers in the process
+question_router = ComplexityRouter()
@@ -0,0 +1,303 @@
+"""
+Speculative Follow-up module for Financial Analysis System.
+
+Answers the follow-up questions suggested after a response in the background,
+before the user picks one, so that a chosen suggestion is served from the
+answer cache.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.agents.agents import track_token_usage
+from src.cache.manager import CacheManager
+
+# Longest a queued speculation sleeps before re-checking for foreground work
+FOREGROUND_POLL_INTERVAL = 0.5
+
+# States of a speculative answer
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DISCARDED = "discarded"
+
+
+class SpeculativeExecutor:
+    """
+    Answers suggested follow-up questions at low priority.
+
+    Each conversation has at most one round of speculation: the suggestions
+    made after its latest response. Speculative answers only start while no
+    foreground question is being answered and are stored in the answer cache
+    when complete. When the user asks the next question, a speculative answer
+    to that question is used (waiting for it if it is already running) and the
+    rest of the round is cancelled; running answers stop at their next chunk.
+    Tokens spent on answers that were never used are reported as wasted.
+    """
+
+    def __init__(
+        self,
+        cache_manager: CacheManager,
+        enabled: bool = False,
+        max_questions: int = 3,
+        max_workers: int = 1,
+    ):
+        """
+        Initialise the SpeculativeExecutor.
+
+        Args:
+            cache_manager: Cache the speculative answers are stored in
+            enabled: Whether to speculate at all; when False, speculate() does
+                nothing
+            max_questions: Follow-up questions answered per response
+            max_workers: Speculative answers computed at the same time
+        """
+        self.cache_manager = cache_manager
+        self.enabled = enabled
+        self.max_questions = max_questions
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="speculation"
+        )
+        self.condition = threading.Condition()
+        self.foreground_requests = 0
+        self.rounds = {}
+        self.stats = {
+            "scheduled": 0,
+            "skipped_cached": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "hits": 0,
+            "unused": 0,
+            "tokens": 0,
+            "used_tokens": 0,
+            "wasted_tokens": 0,
+        }
+
+    def speculate(
+        self,
+        session: str,
+        questions: List[Tuple[str, str]],
+        answer: Callable[[str, threading.Event], Optional[Dict[str, Any]]],
+    ) -> int:
+        """
+        Start answering follow-up questions, replacing the session's previous
+        round.
+
+        Args:
+            session: Conversation the questions were suggested in
+            questions: List of (cache key, question) pairs, most likely first
+            answer: Function computing the cached result for a question; it
+                should return None early once the event is set
+
+        Returns:
+            Number of questions scheduled
+        """
+        if not self.enabled:
+            return 0
+
+        uncached = [
+            (cache_key, question)
+            for cache_key, question in questions[: self.max_questions]
+            if self.cache_manager.get(cache_key) is None
+        ]
+
+        entries = []
+        with self.condition:
+            self._discard_round(session)
+            self.stats["skipped_cached"] += min(
+                len(questions), self.max_questions
+            ) - len(uncached)
+
+            for cache_key, question in uncached:
+                entry = {
+                    "question": question,
+                    "cache_key": cache_key,
+                    "state": QUEUED,
+                    "tokens": 0,
+                    "cancel": threading.Event(),
+                    "finished": threading.Event(),
+                    "future": None,
+                }
+                self.rounds.setdefault(session, {})[cache_key] = entry
+                self.stats["scheduled"] += 1
+                entries.append(entry)
+
+            for entry in entries:
+                entry["future"] = self.executor.submit(self._run, entry, answer)
+
+        return len(entries)
+
+    def claim(self, session: str, cache_key: str) -> bool:
+        """
+        Prepare for a question the user asked: use a speculative answer to it,
+        if any, and cancel the rest of the session's round.
+
+        Call this before looking the question up in the answer cache.
+
+        Args:
+            session: Conversation the question was asked in
+            cache_key: Answer cache key of the question
+
+        Returns:
+            True if a speculative answer to the question is in the cache
+        """
+        with self.condition:
+            round_entries = self.rounds.pop(session, {})
+            entry = round_entries.pop(cache_key, None)
+            for other in round_entries.values():
+                self._discard(other)
+
+            if entry is None:
+                return False
+
+            if entry["state"] == QUEUED:
+                # Not started; answering in the foreground is faster
+                self._discard(entry)
+                return False
+
+        # A running answer is further along than a fresh one would be
+        entry["finished"].wait()
+
+        with self.condition:
+            if entry["state"] != DONE:
+                return False
+
+            self.stats["hits"] += 1
+            self.stats["used_tokens"] += entry["tokens"]
+            return True
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """
+        Mark a user request as in progress; speculation does not start until
+        all foreground requests have finished.
+        """
+        with self.condition:
+            self.foreground_requests += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.foreground_requests -= 1
+                self.condition.notify_all()
+
+    def cancel_all(self) -> None:
+        """
+        Cancel all speculation, e.g. because the dataset changed.
+        """
+        with self.condition:
+            for session in list(self.rounds):
+                self._discard_round(session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get speculation statistics.
+
+        Returns:
+            Dictionary with the numbers of speculative answers scheduled,
+            completed, cancelled, used ("hits") and left unused, the hit rate
+            of completed answers, the tokens spent and how many of them were
+            wasted, and the answers still pending
+        """
+        with self.condition:
+            stats = dict(self.stats)
+            stats["enabled"] = self.enabled
+            stats["pending"] = sum(
+                entry["state"] in (QUEUED, RUNNING)
+                for entries in self.rounds.values()
+                for entry in entries.values()
+            )
+
+        stats["hit_rate"] = (
+            stats["hits"] / stats["completed"] if stats["completed"] else None
+        )
+        stats["waste_ratio"] = (
+            stats["wasted_tokens"] / stats["tokens"] if stats["tokens"] else None
+        )
+        return stats
+
+    def _run(
+        self,
+        entry: Dict[str, Any],
+        answer: Callable[[str, threading.Event], Optional[Dict[str, Any]]],
+    ) -> None:
+        """
+        Compute a speculative answer once no foreground request is in progress,
+        and cache it.
+
+        Args:
+            entry: Speculative answer to compute
+            answer: Function computing the cached result for the question
+        """
+        with self.condition:
+            while self.foreground_requests and not entry["cancel"].is_set():
+                self.condition.wait(FOREGROUND_POLL_INTERVAL)
+            if entry["cancel"].is_set():
+                entry["finished"].set()
+                return
+            entry["state"] = RUNNING
+
+        result = None
+        with track_token_usage() as usage:
+            try:
+                result = answer(entry["question"], entry["cancel"])
+            except Exception as e:
+                print(f"Speculative answer to {entry['question']!r} failed: {e}")
+
+        # The answer is valid even if it is no longer wanted by this session
+        if result is not None:
+            self.cache_manager.set(entry["cache_key"], result)
+
+        with self.condition:
+            entry["tokens"] = usage["tokens"]
+            self.stats["tokens"] += usage["tokens"]
+
+            if result is None:
+                self.stats["cancelled" if entry["cancel"].is_set() else "failed"] += 1
+                self.stats["wasted_tokens"] += usage["tokens"]
+                entry["state"] = DISCARDED
+            else:
+                self.stats["completed"] += 1
+                if entry["cancel"].is_set():
+                    # Discarded while running
+                    self.stats["unused"] += 1
+                    self.stats["wasted_tokens"] += usage["tokens"]
+                    entry["state"] = DISCARDED
+                else:
+                    entry["state"] = DONE
+
+            entry["finished"].set()
+
+    def _discard_round(self, session: str) -> None:
+        """Cancel a session's round of speculation. Caller holds the lock."""
+        for entry in self.rounds.pop(session, {}).values():
+            self._discard(entry)
+
+    def _discard(self, entry: Dict[str, Any]) -> None:
+        """
+        Cancel a speculative answer, or count it as unused if it is complete.
+        Caller holds the lock.
+
+        Args:
+            entry: Speculative answer to discard
+        """
+        entry["cancel"].set()
+
+        if entry["state"] == QUEUED:
+            # Counted here whether or not the worker has picked it up yet
+            if entry["future"] is not None:
+                entry["future"].cancel()
+            entry["state"] = DISCARDED
+            self.stats["cancelled"] += 1
+            entry["finished"].set()
+        elif entry["state"] == DONE:
+            entry["state"] = DISCARDED
+            self.stats["unused"] += 1
+            self.stats["wasted_tokens"] += entry["tokens"]
+
+        # Running answers are accounted for by _run when they stop
+        self.condition.notify_all()
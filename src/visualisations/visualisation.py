@@ -6,6 +6,7 @@ Generates chart data for the web UI.
 import base64
 import io
 import json
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
@@ -13,10 +14,16 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+from src.cache.manager import content_cached_method
+
 # Set style for visualisations
 plt.style.use("ggplot")
 sns.set_palette("muted")
 
+# pyplot keeps global figure state, so renders from request and background
+# threads must not interleave
+_render_lock = threading.Lock()
+
 
 class VisualisationGenerator:
     """
@@ -32,19 +39,34 @@ class VisualisationGenerator:
         """
         self.data_loader = data_loader
         self.data = data_loader.data
+        self.cache_manager = getattr(data_loader, "cache_manager", None)
 
-    def generate_chart_data(self, chart_type: str, **kwargs) -> Dict[str, Any]:
+    def fingerprint(self) -> str:
         """
-        Generate data for the specified chart type.
+        Get the fingerprint of the underlying dataset.
 
-        Args:
-            chart_type: Type of chart to generate
-            **kwargs: Additional parameters for the chart
+        Returns:
+            Dataset content fingerprint from the data loader
+        """
+        return self.data_loader.fingerprint()
+
+    def get_chart_types(self) -> List[str]:
+        """
+        Get the chart types supported by generate_chart_data.
 
         Returns:
-            Dictionary with chart data and metadata
+            List of chart type names
         """
-        chart_generators = {
+        return list(self._chart_generators().keys())
+
+    def _chart_generators(self) -> Dict[str, Any]:
+        """
+        Map chart type names to their generator methods.
+
+        Returns:
+            Dictionary of chart type to bound generator method
+        """
+        return {
             "segment_profit": self.segment_profit_chart,
             "segment_profit_margin": self.segment_profit_margin_chart,
             "monthly_trend": self.monthly_trend_chart,
@@ -55,6 +77,19 @@ class VisualisationGenerator:
             "correlation_heatmap": self.correlation_heatmap,
         }
 
+    def generate_chart_data(self, chart_type: str, **kwargs) -> Dict[str, Any]:
+        """
+        Generate data for the specified chart type.
+
+        Args:
+            chart_type: Type of chart to generate
+            **kwargs: Additional parameters for the chart
+
+        Returns:
+            Dictionary with chart data and metadata
+        """
+        chart_generators = self._chart_generators()
+
         if chart_type not in chart_generators:
             raise ValueError(f"Unknown chart type: {chart_type}")
 
@@ -71,33 +106,34 @@ class VisualisationGenerator:
         Returns:
             Dictionary with base64 encoded image and metadata
         """
-        # Create a new figure
-        plt.figure(figsize=(10, 6))
+        with _render_lock:
+            # Create a new figure
+            plt.figure(figsize=(10, 6))
 
-        # Call the plot function
-        plot_result = plot_func(**kwargs)
+            # Call the plot function
+            plot_result = plot_func(**kwargs)
 
-        # Add title and labels if provided
-        if "title" in kwargs:
-            plt.title(kwargs["title"])
-        if "xlabel" in kwargs:
-            plt.xlabel(kwargs["xlabel"])
-        if "ylabel" in kwargs:
-            plt.ylabel(kwargs["ylabel"])
+            # Add title and labels if provided
+            if "title" in kwargs:
+                plt.title(kwargs["title"])
+            if "xlabel" in kwargs:
+                plt.xlabel(kwargs["xlabel"])
+            if "ylabel" in kwargs:
+                plt.ylabel(kwargs["ylabel"])
 
-        # Ensure tight layout
-        plt.tight_layout()
+            # Ensure tight layout
+            plt.tight_layout()
 
-        # Save to a bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", dpi=100)
-        buf.seek(0)
+            # Save to a bytes buffer
+            buf = io.BytesIO()
+            plt.savefig(buf, format="png", dpi=100)
+            buf.seek(0)
 
-        # Convert to base64
-        img_str = base64.b64encode(buf.read()).decode("utf-8")
+            # Convert to base64
+            img_str = base64.b64encode(buf.read()).decode("utf-8")
 
-        # Close the figure to free memory
-        plt.close()
+            # Close the figure to free memory
+            plt.close()
 
         # Return the result
         result = {
@@ -112,6 +148,7 @@ class VisualisationGenerator:
 
         return result
 
+    @content_cached_method("viz")
     def segment_profit_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing profit by segment.
@@ -134,6 +171,7 @@ class VisualisationGenerator:
             plot, title="Total Profit by Segment", ylabel="Profit", **kwargs
         )
 
+    @content_cached_method("viz")
     def segment_profit_margin_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing profit margin by segment.
@@ -163,6 +201,7 @@ class VisualisationGenerator:
             plot, title="Profit Margin by Segment", ylabel="Profit Margin (%)", **kwargs
         )
 
+    @content_cached_method("viz")
     def monthly_trend_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing monthly sales and profit trends.
@@ -231,6 +270,7 @@ class VisualisationGenerator:
             plot, title="Monthly Sales and Profit Trends", ylabel="Amount", **kwargs
         )
 
+    @content_cached_method("viz")
     def country_profit_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing profit by country.
@@ -253,6 +293,7 @@ class VisualisationGenerator:
             plot, title="Total Profit by Country", ylabel="Profit", **kwargs
         )
 
+    @content_cached_method("viz")
     def product_profit_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing profit by product.
@@ -275,6 +316,7 @@ class VisualisationGenerator:
             plot, title="Total Profit by Product", ylabel="Profit", **kwargs
         )
 
+    @content_cached_method("viz")
     def discount_impact_chart(self, **kwargs) -> Dict[str, Any]:
         """
         Create a chart showing the impact of discounts on profit margin.
@@ -304,6 +346,7 @@ class VisualisationGenerator:
             **kwargs,
         )
 
+    @content_cached_method("viz")
     def segment_country_heatmap(self, **kwargs) -> Dict[str, Any]:
         """
         Create a heatmap showing profit by segment and country.
@@ -337,6 +380,7 @@ class VisualisationGenerator:
             plot, title="Profit by Segment and Country", **kwargs
         )
 
+    @content_cached_method("viz")
     def correlation_heatmap(self, **kwargs) -> Dict[str, Any]:
         """
         Create a correlation heatmap for numerical columns.
@@ -151,8 +151,8 @@ document.addEventListener('DOMContentLoaded', function() {
         askButton.disabled = true;
         
         try {
-            // Send question to API
-            const response = await fetch('/api/ask', {
+            // Send question to the streaming API
+            const response = await fetch('/api/ask/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -163,31 +163,54 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
             });
             
-            const data = await response.json();
-            
-            if (data.status === 'success') {
-                // Update conversation ID if new conversation was created
-                if (currentConversationId !== data.conversation_id) {
-                    currentConversationId = data.conversation_id;
-                }
-                
-                // Update conversation title
-                refreshConversationTitle();
-                
-                // Add answer to conversation
-                addAnswerToConversation(data.answer, data.processing_time, data.chart_data);
-                
-                // Show follow-up suggestions if available
-                if (data.follow_up_suggestions && data.follow_up_suggestions.length > 0 && userPreferences.showFollowUp) {
-                    displayFollowUpSuggestions(data.follow_up_suggestions);
-                }
-                
-                // Refresh recent conversations list
-                fetchRecentConversations();
-            } else {
-                // Show error
+            // Errors before the stream starts are returned as JSON
+            if (!response.ok) {
+                const data = await response.json();
                 addErrorToConversation(data.message || 'An error occurred while processing your question.');
+                return;
             }
+            
+            let streamingAnswer = null;
+            
+            await readEventStream(response, (eventName, data) => {
+                if (eventName === 'conversation') {
+                    // Update conversation ID if new conversation was created
+                    if (currentConversationId !== data.conversation_id) {
+                        currentConversationId = data.conversation_id;
+                    }
+                } else if (eventName === 'token') {
+                    // Show the answer as soon as the first chunk arrives
+                    if (!streamingAnswer) {
+                        hideLoading();
+                        streamingAnswer = createStreamingAnswer();
+                    }
+                    streamingAnswer.appendText(data.text);
+                } else if (eventName === 'chart') {
+                    if (!streamingAnswer) {
+                        hideLoading();
+                        streamingAnswer = createStreamingAnswer();
+                    }
+                    streamingAnswer.setChart(data.chart_data);
+                } else if (eventName === 'done') {
+                    if (streamingAnswer) {
+                        streamingAnswer.finish(data.processing_time);
+                    }
+                    
+                    // Update conversation title
+                    refreshConversationTitle();
+                    
+                    // Show follow-up suggestions if available
+                    if (data.follow_up_suggestions && data.follow_up_suggestions.length > 0 && userPreferences.showFollowUp) {
+                        displayFollowUpSuggestions(data.follow_up_suggestions);
+                    }
+                    
+                    // Refresh recent conversations list
+                    fetchRecentConversations();
+                } else if (eventName === 'error') {
+                    // Show error
+                    addErrorToConversation(data.message || 'An error occurred while processing your question.');
+                }
+            });
         } catch (error) {
             console.error('Error:', error);
             addErrorToConversation('Network error. Please try again later.');
@@ -402,10 +425,37 @@ document.addEventListener('DOMContentLoaded', function() {
         // Parse markdown
         const parsedAnswer = marked.parse(answer);
         
-        let chartHtml = '';
+        const chartHtml = buildChartHtml(chartData);
+        
+        const answerHtml = `
+            <div class="answer-container">
+                <div class="answer-header">
+                    <div class="answer-icon">
+                        <i class="bi bi-robot"></i>
+                    </div>
+                    <div class="answer-title">
+                        <strong>Cbus Financial Insights</strong>
+                    </div>
+                </div>
+                <div class="answer-content">
+                    ${parsedAnswer}
+                    ${chartHtml}
+                </div>
+                <div class="processing-time">
+                    Processed in ${processingTime} seconds
+                </div>
+            </div>
+        `;
+        
+        conversationContainer.innerHTML += answerHtml;
+        scrollToBottom();
+    }
+    
+    // Build the HTML for an answer's chart
+    function buildChartHtml(chartData) {
         if (chartData && userPreferences.showCharts) {
             if (chartData.chart_type === 'base64_image') {
-                chartHtml = `
+                return `
                     <div class="chart-container">
                         <h5 class="chart-title">${chartData.title || 'Chart'}</h5>
                         <img src="data:image/png;base64,${chartData.image_data}" 
@@ -415,6 +465,11 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
+        return '';
+    }
+    
+    // Add an answer that is filled in as it streams from the server
+    function createStreamingAnswer() {
         const answerHtml = `
             <div class="answer-container">
                 <div class="answer-header">
@@ -426,17 +481,71 @@ document.addEventListener('DOMContentLoaded', function() {
                     </div>
                 </div>
                 <div class="answer-content">
-                    ${parsedAnswer}
-                    ${chartHtml}
+                    <div class="answer-text"></div>
+                    <div class="answer-chart"></div>
                 </div>
                 <div class="processing-time">
-                    Processed in ${processingTime} seconds
+                    Generating...
                 </div>
             </div>
         `;
         
-        conversationContainer.innerHTML += answerHtml;
-        scrollToBottom();
+        conversationContainer.insertAdjacentHTML('beforeend', answerHtml);
+        const answerElement = conversationContainer.lastElementChild;
+        const textElement = answerElement.querySelector('.answer-text');
+        const chartElement = answerElement.querySelector('.answer-chart');
+        const timeElement = answerElement.querySelector('.processing-time');
+        let answerText = '';
+        
+        return {
+            appendText(chunk) {
+                answerText += chunk;
+                textElement.innerHTML = marked.parse(answerText);
+                scrollToBottom();
+            },
+            setChart(chartData) {
+                chartElement.innerHTML = buildChartHtml(chartData);
+                scrollToBottom();
+            },
+            finish(processingTime) {
+                timeElement.textContent = `Processed in ${processingTime} seconds`;
+            }
+        };
+    }
+    
+    // Read server-sent events from a streaming response
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        eventName = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                
+                onEvent(eventName, data ? JSON.parse(data) : null);
+            }
+        }
     }
     
     // Add error message to conversation
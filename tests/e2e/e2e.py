@@ -4,22 +4,63 @@ End-to-End Tests for the Multi-Agent Financial Analysis System
 Run with: pytest -xvs tests/test_e2e.py
 """
 
+import asyncio
+import base64
+import functools
 import json
 import os
 
 # Add parent directory to path to import modules
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import httpx
+import numpy as np
 import pandas as pd
 import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.agents.agents import DataAnalystAgent, InsightGeneratorAgent
+from src.agents.agents import (
+    DEFAULT_CACHE_MAX_TEMPERATURE,
+    DataAnalystAgent,
+    HypothesisGeneratorAgent,
+    HypothesisStreamParser,
+    InsightGeneratorAgent,
+    ToolCallingAnalystAgent,
+)
+from src.agents.clients import llm_clients
+from src.agents.encoding import SECTION_PRIORITY, SummaryEncoder, count_tokens
+from src.agents.fake_server import FakeLLMServer
+from src.agents.policy import CallPolicy, CallTimeoutError, CircuitOpenError
+from src.agents.prompts import (
+    DATA_ANALYST_SYSTEM_PROMPT,
+    TOOL_LIMIT_MESSAGE,
+    format_data_summary,
+    get_analyst_prompt_with_task,
+    get_hypothesis_testing_prompt,
+    get_insight_question_prompt,
+    shared_prefix,
+)
+from src.agents.scheduler import LLMScheduler
+from src.agents.stats import prompt_stats
+from src.cache.codecs import CacheCodec, loads
+from src.cache.manager import CacheManager
+from src.cache.shared import SharedCacheClient, SharedCacheServer
+from src.cache.warmup import CacheWarmer
+from src.conversation.manager import ConversationManager
 from src.data.loader import FinancialDataLoader
+from src.maintenance.scheduler import MaintenanceScheduler, iter_remove_old_files
+from src.orchestration.context import QuestionContextBuilder
 from src.orchestration.controller import FinancialInsightController
+from src.orchestration.routing import ComplexityRouter
+from src.orchestration.speculation import SpeculativeExecutor
+from src.visualisations.visualisation import VisualisationGenerator
 
 
 # Fixtures for common test resources
@@ -132,6 +173,528 @@ def test_data_loader_save_summary(test_data_path, test_output_dir):
     assert "segment_analysis" in loaded_stats
 
 
+# Cache Tests
+def wait_until(condition, timeout=5.0):
+    """Poll a condition until it holds or the timeout passes"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_cache_soft_and_hard_ttl(tmp_path):
+    """Test that stale entries are served while exactly one background refresh
+    runs per key, and that entries expire at the hard TTL"""
+    cache = CacheManager(str(tmp_path), namespace_ttls={"qa": (0.2, 1.0)})
+    cache.set("qa_margin", "old margin")
+    cache.set("qa_sales", "old sales")
+    cache.set("stats_rows", 6)
+
+    refreshes = []
+    release = threading.Event()
+
+    def refresh(key):
+        refreshes.append(key)
+        release.wait(timeout=5)
+        return key.replace("qa_", "new ")
+
+    # Fresh entries are returned without a refresh
+    assert cache.get_or_refresh("qa_margin", lambda: refresh("qa_margin")) == (
+        "old margin"
+    )
+    assert refreshes == []
+
+    time.sleep(0.3)
+
+    # Stale entries are served immediately, however often they are requested
+    for _ in range(5):
+        for key in ("qa_margin", "qa_sales"):
+            assert cache.get_or_refresh(key, lambda key=key: refresh(key)).startswith(
+                "old"
+            )
+    assert wait_until(lambda: len(refreshes) == 2)
+    release.set()
+
+    assert wait_until(lambda: cache.get("qa_margin") == "new margin")
+    assert wait_until(lambda: cache.get("qa_sales") == "new sales")
+    assert sorted(refreshes) == ["qa_margin", "qa_sales"]
+    assert wait_until(lambda: not cache.get_stats()["refreshing"])
+    assert cache.get_stats()["namespaces"]["qa"]["stale_serves"] == 10
+
+    # Namespaces without their own TTLs keep the default ones
+    assert cache.get("stats_rows") == 6
+
+    # Past the hard TTL entries are gone and are recomputed synchronously
+    time.sleep(1.1)
+    assert cache.get("qa_margin") is None
+    assert cache.get_stats()["namespaces"]["qa"]["expirations"] >= 1
+    assert cache.get_or_refresh("qa_sales", lambda: "recomputed") == "recomputed"
+    assert len(refreshes) == 2
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "zstd"])
+@pytest.mark.parametrize("serializer", ["json", "msgpack", "pickle", "npz"])
+def test_cache_codec_round_trip(serializer, compression):
+    """Test that every codec decodes what it encoded"""
+    # Both are optional dependencies
+    if serializer == "msgpack":
+        pytest.importorskip("msgpack")
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+
+    codec = CacheCodec(serializer, compression)
+    image = base64.b64encode(b"\x89PNG chart").decode()
+    value = {
+        "answer": "Government has the highest margin",
+        "figures": [1, 2.5, None],
+        "chart": {"chart_type": "base64_image", "image_data": image},
+    }
+    if serializer != "json":
+        value["frame"] = pd.DataFrame({"Segment": ["Government"], "Profit": [1.5]})
+        value["array"] = np.arange(6, dtype=np.float32).reshape(2, 3)
+        value["pair"] = ("USA", 2014)
+
+    decoded, timestamp = loads(codec.dumps(value, 123.0))
+
+    assert timestamp == 123.0
+    assert decoded["answer"] == value["answer"]
+    assert decoded["figures"] == [1, 2.5, None]
+    assert decoded["chart"]["image_data"] == image
+    if serializer != "json":
+        pd.testing.assert_frame_equal(decoded["frame"], value["frame"])
+        np.testing.assert_array_equal(decoded["array"], value["array"])
+        assert decoded["array"].dtype == np.float32
+        assert decoded["pair"] == ("USA", 2014)
+
+
+def test_cache_reads_entries_after_codec_change(tmp_path):
+    """Test that entries written with a namespace's previous codec can still
+    be read, and are replaced by entries in the new codec"""
+    pytest.importorskip("msgpack")
+    pytest.importorskip("zstandard")
+    frame = pd.DataFrame({"Country": ["USA", "Canada"], "Sales": [10.0, 20.0]})
+
+    old = CacheManager(str(tmp_path), namespace_codecs={"loader": "pickle+zlib"})
+    old.set("loader_frame", frame)
+    old.set("loader_rows", 6)
+
+    new = CacheManager(str(tmp_path), namespace_codecs={"loader": "msgpack+zstd"})
+    pd.testing.assert_frame_equal(new.get("loader_frame"), frame)
+    assert new.get("loader_rows") == 6
+
+    new.set("loader_rows", 7)
+    plain = CacheManager(str(tmp_path))
+    assert plain.get("loader_rows") == 7
+    pd.testing.assert_frame_equal(plain.get("loader_frame"), frame)
+    assert len(list(tmp_path.glob("loader_rows*"))) == 1
+
+
+def test_content_cached_methods_share_entries_by_content(test_data_path, tmp_path):
+    """Test that fresh loader and chart instances share cached results for the
+    same data file, get their own copies of them, and miss once it changes"""
+    cache = CacheManager(
+        str(tmp_path / "cache"),
+        namespace_codecs={"loader": "pickle+zlib", "viz": "pickle+zlib"},
+    )
+    data_path = str(tmp_path / "financials.xlsx")
+    data = pd.read_excel(test_data_path)
+    data.to_excel(data_path, index=False)
+
+    def fresh_loader():
+        loader = FinancialDataLoader(data_path, cache_manager=cache)
+        loader.load_data()
+        return loader
+
+    first = fresh_loader()
+    summary = first.get_summary_statistics()
+    chart = VisualisationGenerator(first).segment_profit_chart()
+    # Editing a result must not change what later callers get
+    summary["edited"] = True
+    chart["data"].clear()
+
+    second = fresh_loader()
+    assert second.fingerprint() == first.fingerprint()
+    assert "edited" not in second.get_summary_statistics()
+    assert VisualisationGenerator(second).segment_profit_chart()["data"]
+    stats = cache.get_stats()["namespaces"]
+    assert (stats["loader"]["hits"], stats["loader"]["misses"]) == (1, 1)
+    assert (stats["viz"]["hits"], stats["viz"]["misses"]) == (1, 1)
+
+    # Changing the data file changes the fingerprint, so nothing is reused
+    data["Profit"] = data["Profit"] * 2
+    data.to_excel(data_path, index=False)
+    changed = fresh_loader()
+    assert changed.fingerprint() != first.fingerprint()
+    changed_summary = changed.get_summary_statistics()
+    assert changed_summary != second.get_summary_statistics()
+    assert cache.get_stats()["namespaces"]["loader"]["misses"] == 2
+
+
+def test_cache_write_behind(tmp_path):
+    """Test that write-behind entries are readable before they are persisted,
+    and that flush() and close() persist them"""
+    cache = CacheManager(str(tmp_path), memcache_size=1, write_behind=True)
+
+    # Holding the I/O lock keeps the background writer from persisting
+    with cache.io_lock:
+        cache.set("qa_a", {"answer": "a"})
+        cache.set("qa_b", {"answer": "b"})  # Evicts qa_a from memory
+        assert "qa_a" in cache.pending_writes
+        assert cache.get("qa_a") == {"answer": "a"}
+        assert not list(tmp_path.glob("qa_a.*"))
+        assert cache.get_write_behind_stats()["pending"] == 2
+
+    assert cache.flush(timeout=5)
+    assert list(tmp_path.glob("qa_a.*"))
+    assert cache.pending_writes == {}
+    assert cache.get_write_behind_stats()["written"] == 2
+
+    # Another process opening the directory sees the persisted entries
+    reader = CacheManager(str(tmp_path))
+    assert reader.get("qa_a") == {"answer": "a"}
+    assert reader.get("qa_b") == {"answer": "b"}
+
+    cache.set("qa_c", {"answer": "c"})
+    cache.close()
+    assert not cache.writer_thread.is_alive()
+    assert CacheManager(str(tmp_path)).get("qa_c") == {"answer": "c"}
+
+
+def test_maintenance_scheduler_slices_and_priorities():
+    """Test that incremental jobs run in time slices separated by pauses, that
+    due jobs run in priority order, and that failing jobs are rescheduled"""
+    scheduler = MaintenanceScheduler(time_slice=0.02, slice_pause=0.05)
+    order = []
+    steps = []
+
+    def sweep():
+        order.append("sweep")
+        for _ in range(10):
+            time.sleep(0.01)
+            steps.append(time.monotonic())
+            yield
+
+    def failing():
+        order.append("failing")
+        raise RuntimeError("Disk unavailable")
+
+    scheduler.add_job("sweep", sweep, 60, priority=200, initial_delay=0)
+    scheduler.add_job("failing", failing, 0.05, priority=10, initial_delay=0)
+    scheduler.start()
+    try:
+        assert wait_until(lambda: scheduler.get_stats()["sweep"]["runs"] == 1)
+        assert wait_until(lambda: scheduler.get_stats()["failing"]["errors"] >= 2)
+    finally:
+        scheduler.stop(timeout=5)
+
+    assert order[:2] == ["failing", "sweep"]
+    sweep_stats = scheduler.get_stats()["sweep"]
+    assert sweep_stats["slices"] >= 3
+    assert sweep_stats["max_slice"] < 0.02 + 0.05
+    gaps = [later - earlier for earlier, later in zip(steps, steps[1:])]
+    assert max(gaps) >= 0.05
+    assert scheduler.get_stats()["failing"]["last_error"] == "Disk unavailable"
+
+
+def test_maintenance_scheduler_drops_stale_runs():
+    """Test that run_now replaces pending runs of a job and that removing a
+    job stops its run in progress"""
+    scheduler = MaintenanceScheduler(time_slice=0.01, slice_pause=0.01)
+    runs = []
+    steps = []
+
+    def report():
+        runs.append(time.monotonic())
+
+    def sweep():
+        while True:
+            time.sleep(0.005)
+            steps.append(1)
+            yield
+
+    scheduler.add_job("report", report, 60)
+    assert scheduler.run_now("report")
+    assert scheduler.run_now("report")
+    assert not scheduler.run_now("missing")
+    scheduler.add_job("sweep", sweep, 60, initial_delay=0)
+    scheduler.start()
+    try:
+        assert wait_until(lambda: len(steps) > 5)
+        assert scheduler.remove_job("sweep")
+        assert not scheduler.remove_job("sweep")
+        time.sleep(0.1)
+        removed_at = len(steps)
+        time.sleep(0.1)
+        assert len(steps) == removed_at
+    finally:
+        scheduler.stop(timeout=5)
+
+    # Only the latest of the queued runs of the report went ahead
+    assert len(runs) == 1
+    assert scheduler.get_stats()["report"]["runs"] == 1
+
+
+def test_iter_remove_old_files(tmp_path):
+    """Test that only files older than the cutoff with the suffix are removed"""
+    old_time = time.time() - 3600
+    for name in ("old.json", "old.txt", "new.json"):
+        (tmp_path / name).write_text("{}")
+    for name in ("old.json", "old.txt"):
+        os.utime(tmp_path / name, (old_time, old_time))
+    (tmp_path / "old_dir.json").mkdir()
+    os.utime(tmp_path / "old_dir.json", (old_time, old_time))
+
+    removed = list(iter_remove_old_files(str(tmp_path), 60, suffix=".json"))
+
+    assert sum(removed) == 1
+    assert len(removed) == 4
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "new.json",
+        "old.txt",
+        "old_dir.json",
+    ]
+    assert list(iter_remove_old_files(str(tmp_path / "missing"), 60)) == []
+
+
+def test_cache_warmer_runs_and_cancellation():
+    """Test that starting a warm-up cancels the previous run, that cancel()
+    stops a run between tasks, and the reported progress"""
+    warmer = CacheWarmer()
+    ran = []
+
+    def warmup_tasks(run_id):
+        def task(name):
+            time.sleep(0.05)
+            ran.append(f"{run_id} {name}")
+
+        return [(name, functools.partial(task, name)) for name in "abcd"]
+
+    warmer.start("first", warmup_tasks("first"))
+    first_run = warmer.thread
+    assert wait_until(lambda: ran)
+    warmer.start("second", warmup_tasks("second"))
+    first_run.join(timeout=5)
+    assert len([name for name in ran if name.startswith("first")]) < 4
+
+    assert wait_until(lambda: warmer.get_progress()["completed"] >= 1)
+    assert warmer.cancel()
+    assert warmer.wait(timeout=5)
+    progress = warmer.get_progress()
+    assert progress["run_id"] == "second"
+    assert progress["state"] == "cancelled"
+    assert progress["total"] == 4
+    assert 1 <= progress["completed"] < 4
+    assert progress["completed"] == len(
+        [name for name in ran if name.startswith("second")]
+    )
+    assert not warmer.cancel()
+
+    def failing_task():
+        raise RuntimeError("Chart failed")
+
+    warmer.start("third", warmup_tasks("third")[:2] + [("chart", failing_task)])
+    assert warmer.wait(timeout=5)
+    progress = warmer.get_progress()
+    assert progress["state"] == "completed"
+    assert (progress["completed"], progress["total"]) == (3, 3)
+    assert progress["failed"] == [{"task": "chart", "error": "Chart failed"}]
+    assert progress["current"] is None
+
+
+def test_cache_stats_counters(tmp_path, monkeypatch):
+    """Test the per-namespace cache counters and sizes after scripted calls,
+    and the cache stats API"""
+    cache = CacheManager(
+        str(tmp_path), memcache_size=2, namespace_ttls={"stats": (0, 60)}
+    )
+    cache.set("qa_a", {"answer": "a"})
+    cache.set("qa_b", {"answer": "b" * 100})
+    cache.set("stats_c", 1)  # Evicts qa_a from memory
+
+    assert cache.get("qa_b") == {"answer": "b" * 100}  # Memory hit
+    assert cache.get("qa_a") == {"answer": "a"}  # Disk hit, evicts qa_b
+    assert cache.get("qa_missing") is None
+    assert cache.get_or_refresh("stats_c", lambda: 2) == 1  # Stale
+    assert wait_until(lambda: cache.get_stats()["refreshing"] == 0)
+
+    stats = cache.get_stats()
+    qa = stats["namespaces"]["qa"]
+    assert (qa["hits"], qa["memory_hits"], qa["disk_hits"]) == (2, 1, 1)
+    assert (qa["misses"], qa["evictions"], qa["sets"]) == (1, 2, 2)
+    assert qa["hit_ratio"] == pytest.approx(2 / 3)
+    assert qa["bytes_read"] == (tmp_path / "qa_a.json").stat().st_size
+    assert stats["namespaces"]["stats"]["stale_serves"] == 1
+    assert stats["namespaces"]["stats"]["sets"] == 2
+
+    qa_bytes = sum(path.stat().st_size for path in tmp_path.glob("qa_*"))
+    assert stats["disk"]["namespaces"]["qa"] == {"entries": 2, "bytes": qa_bytes}
+    assert qa["bytes_written"] == qa_bytes
+    assert stats["memory"]["entries"] == 2
+
+    import app as web_app
+
+    monkeypatch.setattr(web_app, "cache_manager", cache)
+    client = web_app.app.test_client()
+
+    response = client.get("/api/cache/stats")
+    assert response.status_code == 200
+    api_stats = response.get_json()["stats"]
+    assert api_stats["namespaces"]["qa"]["misses"] == 1
+    assert api_stats["disk"]["namespaces"]["qa"]["bytes"] == qa_bytes
+
+    # Resetting clears the counters but not the cached entries
+    assert client.delete("/api/cache/stats").status_code == 200
+    api_stats = client.get("/api/cache/stats").get_json()["stats"]
+    assert api_stats["totals"]["hits"] == 0
+    assert api_stats["disk"]["entries"] == 3
+
+
+def sse_events(response):
+    """Parse a server-sent event response into (event, data) pairs"""
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append(
+            (event_line[len("event: ") :], json.loads(data_line[len("data: ") :]))
+        )
+    return events
+
+
+def test_ask_question_stream_events(tmp_path, monkeypatch):
+    """Test the event order of the streaming answer endpoint, the cached and
+    stale paths, and that failures end the stream with an error event"""
+    import app as web_app
+
+    cache = CacheManager(str(tmp_path / "cache"), namespace_ttls={"qa": (0, 60)})
+    conversations = ConversationManager(str(tmp_path / "conversations"))
+    stub_controller = MagicMock()
+    stub_controller.stream_q_and_a.side_effect = lambda question: iter(
+        ["Government ", "leads ", "on margin."]
+    )
+    stub_controller.run_q_and_a.return_value = "Refreshed answer"
+    stub_generator = MagicMock()
+
+    def generate_chart_for_question(question):
+        # Rendered after the answer has been streamed
+        time.sleep(0.2)
+        return {"type": "bar", "image": "chart"}
+
+    stub_generator.generate_chart_for_question.side_effect = generate_chart_for_question
+    monkeypatch.setattr(web_app, "cache_manager", cache)
+    monkeypatch.setattr(web_app, "conversation_manager", conversations)
+    monkeypatch.setattr(web_app, "speculation", SpeculativeExecutor(cache))
+    monkeypatch.setattr(web_app, "controller", stub_controller)
+    monkeypatch.setattr(web_app, "visualisation_generator", stub_generator)
+    client = web_app.app.test_client()
+    question = "Which segment has the best margin?"
+
+    response = client.post("/api/ask/stream", json={"question": question})
+    assert response.mimetype == "text/event-stream"
+    events = sse_events(response)
+    assert [event for event, _ in events] == [
+        "conversation",
+        "token",
+        "token",
+        "token",
+        "chart",
+        "done",
+    ]
+    conversation_id = events[0][1]["conversation_id"]
+    assert events[4][1]["chart_data"] == {"type": "bar", "image": "chart"}
+    assert events[5][1]["follow_up_suggestions"]
+    messages = conversations.get_conversation(conversation_id)["messages"]
+    assert messages[-1]["content"] == "Government leads on margin."
+
+    # The cached answer is stale at once, so it is served and refreshed
+    response = client.post(
+        "/api/ask/stream",
+        json={"question": question, "conversation_id": conversation_id},
+    )
+    events = sse_events(response)
+    assert [event for event, _ in events] == [
+        "conversation",
+        "token",
+        "chart",
+        "done",
+    ]
+    assert events[1][1]["text"] == "Government leads on margin."
+    assert stub_controller.stream_q_and_a.call_count == 1
+    current_dataset = web_app.dataset_manager.get_current_dataset()
+    key = web_app.qa_cache_key(
+        current_dataset["id"] if current_dataset else "default", question
+    )
+    assert wait_until(lambda: cache.get(key)["answer"] == "Refreshed answer")
+    stub_controller.run_q_and_a.assert_called_once_with(question)
+
+    # Failures end the stream and are recorded in the conversation
+    stub_controller.stream_q_and_a.side_effect = RuntimeError("Model unavailable")
+    response = client.post(
+        "/api/ask/stream",
+        json={
+            "question": "Which country sells most?",
+            "conversation_id": conversation_id,
+        },
+    )
+    events = sse_events(response)
+    assert [event for event, _ in events] == ["conversation", "error"]
+    assert "Model unavailable" in events[1][1]["message"]
+    message = conversations.get_conversation(conversation_id)["messages"][-1]
+    assert message["role"] == "system"
+    assert "Model unavailable" in message["content"]
+
+
+def test_shared_cache_between_workers(tmp_path):
+    """Test that two cache managers share entries and invalidations through
+    the shared cache daemon, and fall back to misses when it is down"""
+    server = SharedCacheServer("127.0.0.1:0")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    assert wait_until(lambda: server.server is not None)
+    address = "%s:%d" % server.server.server_address
+
+    first = CacheManager(
+        str(tmp_path / "first"), shared_address=address, shared_secret="secret"
+    )
+    second = CacheManager(
+        str(tmp_path / "second"), shared_address=address, shared_secret="secret"
+    )
+    # Both clients are subscribed to invalidation events
+    assert wait_until(lambda: first.shared.stats()["subscribers"] == 2)
+
+    first.set("qa_revenue", {"answer": "USA"})
+    assert second.get("qa_revenue") == {"answer": "USA"}
+    assert second.get_stats()["namespaces"]["qa"]["shared_hits"] == 1
+
+    # Entries not signed with the secret are never decoded
+    forger = SharedCacheClient(address, secret="guess")
+    forger.set("qa_forged", CacheCodec("pickle").dumps("value", time.time()), 0)
+    assert second.get("qa_forged") is None
+    forger.close()
+
+    # Invalidations evict the copy in the other worker's memory tier
+    first.invalidate("qa_revenue")
+    assert wait_until(lambda: "qa_revenue" not in second.memcache)
+    assert second.get("qa_revenue") is None
+
+    first.set("stats_a", 1)
+    first.set("stats_b", 2)
+    assert second.get("stats_a") == 1 and second.get("stats_b") == 2
+    first._invalidate_by_prefix("stats_")
+    assert wait_until(lambda: not second.memcache)
+    assert second.get("stats_a") is None
+
+    server.shutdown()
+    server.server.server_close()
+    third = CacheManager(
+        str(tmp_path / "third"), shared_address=address, shared_secret="secret"
+    )
+    assert third.get("qa_revenue") is None
+    third.set("qa_revenue", {"answer": "Canada"})
+    assert third.get("qa_revenue") == {"answer": "Canada"}
+
+    for manager in (first, second, third):
+        manager.shared.close()
+
+
 # Agent Tests with Mocked LLM
 @patch("langchain.chat_models.ChatOpenAI")
 def test_data_analyst_agent(mock_chat, test_data_path, mock_llm_response):
@@ -181,6 +744,801 @@ def test_insight_generator_agent(mock_chat, mock_llm_response):
     assert isinstance(result, str)
 
 
+@patch("src.agents.agents.AzureChatOpenAI")
+def test_agent_prompts_send_system_prompt_once(
+    mock_chat, test_data_path, mock_llm_response
+):
+    """Test that each LLM request carries its system prompt exactly once"""
+    mock_chat.return_value.invoke.return_value = mock_llm_response
+
+    loader = FinancialDataLoader(test_data_path)
+    loader.load_data()
+    summary = loader.get_summary_statistics()
+
+    analyst = DataAnalystAgent(data_loader=loader)
+    insight = InsightGeneratorAgent()
+    hypothesis = HypothesisGeneratorAgent()
+
+    calls = [
+        (lambda: analyst.analyze("Test analysis task", summary), analyst),
+        (lambda: analyst.test_hypothesis("Test hypothesis", summary), analyst),
+        (lambda: insight.generate_insights("Test task", "Test results"), insight),
+        (lambda: insight.answer_question("Test question", summary), insight),
+        (lambda: insight.generate_hypotheses(summary), insight),
+        (lambda: insight.synthesize_insights("Test results", summary), insight),
+        (lambda: hypothesis.generate_hypotheses(summary, "Test analysis"), hypothesis),
+    ]
+
+    for call, agent in calls:
+        mock_chat.return_value.invoke.reset_mock()
+        call()
+
+        messages = mock_chat.return_value.invoke.call_args[0][0]
+        system_prompt = messages[0].content
+        human_prompt = "".join(message.content for message in messages[1:])
+
+        # The system prompt is only sent as the system message
+        assert system_prompt not in human_prompt
+        assert system_prompt.splitlines()[0] not in human_prompt
+
+        # The task prompt holds the summary once, plus the task template
+        assert len(human_prompt) < len(format_data_summary(summary)) + 2500
+
+
+@patch("src.agents.agents.AzureChatOpenAI")
+def test_analyst_tests_hypotheses_in_one_batch(
+    mock_chat, test_data_path, mock_llm_response
+):
+    """Test that a batch of hypotheses is tested with a single LLM call"""
+    batch_response = json.dumps(
+        {
+            "results": [
+                {
+                    "id": i,
+                    "components": "Margin by segment",
+                    "analysis": "Compared margins",
+                    "verdict": "supported",
+                    "evidence": f"Evidence {i}",
+                    "limitations": "None",
+                }
+                for i in (1, 2, 3)
+            ]
+        }
+    )
+    mock_llm_response.content = batch_response
+    mock_chat.return_value.invoke.return_value = mock_llm_response
+
+    loader = FinancialDataLoader(test_data_path)
+    loader.load_data()
+    summary = loader.get_summary_statistics()
+
+    agent = DataAnalystAgent(data_loader=loader)
+    hypotheses = [f"Hypothesis: Test hypothesis {i}" for i in (1, 2, 3)]
+    results = agent.test_hypothesis_batch(hypotheses, summary)
+
+    assert mock_chat.return_value.invoke.call_count == 1
+    assert len(results) == 3
+    assert all(result.startswith("VERDICT: SUPPORTED") for result in results)
+    assert "Evidence 2" in results[1]
+
+    # A small token budget splits the hypotheses into several batches
+    agent.batch_token_budget = 1
+    assert agent.split_hypothesis_batches(hypotheses, summary) == [[0], [1], [2]]
+
+
+def test_hypotheses_are_parsed_as_they_stream():
+    """Test that each streamed JSON Lines hypothesis is returned as soon as it
+    is complete"""
+    lines = [
+        json.dumps({"hypothesis": f"Hypothesis {i} with {{braces}}", "rationale": "R"})
+        for i in (1, 2)
+    ]
+    text = "```json\n" + "\n".join(lines) + "\n```"
+
+    parser = HypothesisStreamParser()
+    completed = []
+    for position in range(0, len(text), 5):
+        completed.append(len(parser.feed(text[position : position + 5])))
+
+    # Both hypotheses arrive, each in the chunk that closes it
+    assert sum(completed) == 2
+    assert completed.index(1) < len(text) // 5
+
+    agent = HypothesisGeneratorAgent()
+    hypotheses = agent._parse_hypotheses(text)
+    assert [h["hypothesis"] for h in hypotheses] == [
+        "Hypothesis 1 with {braces}",
+        "Hypothesis 2 with {braces}",
+    ]
+    assert hypotheses[0]["business_impact"] == ""
+
+
+def test_agent_against_fake_llm_server(monkeypatch, test_data_path):
+    """Test that agents talk to the local stand-in LLM server over HTTP, with
+    and without streaming, and that it injects errors"""
+    server = FakeLLMServer(
+        "127.0.0.1:0",
+        latency="fixed:0",
+        tokens_per_second=0,
+        responses=[
+            {"pattern": "margin", "response": "Government has the best margin."}
+        ],
+    )
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+
+        loader = FinancialDataLoader(test_data_path)
+        loader.load_data()
+        summary = loader.get_summary_statistics()
+
+        agent = DataAnalystAgent(
+            data_loader=loader, deployment_name="fake-server-test", streaming=False
+        )
+        answer = "Government has the best margin."
+        assert agent.analyze("Which segment has the best margin?", summary) == answer
+        chunks = list(agent.analyze_stream("Which margin is best?", summary))
+        assert len(chunks) > 1
+        assert "".join(chunks) == answer
+
+        stats = server.get_stats()["fake-server-test"]
+        assert stats["requests"] == 2
+        assert stats["streamed"] == 1
+
+        server.error_statuses = (429,)
+        server.settings["error_rate"] = 1.0
+        response = httpx.post(
+            f"{url}/v1/chat/completions",
+            json={"model": "gpt-4o", "messages": [{"role": "user", "content": "Hi"}]},
+        )
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+    finally:
+        server.shutdown()
+
+
+def test_llm_response_cache(monkeypatch, test_data_path, tmp_path):
+    """Test that repeated LLM calls are served from the "llm" cache namespace,
+    keyed on the deployment, temperature and system prompt, and that hot
+    agents, abandoned streams and failed streams are never cached"""
+    server = FakeLLMServer("127.0.0.1:0", latency="fixed:0", tokens_per_second=0)
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+
+        loader = FinancialDataLoader(test_data_path)
+        loader.load_data()
+        summary = loader.get_summary_statistics()
+        cache = CacheManager(str(tmp_path))
+
+        def make_agent(deployment="llm-cache-test", temperature=0.0):
+            return DataAnalystAgent(
+                deployment_name=deployment,
+                temperature=temperature,
+                streaming=False,
+                data_loader=loader,
+                cache_manager=cache,
+            )
+
+        agent = make_agent()
+        task = "Which segment has the best margin?"
+        answer = agent.analyze(task, summary)
+        assert agent.analyze(task, summary) == answer
+        assert "".join(agent.analyze_stream(task, summary)) == answer
+        assert server.get_stats()["llm-cache-test"]["requests"] == 1
+        llm_stats = cache.get_stats()["namespaces"]["llm"]
+        assert (llm_stats["hits"], llm_stats["sets"]) == (2, 1)
+
+        key = agent._response_cache_key("System", "Prompt")
+        assert key.startswith("llm")
+        assert make_agent()._response_cache_key("System", "Prompt") == key
+        assert agent._response_cache_key("Other system", "Prompt") != key
+        assert agent._response_cache_key("System", "Other prompt") != key
+        assert (
+            make_agent("other-deployment")._response_cache_key("System", "Prompt")
+            != key
+        )
+        assert (
+            make_agent(temperature=0.1)._response_cache_key("System", "Prompt") != key
+        )
+
+        # Sampling too hot to be repeatable is never cached
+        hot = make_agent("llm-cache-hot", DEFAULT_CACHE_MAX_TEMPERATURE + 0.1)
+        assert hot._response_cache_key("System", "Prompt") is None
+        hot.analyze(task, summary)
+        hot.analyze(task, summary)
+        assert server.get_stats()["llm-cache-hot"]["requests"] == 2
+
+        # A stream the consumer closes early is not cached
+        streamer = make_agent("llm-cache-stream")
+        stream_task = "Which country sells the most units?"
+        stream = streamer.analyze_stream(stream_task, summary)
+        next(stream)
+        stream.close()
+        prompt = get_analyst_prompt_with_task(stream_task, summary)
+        stream_key = streamer._response_cache_key(DATA_ANALYST_SYSTEM_PROMPT, prompt)
+        assert cache.get(stream_key) is None
+
+        # Nor is a stream that fails midway
+        def failing_stream(messages):
+            yield AIMessageChunk(content="Partial ")
+            raise RuntimeError("Connection dropped")
+
+        streamer.llm = MagicMock()
+        streamer.llm.stream = failing_stream
+        with pytest.raises(RuntimeError):
+            list(streamer.analyze_stream(stream_task, summary))
+        assert cache.get(stream_key) is None
+    finally:
+        server.shutdown()
+
+
+def test_prompts_share_data_prefix(monkeypatch, test_data_path):
+    """Test that analyst, hypothesis testing and insight prompts over the same
+    summary start with the same data prefix, and that its reuse is counted"""
+    loader = FinancialDataLoader(test_data_path)
+    loader.load_data()
+    summary = loader.get_summary_statistics()
+
+    prompts = [
+        get_analyst_prompt_with_task("Which segment has the best margin?", summary),
+        get_analyst_prompt_with_task("Which country sells the most?", summary),
+        get_hypothesis_testing_prompt("Discounts reduce profit", summary),
+        get_insight_question_prompt("Why do discounts hurt margins?", summary),
+    ]
+    prefix = shared_prefix(prompts[0])
+    assert prefix.startswith("DATA SUMMARY:")
+    assert all(shared_prefix(prompt) == prefix for prompt in prompts)
+    assert len(set(prompts)) == len(prompts)
+
+    server = FakeLLMServer("127.0.0.1:0", latency="fixed:0", tokens_per_second=0)
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+        # The test summary is shorter than the provider's minimum cached prefix
+        monkeypatch.setattr("src.agents.stats.MIN_CACHEABLE_PREFIX_TOKENS", 0)
+        prompt_stats.reset()
+
+        agent = DataAnalystAgent(
+            data_loader=loader, deployment_name="prefix-test", streaming=False
+        )
+        agent.analyze("Which segment has the best margin?", summary)
+        agent.test_hypothesis("Discounts reduce profit", summary)
+
+        stats = prompt_stats.get_stats()["DataAnalystAgent"]
+        assert stats["calls"] == 2
+        assert stats["reusable_prefix_calls"] == 1
+        assert stats["reusable_prefix_ratio"] == 0.5
+    finally:
+        prompt_stats.reset()
+        server.shutdown()
+
+
+def test_async_agent_calls_overlap(monkeypatch, test_data_path):
+    """Test that independent async agent calls are in flight at the same time"""
+    server = FakeLLMServer("127.0.0.1:0", latency="fixed:0.5", tokens_per_second=0)
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+
+        loader = FinancialDataLoader(test_data_path)
+        loader.load_data()
+        summary = loader.get_summary_statistics()
+        agent = DataAnalystAgent(
+            data_loader=loader, deployment_name="async-test", streaming=False
+        )
+
+        async def run_all():
+            return await asyncio.gather(
+                agent.aanalyze("Which segment has the best margin?", summary),
+                agent.aanalyze("Which country sells the most units?", summary),
+                agent.atest_hypothesis("Discounts reduce profit", summary),
+                agent.atest_hypothesis("Paseo is the top product", summary),
+            )
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 4
+        assert all(results)
+        assert server.get_stats()["async-test"]["requests"] == 4
+        # Run one after another, the four calls would take at least 2 seconds
+        assert elapsed < 1.5
+    finally:
+        server.shutdown()
+
+
+def test_summary_encoder_drops_sections_by_priority():
+    """Test that the summary encoder drops sections in priority order to meet
+    its token budget, keeping question drill-downs until last"""
+    records = [
+        {"name": f"Item {i}", "sales": 1000.0 * i, "profit": 123.456 * i}
+        for i in range(1, 9)
+    ]
+    summary = {
+        "total_sales": 1234567.891,
+        "total_profit": 98765.4321,
+        "yearly_totals": records,
+        "focus_segment": [{"name": "Government", "profit": 5800}],
+    }
+    for name in SECTION_PRIORITY:
+        summary[name] = records
+
+    text, report = SummaryEncoder().encode_with_report(summary)
+    assert report["dropped_sections"] == []
+    assert report["compact_tokens"] < report["json_tokens"]
+
+    encoder = SummaryEncoder(token_budget=1)
+    text, report = encoder.encode_with_report(summary)
+    assert report["dropped_sections"] == [
+        "yearly_totals",
+        *SECTION_PRIORITY,
+        "focus_segment",
+    ]
+    assert text.startswith("OVERVIEW")
+    assert "total_sales: 1234568" in text
+
+    # Room for the drill-down but not for any other section
+    encoder.token_budget = count_tokens(text) + 20
+    text, report = encoder.encode_with_report(summary)
+    assert report["dropped_sections"] == ["yearly_totals", *SECTION_PRIORITY]
+    assert "FOCUS SEGMENT" in text
+    assert report["compact_tokens"] <= encoder.token_budget
+
+    stats = encoder.get_stats()
+    assert stats["summaries"] == 2
+    assert stats["dropped_sections"] == 2 * len(SECTION_PRIORITY) + 3
+    assert stats["tokens_saved"] > 0
+
+
+def test_question_context_selects_relevant_data(tmp_path):
+    """Test that question contexts hold the sections and drill-downs for the
+    dimensions and values a question mentions"""
+    sample_path = tmp_path / "sample.xlsx"
+    pd.DataFrame(
+        {
+            "Segment": ["Government", "Enterprise", "Midmarket", "Government"],
+            "Country": ["United States of America", "Canada", "France", "Canada"],
+            "Product": ["Carretera", "VTT", "Velo", "Velo"],
+            "Discount Band": ["None", "Low", "Medium", "Low"],
+            "Units Sold": [100, 200, 300, 400],
+            "Discounts": [0, 800, 3600, 1200],
+            "Sales": [2000, 7200, 14400, 10800],
+            "Profit": [1000, 3200, 5400, 4800],
+            "Month Name": ["March", "May", "May", "June"],
+            "Year": [2014] * 4,
+        }
+    ).to_excel(sample_path, index=False)
+
+    loader = FinancialDataLoader(str(sample_path))
+    loader.load_data()
+    summary = loader.get_summary_statistics()
+    builder = QuestionContextBuilder(loader.data, summary)
+
+    # Dimension keywords select their breakdowns only
+    context = builder.build("Which segment has the highest profit margin?")
+    assert builder.match("Which segment has the highest profit margin?") == {
+        "dimensions": ["Segment"],
+        "values": {},
+    }
+    assert "segment_analysis" in context and "country_analysis" not in context
+    assert context["total_sales"] == summary["total_sales"]
+
+    # Named values add a drill-down into the matching rows
+    question = "How did Government do in Canada for Velo?"
+    assert builder.match(question)["values"] == {
+        "Segment": ["Government"],
+        "Country": ["Canada"],
+        "Product": ["Velo"],
+    }
+    context = builder.build(question)
+    assert context["focus"] == "Segment = Government; Country = Canada; Product = Velo"
+    assert context["focus_rows"] == 1
+    assert context["focus_totals"]["Sales"] == 10800
+
+    # Comparisons break the focus down by the compared values
+    context = builder.build("Compare Canada and France")
+    assert [row["Country"] for row in context["focus_by_country"]] == [
+        "Canada",
+        "France",
+    ]
+
+    # Aliases, with upper-case abbreviations matched case-sensitively
+    assert builder.match("What were sales in the USA?")["values"] == {
+        "Country": ["United States of America"]
+    }
+    assert builder.match("Tell us about profit")["values"] == {}
+
+    # Discount bands that are also common words need the keyword
+    assert "Discount Band" not in builder.match("Is Low profit a concern?")["values"]
+    assert builder.match("How do Low discount sales compare?")["values"] == {
+        "Discount Band": ["Low"]
+    }
+
+    # Months are only matched with their capitalisation, not at the start
+    assert builder.match("What happened to sales in May?")["values"] == {
+        "Month Name": ["May"]
+    }
+    assert builder.match("What may explain the profit?")["values"] == {}
+    assert builder.match("May I see the profit?")["values"] == {}
+
+    # Questions about nothing in particular get the full summary
+    assert builder.build("Give me an overview of performance") is summary
+
+
+class ScriptedModel:
+    """Stand-in for a chat model that returns scripted responses in order"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def invoke(self, messages):
+        self.calls.append(list(messages))
+        return self.respond(len(self.calls))
+
+
+def segment_tool_call(call_number):
+    """Model response asking for the Government segment analysis"""
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "analyze_segment",
+                "args": {"segment_name": "Government"},
+                "id": f"call_{call_number}",
+            }
+        ],
+    )
+
+
+def test_tool_calling_analyst_uses_tool_results(test_data_path):
+    """Test that the tool-calling analyst runs the tools the model asks for,
+    sends their results back, and forces an answer at the round cap"""
+    loader = FinancialDataLoader(test_data_path)
+    loader.load_data()
+    agent = ToolCallingAnalystAgent(loader, max_tool_rounds=2)
+    assert agent.llm_answer_only.kwargs["tool_choice"] == "none"
+
+    agent.llm_with_tools = ScriptedModel(
+        lambda n: (
+            segment_tool_call(n)
+            if n == 1
+            else AIMessage(content="Government made 5800 profit")
+        )
+    )
+    answer = agent.answer("How profitable is the Government segment?")
+
+    assert answer == "Government made 5800 profit"
+    tool_result = agent.llm_with_tools.calls[1][-1]
+    assert isinstance(tool_result, ToolMessage)
+    assert tool_result.tool_call_id == "call_1"
+    assert json.loads(tool_result.content)["total_profit"] == 5800
+    assert agent.get_stats() == {
+        "questions": 1,
+        "tool_rounds": 1,
+        "capped": 0,
+        "tool_calls": {"analyze_segment": 1},
+    }
+
+    # A model that keeps calling tools is made to answer after the cap
+    agent.llm_with_tools = ScriptedModel(segment_tool_call)
+    agent.llm_answer_only = ScriptedModel(lambda n: AIMessage(content="Final answer"))
+    answer = agent.answer("Keep analysing the Government segment")
+
+    assert answer == "Final answer"
+    assert len(agent.llm_with_tools.calls) == 2
+    final_messages = agent.llm_answer_only.calls[0]
+    assert final_messages[-1].content == TOOL_LIMIT_MESSAGE
+    assert sum(isinstance(m, ToolMessage) for m in final_messages) == 2
+    assert agent.get_stats()["capped"] == 1
+    assert agent.get_stats()["tool_rounds"] == 3
+
+
+def test_router_sends_lookups_to_fast_tier():
+    """Test that simple lookups are routed to the fast tier and demanding
+    questions to the large tier, with tunable thresholds"""
+    router = ComplexityRouter()
+
+    lookup = "Which country generates the most revenue?"
+    synthesis = "Why do discounts hurt margins and what strategy should we adopt?"
+    assert router.classify(lookup, "analysis")["tier"] == "fast"
+    assert router.classify(synthesis, "insight")["tier"] == "large"
+
+    router.configure(fast_threshold=-5)
+    assert router.classify(lookup, "analysis")["tier"] == "large"
+
+    router.record("large", "gpt-4o", "analysis", -0.5, 0.8)
+    stats = router.get_stats()
+    assert stats["fast_threshold"] == -5
+    assert stats["tiers"]["large"]["deployments"] == {"gpt-4o": 1}
+    assert stats["tiers"]["large"]["latency_p50"] == 0.8
+
+
+def test_controller_answers_simple_questions_on_fast_tier(
+    monkeypatch, test_data_path, test_output_dir
+):
+    """Test that the controller answers simple questions with the fast
+    deployment when one is configured, and with the large one otherwise"""
+    server = FakeLLMServer("127.0.0.1:0", latency="fixed:0", tokens_per_second=0)
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+        lookup = "Which country generates the most revenue?"
+        synthesis = "Why do discounts hurt margins and what strategy should we adopt?"
+
+        controller = FinancialInsightController(
+            data_path=test_data_path,
+            output_dir=test_output_dir,
+            analyst_deployment="large-test",
+            insight_deployment="large-test",
+            fast_deployment="fast-test",
+            streaming=False,
+            log_interactions=False,
+            cache_llm_responses=False,
+        )
+        assert controller.run_q_and_a(lookup)
+        assert "".join(controller.stream_q_and_a(lookup))
+
+        stats = server.get_stats()
+        assert stats["fast-test"]["requests"] == 2
+        assert stats["fast-test"]["streamed"] == 1
+        assert "large-test" not in stats
+
+        assert controller.run_q_and_a(synthesis)
+        stats = server.get_stats()
+        assert stats["large-test"]["requests"] == 1
+        assert stats["fast-test"]["requests"] == 2
+
+        # Without a fast deployment, simple questions go to the large tier
+        controller = FinancialInsightController(
+            data_path=test_data_path,
+            output_dir=test_output_dir,
+            analyst_deployment="fallback-test",
+            insight_deployment="fallback-test",
+            streaming=False,
+            log_interactions=False,
+            cache_llm_responses=False,
+        )
+        assert "fast" not in controller.tier_agents
+        assert controller.run_q_and_a(lookup)
+        assert "".join(controller.stream_q_and_a(lookup))
+
+        stats = server.get_stats()
+        assert stats["fallback-test"]["requests"] == 2
+        assert stats["fallback-test"]["streamed"] == 1
+        assert stats["fast-test"]["requests"] == 2
+    finally:
+        server.shutdown()
+
+
+def test_speculative_follow_up_answers(monkeypatch, test_data_path, tmp_path):
+    """Test that suggested follow-ups are answered in the background once no
+    question is in progress, served from the cache when asked, and cancelled
+    with their tokens counted as wasted when the user asks something else"""
+    server = FakeLLMServer("127.0.0.1:0", latency="fixed:0", tokens_per_second=0)
+    url = server.start()
+    try:
+        monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", url)
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "unused")
+
+        loader = FinancialDataLoader(test_data_path)
+        loader.load_data()
+        summary = loader.get_summary_statistics()
+        agent = DataAnalystAgent(
+            data_loader=loader, deployment_name="speculation-test", streaming=True
+        )
+
+        def answer(question, cancel_event):
+            text = "".join(agent.analyze_stream(question, summary))
+            return None if cancel_event.is_set() else {"answer": text}
+
+        cache = CacheManager(str(tmp_path / "cache"))
+        speculation = SpeculativeExecutor(cache, enabled=True)
+        questions = [
+            (cache.make_key("qa_test", question), question)
+            for question in ("What about Canada?", "What about France?")
+        ]
+
+        with speculation.foreground():
+            assert speculation.speculate("conversation", questions, answer) == 2
+            time.sleep(0.2)
+            assert server.get_stats() == {}
+
+        deadline = time.time() + 10
+        while speculation.get_stats()["pending"] and time.time() < deadline:
+            time.sleep(0.05)
+
+        # The user picks the first suggestion
+        assert speculation.claim("conversation", questions[0][0])
+        assert cache.get(questions[0][0])["answer"]
+
+        # The next round is replaced by an unrelated question
+        speculation.speculate("conversation", questions[1:], answer)
+        speculation.executor.shutdown(wait=True)
+        assert not speculation.claim("conversation", "unrelated")
+
+        stats = speculation.get_stats()
+        assert stats["hits"] == 1
+        assert stats["unused"] + stats["cancelled"] >= 1
+        assert 0 < stats["used_tokens"] < stats["tokens"]
+        assert stats["wasted_tokens"] == stats["tokens"] - stats["used_tokens"]
+    finally:
+        server.shutdown()
+
+
+def test_llm_scheduler_queues_calls_in_order():
+    """Test that calls over the token budget wait in arrival order, and that
+    the wait and queue depth are reported"""
+    # 100 tokens per second, holding at most 100 tokens
+    scheduler = LLMScheduler(
+        deployment_limits={"gpt-4o": {"tokens_per_minute": 6000}}, burst_seconds=1.0
+    )
+    assert scheduler.acquire("gpt-4o", 100) < 0.05
+
+    waits = {}
+    order = []
+
+    def call(i):
+        waits[i] = scheduler.acquire("gpt-4o", 30)
+        order.append(i)
+
+    threads = []
+    for i in range(3):
+        threads.append(threading.Thread(target=call, args=(i,)))
+        threads[-1].start()
+        # Each call arrives after the previous one has queued
+        assert wait_until(
+            lambda: scheduler.get_stats()["gpt-4o"]["queue_depth"] == i + 1
+        )
+
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == [0, 1, 2]
+    assert 0.15 < waits[0] < waits[1] < waits[2]
+    assert waits[2] > 0.6
+
+    stats = scheduler.get_stats()["gpt-4o"]
+    assert stats["calls"] == 4
+    assert stats["queued_calls"] == 3
+    assert stats["max_queue_depth"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["max_wait"] == pytest.approx(waits[2])
+    assert stats["estimated_tokens"] == 190
+
+    # Deployments without budgets are not queued
+    assert not scheduler.is_limited("other")
+    assert scheduler.acquire("other", 10**6) < 0.05
+
+
+def test_llm_scheduler_settles_and_limits_requests():
+    """Test that settling returns unused tokens to the bucket and that the
+    request budget spaces out calls"""
+    # One token per second, holding at most 100 tokens
+    scheduler = LLMScheduler(tokens_per_minute=60, burst_seconds=100)
+    scheduler.acquire("gpt-4o", 100)
+    bucket = scheduler.deployments["gpt-4o"]["tokens"]
+    assert bucket.level == pytest.approx(0, abs=0.5)
+
+    scheduler.settle("gpt-4o", 100, 40)
+    assert bucket.level == pytest.approx(60, abs=0.5)
+    assert scheduler.acquire("gpt-4o", 60) < 0.05
+
+    # Unknown usage leaves the reservation as it was
+    scheduler.settle("gpt-4o", 60, None)
+    assert bucket.level == pytest.approx(0, abs=0.5)
+    assert scheduler.get_stats()["gpt-4o"]["estimate_ratio"] == 0.4
+
+    # Ten requests per second, one at a time
+    scheduler = LLMScheduler(requests_per_minute=600, burst_seconds=0.1)
+    assert scheduler.acquire("gpt-4o", 1) < 0.05
+    assert scheduler.acquire("gpt-4o", 1) > 0.05
+
+
+def test_call_policy_retries_and_opens_circuit():
+    """Test that LLM calls are retried on server errors and fail fast once
+    the circuit breaker opens"""
+    policy = CallPolicy(
+        ThreadPoolExecutor(max_workers=2),
+        timeout=0.5,
+        max_retries=2,
+        backoff_base=0.01,
+        failure_threshold=3,
+        reset_timeout=60,
+    )
+    server_error = httpx.HTTPStatusError(
+        "Service unavailable",
+        request=httpx.Request("POST", "https://example.invalid"),
+        response=httpx.Response(503),
+    )
+
+    attempts = []
+
+    def flaky_call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise server_error
+        return "response"
+
+    # Two failures are retried, and the third attempt succeeds; every attempt
+    # is admitted (e.g. charged to the rate limits) before it is sent
+    admitted = []
+    assert policy.call(flaky_call, admit=lambda: admitted.append(1)) == "response"
+    assert len(attempts) == 3
+    assert len(admitted) == 3
+
+    # Slow attempts time out and are retried
+    with pytest.raises(CallTimeoutError):
+        policy.call(lambda: time.sleep(2))
+    assert policy.get_stats()["timeouts"] == 3
+
+    # Three consecutive failures opened the circuit
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: "response")
+    assert policy.get_stats()["circuit_state"] == "open"
+
+
+def test_call_policy_stream_admission_failure_releases_trial():
+    """Test that a stream whose admission fails during the half-open trial
+    does not leave the circuit waiting for that trial forever"""
+    policy = CallPolicy(
+        ThreadPoolExecutor(max_workers=2),
+        max_retries=0,
+        failure_threshold=1,
+        reset_timeout=0.05,
+    )
+    server_error = httpx.HTTPStatusError(
+        "Service unavailable",
+        request=httpx.Request("POST", "https://example.invalid"),
+        response=httpx.Response(503),
+    )
+
+    def fail():
+        raise server_error
+
+    def open_circuit():
+        with pytest.raises(httpx.HTTPStatusError):
+            policy.call(fail)
+        assert policy.get_stats()["circuit_state"] == "open"
+        time.sleep(0.1)
+
+    def reject():
+        raise ValueError("Over budget")
+
+    def chunks():
+        return iter(["Hello", " world"])
+
+    # The trial stream is rejected before it is sent
+    open_circuit()
+    with pytest.raises(ValueError):
+        list(policy.stream(chunks, admit=reject))
+    assert list(policy.stream(chunks)) == ["Hello", " world"]
+    assert policy.get_stats()["circuit_state"] == "closed"
+
+    async def areject():
+        reject()
+
+    async def achunks():
+        for chunk in chunks():
+            yield chunk
+
+    async def acollect(admit=None):
+        return [chunk async for chunk in policy.astream(achunks, admit=admit)]
+
+    open_circuit()
+    with pytest.raises(ValueError):
+        asyncio.run(acollect(areject))
+    assert asyncio.run(acollect()) == ["Hello", " world"]
+    assert policy.get_stats()["circuit_state"] == "closed"
+
+
 # Controller Tests with Mocked Agents
 class MockController(FinancialInsightController):
     """Mock controller that overrides agent methods to avoid actual LLM calls"""
@@ -223,6 +1581,11 @@ class MockController(FinancialInsightController):
 
         return results
 
+    def generate_and_test_hypotheses(self, analysis_results):
+        """Mock implementation"""
+        hypotheses = self.generate_hypotheses(analysis_results)
+        return hypotheses, self.test_hypotheses(hypotheses)
+
     def synthesize_insights(self, testing_results):
         """Mock implementation"""
         insights = "Insight 1: This is a mock insight based on hypothesis testing.\nInsight 2: This is another mock insight."
@@ -279,6 +1642,143 @@ def test_controller_qa_functionality(test_data_path, test_output_dir):
     assert question in answer  # Our mock simply echoes the question
 
 
+def test_controller_rebuild_reuses_llm_clients(test_data_path, test_output_dir):
+    """Test that a rebuilt controller reuses the chat model clients and HTTP
+    connection pools of the controller it replaces"""
+    first = FinancialInsightController(
+        data_path=test_data_path, output_dir=test_output_dir
+    )
+    reused = llm_clients.get_stats()["reused"]
+
+    second = FinancialInsightController(
+        data_path=test_data_path, output_dir=test_output_dir
+    )
+
+    assert llm_clients.get_stats()["reused"] >= reused + 2
+    assert second.analyst_agent.llm is first.analyst_agent.llm
+    assert second.insight_agent.llm is first.insight_agent.llm
+    assert second.analyst_agent.llm.http_client is first.analyst_agent.llm.http_client
+    assert isinstance(second.analyst_agent.llm.http_client, httpx.Client)
+
+
+def test_controller_tests_hypotheses_while_generating(
+    test_data_path, test_output_dir, monkeypatch
+):
+    """Test that pipelined discovery starts testing hypotheses in batches
+    before the Hypothesis Generator has finished"""
+    controller = FinancialInsightController(
+        data_path=test_data_path,
+        output_dir=test_output_dir,
+        streaming=False,
+        cache_llm_responses=False,
+    )
+    # One hypothesis per batch, so each batch is full when the next arrives
+    controller.analyst_agent.batch_token_budget = 1
+
+    events = []
+    tested = threading.Event()
+
+    def generate_hypotheses_stream(data_summary, initial_analysis):
+        for i in (1, 2, 3):
+            events.append(f"generated {i}")
+            yield {
+                "hypothesis": f"Margin hypothesis {i}",
+                "rationale": "Rationale",
+                "test_approach": "Compare segments",
+                "business_impact": "Pricing",
+            }
+        # Generation only finishes once a test has started
+        tested.wait(timeout=5)
+        events.append("generation finished")
+
+    def test_hypothesis_batch(hypotheses, data_summary):
+        events.append(f"tested {len(hypotheses)}")
+        tested.set()
+        return [f"Result for {hypothesis}" for hypothesis in hypotheses]
+
+    monkeypatch.setattr(
+        controller.hypothesis_agent,
+        "generate_hypotheses_stream",
+        generate_hypotheses_stream,
+    )
+    monkeypatch.setattr(
+        controller.analyst_agent, "test_hypothesis_batch", test_hypothesis_batch
+    )
+
+    hypotheses, testing_results = controller.generate_and_test_hypotheses(
+        "Initial analysis"
+    )
+
+    assert len(hypotheses) == 3
+    assert [result["result"] for result in testing_results] == [
+        f"Result for Hypothesis: Margin hypothesis {i}" for i in (1, 2, 3)
+    ]
+    assert events.index("tested 1") < events.index("generation finished")
+    assert events.count("tested 1") == 3
+    assert os.path.exists(f"{test_output_dir}/hypotheses.json")
+
+
+def test_controller_tests_hypotheses_concurrently(
+    test_data_path, test_output_dir, monkeypatch
+):
+    """Test that hypothesis tests run at most hypothesis_concurrency at a time,
+    come back in hypothesis order, and survive individual failures"""
+    controller = FinancialInsightController(
+        data_path=test_data_path,
+        output_dir=test_output_dir,
+        streaming=False,
+        cache_llm_responses=False,
+        hypothesis_concurrency=2,
+        hypothesis_batching=False,
+    )
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+    finished = []
+
+    def test_hypothesis(hypothesis, data_summary):
+        number = int(hypothesis.rsplit(" ", 1)[1])
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            # Earlier hypotheses take longer, so they finish out of order
+            time.sleep(0.05 * (5 - number))
+            if number == 3:
+                raise RuntimeError("Model unavailable")
+            return f"Result {number}"
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+                finished.append(number)
+
+    monkeypatch.setattr(controller.analyst_agent, "test_hypothesis", test_hypothesis)
+    hypotheses = [{"hypothesis": f"Margin hypothesis {i}"} for i in range(1, 6)]
+
+    results = controller.test_hypotheses(hypotheses)
+
+    assert in_flight["max"] == 2
+    assert finished != sorted(finished)
+    assert [result["hypothesis"] for result in results] == [
+        f"Hypothesis: Margin hypothesis {i}" for i in range(1, 6)
+    ]
+    assert [result["result"] for result in results if "error" not in result] == [
+        "Result 1",
+        "Result 2",
+        "Result 4",
+        "Result 5",
+    ]
+    assert results[2]["error"] == "Model unavailable"
+    assert os.path.exists(f"{test_output_dir}/hypothesis_test_3.txt")
+
+    # Only a run in which every test fails is an error
+    def failing_test(hypothesis, data_summary):
+        raise RuntimeError("Model unavailable")
+
+    monkeypatch.setattr(controller.analyst_agent, "test_hypothesis", failing_test)
+    with pytest.raises(RuntimeError, match="All hypothesis tests failed"):
+        controller.test_hypotheses(hypotheses)
+
+
 # Integration test with mocked LLM responses
 @patch("src.agents.agents.ChatOpenAI")
 def test_integration_specific_analysis(